@@ -0,0 +1,82 @@
+import argparse
+from pathlib import Path
+
+from src.services.inference.runner import build_result_pack
+from src.utils.parser import parse_methods, ALLOWED_METHODS
+from src.utils.result_pack import ResultPack
+from src.utils.streams import iter_csv_records, iter_jsonl_records
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute method results for a policy corpus into a read-only result pack."
+    )
+
+    parser.add_argument(
+        "--base-dir",
+        type=str,
+        default=str(Path(__file__).parent),
+        help="Base directory for resolving relative paths."
+    )
+
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument(
+        "--input-csv",
+        type=str,
+        help="CSV containing policy text; every data row is scored (text column: --text-column)."
+    )
+    group.add_argument(
+        "--input-jsonl",
+        type=str,
+        help="JSONL file with one policy object per line; every line is scored (text field: --text-column)."
+    )
+    parser.add_argument(
+        "--text-column",
+        type=str,
+        default="cleaned_policy_text",
+        help="Column / field containing policy text."
+    )
+    parser.add_argument(
+        "--methods",
+        type=parse_methods,
+        default=parse_methods("lexical"),
+        help=f"Comma-separated inference methods to precompute. Allowed: {ALLOWED_METHODS}."
+    )
+    parser.add_argument(
+        "--out",
+        type=str,
+        default="src/tests/cache/packs",
+        help="Pack root (resolved relative to --base-dir if not absolute). Point RESULT_PACK_DIR at it to serve the pack."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=64,
+        help="Policies scored per batch."
+    )
+
+    args = parser.parse_args()
+    base_dir = Path(args.base_dir)
+
+    def resolve(p):
+        p = Path(p)
+        return p if p.is_absolute() else base_dir / p
+
+    if args.input_jsonl is not None:
+        input_path = resolve(args.input_jsonl)
+        records = iter_jsonl_records(input_path, text_field=args.text_column)
+    else:
+        input_path = resolve(args.input_csv)
+        records = iter_csv_records(input_path, args.text_column)
+
+    print(f"Building result pack for {args.methods} from {input_path}")
+    pack_dir = build_result_pack(
+        records, args.methods, resolve(args.out), batch_size=args.batch_size, source=str(input_path)
+    )
+    pack = ResultPack(pack_dir)
+    size_mb = sum(p.stat().st_size for p in pack_dir.iterdir()) / 2**20
+    print(f"Result pack with {len(pack)} entries ({size_mb:.1f} MB) written to {pack_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from src.services.inference.benchmark import check_budgets, compare_to_baseline, load_labeled_corpus, run_benchmark
+from src.services.inference.orchestrator import EXECUTORS
+from src.utils.parser import parse_methods, ALLOWED_METHODS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speed and accuracy of the HCPCS inference pipeline.")
+
+    parser.add_argument(
+        "--base-dir",
+        type=str,
+        default=str(Path(__file__).parent),
+        help="Base directory for resolving relative paths."
+    )
+    parser.add_argument(
+        "--labels",
+        type=str,
+        default="src/tests/inputs/policies_cleaned_labels.csv",
+        help="CSV with policy ids and gold codes (--label-column)."
+    )
+    parser.add_argument(
+        "--texts",
+        type=str,
+        required=True,
+        help="CSV or JSONL with policy ids and text, joined to --labels by --id-column. Required: the default "
+             "--labels file has no text column."
+    )
+    parser.add_argument("--text-column", type=str, default="cleaned_policy_text", help="Text column / field.")
+    parser.add_argument("--id-column", type=str, default="policy_id", help="Policy id column / field.")
+    parser.add_argument("--label-column", type=str, default="hcpcs_codes", help="'|'-separated gold code column.")
+    parser.add_argument("--limit", type=int, default=200, help="Number of labeled policies to benchmark.")
+    parser.add_argument(
+        "--methods",
+        type=parse_methods,
+        default=parse_methods("regex,lexical"),
+        help=f"Comma-separated inference methods. Allowed: {ALLOWED_METHODS}."
+    )
+    parser.add_argument(
+        "--k",
+        type=lambda raw: [int(k) for k in raw.split(",") if k.strip()],
+        default=[1, 5, 10],
+        help="Cut-offs for precision/recall@k, e.g. 1,5,10."
+    )
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default="serial",
+        help="Executor for the end-to-end pipeline run."
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Also run the pipeline in cascade mode and report the latency saved against running every method."
+    )
+    parser.add_argument(
+        "--index-sizes",
+        type=lambda raw: [int(n) for n in raw.split(",") if n.strip()],
+        default=[],
+        help="Also score against synthetic code tables of these sizes, e.g. 1000,10000,70000, and report "
+             "lexical index memory and latency per size for vocabulary and hashed indexes."
+    )
+    parser.add_argument(
+        "--hashing-features",
+        type=int,
+        default=1 << 20,
+        help="Hashed feature count of the hashed indexes in --index-sizes."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="src/tests/outputs/benchmark.json",
+        help="Where to write the JSON report."
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="Previous report to compare against. Exits with status 1 when precision or recall regresses past "
+             "--threshold; slower timings or more memory are reported as warnings."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Allowed relative regression per metric when comparing to --baseline (default 0.10 = 10%%)."
+    )
+
+    args = parser.parse_args()
+    base_dir = Path(args.base_dir)
+
+    def resolve(p):
+        p = Path(p)
+        return p if p.is_absolute() else base_dir / p
+
+    corpus = load_labeled_corpus(
+        resolve(args.labels),
+        texts_path=resolve(args.texts),
+        text_column=args.text_column,
+        id_column=args.id_column,
+        label_column=args.label_column,
+        limit=args.limit,
+    )
+    print(f"Benchmarking {args.methods} over {len(corpus)} labeled policies")
+
+    report = run_benchmark(
+        args.methods, corpus, ks=args.k, executor=args.executor, cascade=args.cascade,
+        index_sizes=args.index_sizes, hashing_features=args.hashing_features,
+    )
+
+    over_budget = check_budgets(report)
+    report["budgets"] = {"exceeded": over_budget}
+
+    regressions = None
+    if args.baseline:
+        with open(resolve(args.baseline), "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, threshold=args.threshold)
+        report["baseline"] = {"path": args.baseline, "threshold": args.threshold, "regressions": regressions}
+
+    output_path = resolve(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+
+    print(f"startup: import run_pipeline {report['startup']['cli_import_s'] * 1000:.0f}ms")
+    for m, r in report["methods"].items():
+        lat = r["latency"]
+        print(
+            f"{m:>8}: {r['docs_per_s']:.1f} docs/s  p50={lat['p50_ms']:.2f}ms  p95={lat['p95_ms']:.2f}ms  "
+            f"p99={lat['p99_ms']:.2f}ms  init={r['init_s']:.2f}s"
+        )
+    pipe = report["pipeline"]
+    print(f"pipeline: cold={pipe['cold_s']:.2f}s  warm={pipe['warm_s']:.2f}s  peak_rss={report['peak_rss_mb']:.0f}MB")
+    print("accuracy: " + "  ".join(f"{k}={v:.3f}" for k, v in pipe["accuracy"].items()))
+    if "cascade" in report:
+        casc = report["cascade"]
+        skipped = ", ".join(f"{m}={n}" for m, n in casc["skipped_docs"].items()) or "none"
+        print(
+            f" cascade: cold={casc['cold_s']:.2f}s  saved={casc['saved_s']:.2f}s "
+            f"({casc['saved_s'] / pipe['cold_s']:.0%})  skipped: {skipped}"
+        )
+        print("accuracy: " + "  ".join(f"{k}={v:.3f}" for k, v in casc["accuracy"].items()))
+    json_mb = report["output"]["json"]["size_mb"]
+    for name, r in report["output"].items():
+        print(
+            f"{name:>16}: write={r['write_s'] * 1000:.0f}ms  size={r['size_mb']:.2f}MB "
+            f"({r['size_mb'] / json_mb:.1%} of json)"
+        )
+    for size, kinds in report.get("index_scaling", {}).items():
+        for kind, r in kinds.items():
+            print(
+                f"{size:>8} codes, {kind:>10}: index={r['index_mb']:.1f}MB  build={r['build_s']:.2f}s  "
+                f"{r['per_doc_ms']:.2f}ms/doc  scoring peak={r['score_peak_mb']:.1f}MB"
+            )
+    print(f"Benchmark report saved to {output_path}")
+
+    for b in over_budget:
+        print(f"Over budget: {b['metric']} = {b['current']:.4g} (budget {b['budget']:.4g})")
+    failed = [r for r in regressions or [] if r["gating"]]
+    warned = [r for r in regressions or [] if not r["gating"]]
+    if warned:
+        print(f"Warning: {len(warned)} timing/memory metric(s) worse by more than {args.threshold:.0%}:")
+        for r in warned:
+            print(f"  {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} ({r['change']:+.1%})")
+    if failed:
+        print(f"{len(failed)} accuracy metric(s) regressed by more than {args.threshold:.0%}:")
+        for r in failed:
+            print(f"  {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} ({r['change']:+.1%})")
+    if failed or over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 import argparse
-import json
+import os
+from contextlib import nullcontext
 from pathlib import Path
 
-import pandas as pd
-
-from src.services.inference.runner import run_pipeline_texts
-from src.utils.parser import parse_methods, ALLOWED_METHODS, to_jsonable
+from src.services.inference.runner import iter_pipeline_records, iter_source_records
+from src.services.inference.orchestrator import EXECUTORS
+from src.utils.parser import parse_methods, parse_row_range, parse_timeouts, ALLOWED_METHODS
+from src.utils.checkpoint import Checkpoint
+from src.utils.metrics import REGISTRY
+from src.utils.profiling import profile_run
+from src.utils.streams import OUTPUT_FORMATS, iter_csv_records, iter_jsonl_records, open_result_writer
+from src.utils.text_source import TextSource
 
 
 def main():
@@ -22,24 +27,46 @@ def main():
     group.add_argument(
         "--input",
         type=str,
-        help="Path to a raw policy text file. Use this OR --input-csv + --row (+ --text-column)."
+        help="Path to a raw policy text file. Use this OR --input-csv + --row/--rows/--all-rows (+ --text-column)."
     )
     group.add_argument(
         "--input-csv",
         type=str,
-        help="Path to CSV containing policy text. Requires --row (+ optional --text-column). Mutually exclusive with --input."
+        help="Path to CSV containing policy text. Requires --row, --rows or --all-rows (+ optional --text-column). Mutually exclusive with --input."
+    )
+    group.add_argument(
+        "--input-jsonl",
+        type=str,
+        help="Path to a JSONL file with one policy object per line; every line is scored (text field: --text-column)."
     )
 
-    parser.add_argument(
+    row_group = parser.add_mutually_exclusive_group()
+    row_group.add_argument(
         "--row",
         type=int,
-        help="1-based row number in the CSV (excluding header). Required if using --input-csv."
+        help="1-based row number in the CSV (excluding header). One of --row/--rows/--all-rows is required with --input-csv."
+    )
+    row_group.add_argument(
+        "--rows",
+        type=parse_row_range,
+        help="Inclusive row range in the same numbering as --row, e.g. 2-51. Scores every row in one batch."
+    )
+    row_group.add_argument(
+        "--all-rows",
+        action="store_true",
+        help="Score every data row in the CSV in one batch."
     )
     parser.add_argument(
         "--text-column",
         type=str,
         default="cleaned_policy_text",
-        help="Column name containing policy text (used with --input-csv)."
+        help="Column name containing policy text (used with --input-csv / --input-jsonl)."
+    )
+    parser.add_argument(
+        "--id-column",
+        type=str,
+        default="policy_id",
+        help="Column / field copied onto each result as policy_id when present (used with --input-csv / --input-jsonl)."
     )
 
     parser.add_argument(
@@ -48,47 +75,159 @@ def main():
         default="src/tests/outputs/sample_output.json",
         help="Output JSON path (resolved relative to --base-dir if not absolute)."
     )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default=None,
+        help="json (indented array), jsonl (one record per line) or columnar (a directory of compressed "
+             "code/result tables; see --columnar-backend). Default: jsonl for a .jsonl output path, else json."
+    )
+    parser.add_argument(
+        "--columnar-backend",
+        choices=("auto", "parquet", "npz", "csv"),
+        default="auto",
+        help="Table format for --output-format columnar. auto: parquet if pyarrow is installed, else npz."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=64,
+        help="Policies scored per batch. Results are written as each batch completes."
+    )
     parser.add_argument(
         "--methods",
         type=parse_methods,
         default=parse_methods("lexical"),
         help=f"Comma-separated inference methods. Allowed: {ALLOWED_METHODS}. Example: lexical,llm"
     )
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default="serial",
+        help="How methods run: serial, thread (all methods concurrently) or process (CPU-bound methods in a process pool)."
+    )
+    parser.add_argument(
+        "--method-timeout",
+        type=parse_timeouts,
+        default=None,
+        help="Per-method timeout in seconds, e.g. 30 or llm=20,*=60. Needs --executor thread or process: "
+             "a serial run cannot interrupt a method, so the option is rejected there."
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help="Process pool size for the process executor (default: one worker per CPU-bound method)."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for the corpus: batches are split across them and results keep input order. "
+             "The lexical index is shared between workers through shared memory. Each worker applies "
+             "--executor (serial or thread) and --method-timeout. 0 = one per CPU."
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Run methods cheapest-first and skip costly ones (rag, llm) for policies the cheaper methods already "
+             "settled. Rules: CASCADE_MIN_CONFIDENCE, CASCADE_MIN_CODES, CASCADE_SKIP_FROM_COST."
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help="Durable progress log for corpus runs (resolved relative to --base-dir if not absolute). If it "
+             "exists, the run resumes: policies already in it are skipped and new results are appended to --output."
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=256,
+        help="Records per checkpoint commit (each commit fsyncs the output and the log; also every 5 seconds)."
+    )
+    parser.add_argument(
+        "--metrics-out",
+        type=str,
+        default=None,
+        help="Write per-stage counters and latency histograms in Prometheus text format to this path at the end of the run."
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run under cProfile and tracemalloc; reports are written next to --output (.prof, .profile.txt, .tracemalloc.txt)."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the result cache: recompute every method and store nothing."
+    )
 
     args = parser.parse_args()
     base_dir = Path(args.base_dir)
 
     # Conditional validation for CSV mode
-    if args.input_csv is not None and args.row is None:
-        parser.error("--input-csv requires --row (and optionally --text-column).")
+    if args.input_csv is not None and args.row is None and args.rows is None and not args.all_rows:
+        parser.error("--input-csv requires --row, --rows or --all-rows (and optionally --text-column).")
+    if args.checkpoint and args.input is not None:
+        parser.error("--checkpoint requires --input-csv or --input-jsonl.")
+    if args.method_timeout and args.executor == "serial":
+        parser.error("--method-timeout needs --executor thread or process; serial runs cannot time out a method.")
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    if workers > 1 and args.input is None and args.executor == "process":
+        parser.error("--workers > 1 runs methods serially or in threads in each worker; use --executor serial or thread.")
+    if workers > 1 and args.input is None and args.max_workers is not None:
+        parser.error("--max-workers sizes the process executor, which --workers > 1 does not support.")
+    if args.checkpoint and args.output_format == "columnar":
+        parser.error("--checkpoint supports json and jsonl output only.")
+    if args.output_format == "columnar":
+        from src.utils.columnar import resolve_backend
 
-    # Resolve input source + load policy text(s)
+        try:
+            resolve_backend(args.columnar_backend)
+        except ValueError as e:
+            parser.error(str(e))
+
+    # Resolve input source; policies are read lazily as the pipeline consumes them
+    source = None
     if args.input is not None:
         input_path = Path(args.input)
         if not input_path.is_absolute():
             input_path = base_dir / input_path
 
-        with open(input_path, "r", encoding="utf-8") as f:
-            policy_texts = [f.read()]
+        # memory-mapped; methods stream it in chunks rather than reading it into one string
+        source = TextSource(input_path)
+        records = None
 
         input_display = str(input_path)
 
+    elif args.input_jsonl is not None:
+        jsonl_path = Path(args.input_jsonl)
+        if not jsonl_path.is_absolute():
+            jsonl_path = base_dir / jsonl_path
+
+        records = iter_jsonl_records(jsonl_path, text_field=args.text_column, id_field=args.id_column)
+        input_display = f"{jsonl_path} (field={args.text_column})"
+
     else:  # args.input_csv is not None
         csv_path = Path(args.input_csv)
         if not csv_path.is_absolute():
             csv_path = base_dir / csv_path
 
-        df = pd.read_csv(csv_path)
+        if args.row is not None:
+            start, end = args.row, args.row
+        elif args.rows is not None:
+            start, end = args.rows
+        else:
+            start, end = 2, None
 
-        idx = args.row - 2  # row=2 => first data row => iloc[0]
-        if idx < 0 or idx >= len(df):
-            raise ValueError(f"--row {args.row} out of range. Valid: 2..{len(df)+1}")
-
-        if args.text_column not in df.columns:
-            raise ValueError(f"Column '{args.text_column}' not found in CSV. Available: {list(df.columns)}")
-
-        policy_texts = [str(df.iloc[idx][args.text_column])]
-        input_display = f"{csv_path} (row={args.row}, col={args.text_column})"
+        # row=2 => first data row; out-of-range rows are reported once the CSV is exhausted
+        records = iter_csv_records(csv_path, args.text_column, id_column=args.id_column, start=start, end=end)
+        if end is None:
+            row_display = "all rows"
+        else:
+            row_display = f"row={start}" if start == end else f"rows={start}..{end}"
+        input_display = f"{csv_path} ({row_display}, col={args.text_column})"
 
     # Resolve output path relative to --base-dir (if needed)
     output_path = Path(args.output)
@@ -100,17 +239,73 @@ def main():
     print(f"Input:  {input_display}")
     print(f"Output: {output_path}")
 
-    # Run the inference pipeline
-    result = run_pipeline_texts(policy_texts, args.methods)
+    output_format = args.output_format or ("jsonl" if output_path.suffix == ".jsonl" else "json")
+
+    checkpoint = None
+    if args.checkpoint:
+        checkpoint_path = Path(args.checkpoint)
+        if not checkpoint_path.is_absolute():
+            checkpoint_path = base_dir / checkpoint_path
+        checkpoint = Checkpoint(
+            checkpoint_path, output_path, args.methods, output_format, commit_every=args.checkpoint_every
+        )
+        if checkpoint.resumed:
+            print(f"Resuming from {checkpoint_path}: {len(checkpoint.done)} policies already done")
+        records = checkpoint.pending(records)
 
-    # Ensure output directory exists
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Run the inference pipeline, writing each result as soon as its batch completes
+    with profile_run(output_path) if args.profile else nullcontext() as reports, source or nullcontext():
+        if source is not None:
+            results = iter_source_records(
+                source,
+                args.methods,
+                executor=args.executor,
+                timeouts=args.method_timeout,
+                max_workers=args.max_workers,
+                use_cache=not args.no_cache,
+                cascade=args.cascade,
+            )
+        else:
+            results = iter_pipeline_records(
+                records,
+                args.methods,
+                executor=args.executor,
+                timeouts=args.method_timeout,
+                max_workers=args.max_workers,
+                use_cache=not args.no_cache,
+                batch_size=args.batch_size,
+                workers=workers,
+                cascade=args.cascade,
+            )
+        resume = checkpoint.resume_point if checkpoint is not None else None
+        writer = open_result_writer(
+            output_path, output_format, resume=resume, columnar_backend=args.columnar_backend
+        )
+        with writer, \
+                checkpoint or nullcontext():
+            try:
+                for record in results:
+                    writer.write(record)
+                    if checkpoint is not None:
+                        checkpoint.mark(record, writer)
+            finally:
+                # records written before a failure stay done
+                if checkpoint is not None:
+                    checkpoint.commit(writer)
 
-    # Write the result
-    with open(output_path, "w", encoding="utf-8") as outfile:
-        json.dump(to_jsonable(result), outfile, indent=4)
+    if args.metrics_out:
+        metrics_path = Path(args.metrics_out)
+        if not metrics_path.is_absolute():
+            metrics_path = base_dir / metrics_path
+        metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        metrics_path.write_text(REGISTRY.render_prometheus(), encoding="utf-8")
+        print(f"Metrics saved to {metrics_path}")
 
+    if checkpoint is not None and checkpoint.skipped:
+        print(f"Skipped {checkpoint.skipped} policies already in the checkpoint")
     print(f"Inference results saved to {output_path}")
+    if reports:
+        print(f"Profile reports saved to {reports['profile']} and {reports['tracemalloc']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+import argparse
+
+from src.services.inference.orchestrator import EXECUTORS, InferenceOrchestrator
+from src.services.inference.server import InferenceServer, MicroBatcher, UnixInferenceServer
+from src.utils.parser import parse_methods, parse_timeouts, ALLOWED_METHODS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the HCPCS inference pipeline from one warm process.")
+
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind for HTTP.")
+    parser.add_argument("--port", type=int, default=8090, help="HTTP port.")
+    parser.add_argument(
+        "--unix-socket",
+        type=str,
+        default=None,
+        help="Serve on this Unix domain socket path instead of TCP."
+    )
+    parser.add_argument(
+        "--methods",
+        type=parse_methods,
+        default=parse_methods("lexical"),
+        help=f"Comma-separated inference methods. Allowed: {ALLOWED_METHODS}. Example: regex,lexical"
+    )
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default="serial",
+        help="How methods run inside each micro-batch (see run_pipeline.py)."
+    )
+    parser.add_argument(
+        "--method-timeout",
+        type=parse_timeouts,
+        default=None,
+        help="Per-method timeout in seconds, e.g. 30 or llm=20,*=60. Needs --executor thread or process: "
+             "a serial run cannot interrupt a method, so the option is rejected there."
+    )
+    parser.add_argument("--max-batch", type=int, default=32, help="Most texts scored together in one micro-batch.")
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=10.0,
+        help="Longest a text waits for its micro-batch to fill before it is dispatched."
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=256,
+        help="Texts allowed to wait; requests beyond this get 503 with Retry-After."
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=60.0,
+        help="Seconds a request waits for its results before 504."
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Run methods cheapest-first and skip costly ones for texts the cheaper methods already settled."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the result cache: recompute every method and store nothing."
+    )
+
+    args = parser.parse_args()
+    if args.method_timeout and args.executor == "serial":
+        parser.error("--method-timeout needs --executor thread or process; serial runs cannot time out a method.")
+
+    orchestrator = InferenceOrchestrator(
+        methods=args.methods,
+        executor=args.executor,
+        timeouts=args.method_timeout,
+        use_cache=not args.no_cache,
+        cascade=args.cascade,
+    )
+    # load indexes / start workers now rather than on the first request
+    orchestrator.warm_up()
+
+    batcher = MicroBatcher(
+        orchestrator,
+        max_batch=args.max_batch,
+        max_wait_s=args.max_wait_ms / 1000,
+        max_queue=args.max_queue,
+    )
+    if args.unix_socket:
+        server = UnixInferenceServer(args.unix_socket, batcher, request_timeout_s=args.request_timeout)
+    else:
+        server = InferenceServer((args.host, args.port), batcher, request_timeout_s=args.request_timeout)
+
+    print(f"HCPCS inference server listening on {server.url} (methods={args.methods})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+        orchestrator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# src/models/records.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from src.models.schemas import Audit, InferenceResult, InferredCode, Justification
+
+
+class CodeRecord:
+    """
+    Internal form of an InferredCode: one flat slotted object per candidate, with the
+    justification's reason/details inlined. Methods, the cache and the orchestrator
+    work on these; the pydantic schema is only built by to_model() at the boundary.
+    """
+
+    __slots__ = ("code", "confidence", "reason", "details", "code_system")
+
+    def __init__(
+        self,
+        code: str,
+        confidence: float,
+        reason: str,
+        details: Optional[str] = None,
+        code_system: Optional[str] = "HCPCS",
+    ):
+        self.code = code
+        self.confidence = confidence
+        self.reason = reason
+        self.details = details
+        self.code_system = code_system
+
+    def to_dict(self) -> Dict[str, Any]:
+        # same shape and key order as InferredCode.model_dump()
+        return {
+            "code": self.code,
+            "confidence": self.confidence,
+            "justification": {"reason": self.reason, "details": self.details},
+            "code_system": self.code_system,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "CodeRecord":
+        just = d.get("justification") or {}
+        return cls(d["code"], d["confidence"], just.get("reason", ""), just.get("details"), d.get("code_system", "HCPCS"))
+
+    def to_model(self) -> InferredCode:
+        return InferredCode(
+            code=self.code,
+            confidence=self.confidence,
+            justification=Justification(reason=self.reason, details=self.details),
+            code_system=self.code_system,
+        )
+
+    def __repr__(self) -> str:
+        return f"CodeRecord({self.code_system}:{self.code}, confidence={self.confidence:.4f})"
+
+
+class AuditRecord:
+    __slots__ = ("timestamp", "method", "parameters")
+
+    def __init__(self, timestamp: str, method: str, parameters: Optional[Dict[str, Any]] = None):
+        self.timestamp = timestamp
+        self.method = method
+        self.parameters = parameters if parameters is not None else {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        # a copy, so later annotations of this audit do not leak into a stored dict
+        return {"timestamp": self.timestamp, "method": self.method, "parameters": dict(self.parameters)}
+
+    def to_model(self) -> Audit:
+        return Audit(timestamp=self.timestamp, method=self.method, parameters=self.parameters)
+
+
+class ResultRecord:
+    """
+    Internal form of an InferenceResult (inferred_codes + audit, same attribute names).
+
+    to_dict() produces exactly what InferenceResult.model_dump() would, so cache entries
+    and JSON output keep their format; from_dict() rebuilds a record from that dict
+    without validation (cache hits); to_model() builds the validated pydantic result.
+    """
+
+    __slots__ = ("inferred_codes", "audit")
+
+    def __init__(self, inferred_codes: List[CodeRecord], audit: AuditRecord):
+        self.inferred_codes = inferred_codes
+        self.audit = audit
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"inferred_codes": [c.to_dict() for c in self.inferred_codes], "audit": self.audit.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ResultRecord":
+        audit = d["audit"]
+        return cls(
+            [CodeRecord.from_dict(c) for c in d.get("inferred_codes", [])],
+            # parameters are copied: callers annotate them (cache_hit, timings, ...)
+            AuditRecord(audit["timestamp"], audit["method"], dict(audit.get("parameters") or {})),
+        )
+
+    def to_model(self) -> InferenceResult:
+        return InferenceResult(
+            inferred_codes=[c.to_model() for c in self.inferred_codes],
+            audit=self.audit.to_model(),
+        )
+
+    def __repr__(self) -> str:
+        return f"ResultRecord({self.audit.method}, {len(self.inferred_codes)} codes)"
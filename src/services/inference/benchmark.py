@@ -0,0 +1,427 @@
+# src/services/inference/benchmark.py
+from __future__ import annotations
+
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.models.schemas import now_iso
+from src.services.inference.orchestrator import InferenceOrchestrator
+from src.services.inference.runner import run_pipeline_texts
+from src.utils.streams import iter_csv_records, iter_jsonl_records
+
+BENCHMARK_FORMAT_VERSION = "bench-v1"
+
+# `import run_pipeline` must stay well below the cost of the sklearn stack; methods
+# are imported lazily through the method registry
+CLI_IMPORT_BUDGET_S = 0.5
+
+# accuracy metrics gate a baseline comparison; timings, throughput and memory vary
+# run to run on one machine by more than a useful threshold, so they only warn
+_ACCURACY_METRICS = ("precision", "recall")
+
+# flattened metric name suffix -> True when larger is better
+_HIGHER_IS_BETTER = {
+    "saved_s": True,
+    "docs_per_s": True,
+    "records_per_s": True,
+    "precision": True,
+    "recall": True,
+    "_ms": False,
+    "_s": False,
+    "_mb": False,
+}
+
+
+def load_labeled_corpus(
+    labels_path: str | Path,
+    texts_path: Optional[str | Path] = None,
+    text_column: str = "cleaned_policy_text",
+    id_column: str = "policy_id",
+    label_column: str = "hcpcs_codes",
+    limit: Optional[int] = None,
+) -> List[Tuple[str, str, List[str]]]:
+    """
+    Join policy texts with their gold codes by policy id.
+
+    labels_path is a CSV with id_column and label_column ("|"-separated codes).
+    Texts come from texts_path (CSV or JSONL with id_column and text_column), or from
+    the labels CSV itself when it has the text column. Returns (policy_id, text, codes)
+    for the first `limit` policies that have both a non-empty text and labels.
+    """
+    import pandas as pd
+
+    labels_df = pd.read_csv(labels_path, dtype=str, keep_default_na=False)
+    for col in (id_column, label_column):
+        if col not in labels_df.columns:
+            raise ValueError(f"Column '{col}' not found in {labels_path}. Available: {list(labels_df.columns)}")
+    labels = {
+        pid: [c.strip().upper() for c in codes.split("|") if c.strip()]
+        for pid, codes in zip(labels_df[id_column], labels_df[label_column])
+    }
+
+    source = texts_path or labels_path
+    if str(source).endswith(".jsonl"):
+        records = iter_jsonl_records(source, text_field=text_column, id_field=id_column)
+    else:
+        records = iter_csv_records(source, text_column, id_column=id_column)
+
+    corpus = (
+        (meta["policy_id"], text, labels[meta["policy_id"]])
+        for meta, text in records
+        if text.strip() and labels.get(meta.get("policy_id"))
+    )
+    out = list(islice(corpus, limit))
+    if not out:
+        raise ValueError(
+            f"No policies with both text and {label_column} labels. "
+            f"Pass a texts file whose {id_column} values match {labels_path}."
+        )
+    return out
+
+
+def ranked_codes(inferred_codes: Iterable[Any]) -> List[str]:
+    """Codes by descending confidence (ties by code), as the accuracy@k cut-off sees them."""
+    items = [(_get(ic, "confidence"), _get(ic, "code")) for ic in inferred_codes]
+    return [code for _, code in sorted(items, key=lambda x: (-x[0], x[1]))]
+
+
+def accuracy_at_k(predictions: Sequence[List[str]], gold: Sequence[List[str]], ks: Sequence[int]) -> Dict[str, float]:
+    """Macro-averaged precision@k / recall@k over documents."""
+    out: Dict[str, float] = {}
+    for k in ks:
+        p, r = [], []
+        for pred, truth in zip(predictions, gold):
+            truth_set = set(truth)
+            hits = len(set(pred[:k]) & truth_set)
+            p.append(hits / k)
+            r.append(hits / len(truth_set))
+        out[f"precision@{k}"] = float(np.mean(p)) if p else 0.0
+        out[f"recall@{k}"] = float(np.mean(r)) if r else 0.0
+    return out
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds, dtype=float) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if platform.system() == "Darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / scale
+
+
+def measure_import_time(module: str = "run_pipeline", cwd: Optional[str | Path] = None, repeats: int = 3) -> float:
+    """Best-of-`repeats` wall time of importing `module` in a fresh interpreter."""
+    code = f"import time; t0 = time.perf_counter(); import {module}; print(time.perf_counter() - t0)"
+    env = {**os.environ, "PYTHONPATH": str(cwd or Path.cwd())}
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+
+def benchmark_method(method: str, corpus: List[Tuple[str, str, List[str]]], ks: Sequence[int]) -> Dict[str, Any]:
+    """
+    One InferenceMethod without the result cache: construction (cold start), per-document
+    latency percentiles, and whole-corpus batch throughput plus accuracy@k.
+    """
+    texts = [text for _, text, _ in corpus]
+
+    t0 = time.perf_counter()
+    strategy = InferenceOrchestrator._make_method(method)
+    init_s = time.perf_counter() - t0
+
+    latencies = []
+    for text in texts:
+        t0 = time.perf_counter()
+        strategy.infer_batch([text])
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    results = strategy.infer_batch(texts)
+    batch_s = time.perf_counter() - t0
+    strategy.close()
+
+    predictions = [ranked_codes(r.inferred_codes) for r in results]
+    return {
+        "init_s": init_s,
+        "latency": latency_summary(latencies),
+        "docs_per_s": len(texts) / sum(latencies),
+        "batch_docs_per_s": len(texts) / batch_s if batch_s > 0 else float("inf"),
+        "accuracy": accuracy_at_k(predictions, [gold for _, _, gold in corpus], ks),
+    }
+
+
+def benchmark_pipeline(
+    methods: List[str],
+    corpus: List[Tuple[str, str, List[str]]],
+    ks: Sequence[int],
+    executor: str = "serial",
+    cascade: bool = False,
+    results_out: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    run_pipeline_texts end to end against a fresh result cache: a cold run (every method
+    computes) followed by a warm run of the same texts (every result is a cache hit).
+    The cold run's result records are appended to results_out when it is given.
+    """
+    texts = [text for _, text, _ in corpus]
+    previous = os.environ.get("CACHE_PATH")
+    with tempfile.TemporaryDirectory(prefix="bench-cache-") as tmp:
+        os.environ["CACHE_PATH"] = str(Path(tmp) / "results.sqlite")
+        try:
+            t0 = time.perf_counter()
+            results = run_pipeline_texts(texts, methods, executor=executor, cascade=cascade)
+            cold_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            run_pipeline_texts(texts, methods, executor=executor, cascade=cascade)
+            warm_s = time.perf_counter() - t0
+        finally:
+            if previous is None:
+                os.environ.pop("CACHE_PATH", None)
+            else:
+                os.environ["CACHE_PATH"] = previous
+
+    if results_out is not None:
+        results_out.extend(results)
+    predictions = [ranked_codes(r["output"].inferred_codes) for r in results]
+    out = {
+        "executor": executor,
+        "cold_s": cold_s,
+        "warm_s": warm_s,
+        "cold_docs_per_s": len(texts) / cold_s,
+        "warm_docs_per_s": len(texts) / warm_s,
+        "accuracy": accuracy_at_k(predictions, [gold for _, _, gold in corpus], ks),
+    }
+    if cascade:
+        skipped: Dict[str, int] = {}
+        for r in results:
+            for m in r["output"].audit.parameters["cascade"]["skipped"]:
+                skipped[m] = skipped.get(m, 0) + 1
+        out["skipped_docs"] = skipped
+    return out
+
+
+def benchmark_index_scaling(
+    texts: List[str],
+    sizes: Sequence[int],
+    hashing_features: int = 1 << 20,
+    hcpcs_path: str | Path = "src/tests/inputs/hcpcs.csv",
+) -> Dict[str, Any]:
+    """
+    Lexical scoring against code tables of increasing size, with a vocabulary and a
+    hashed index each: build time, index memory, per-document latency and the peak
+    memory allocated while scoring.
+
+    Tables of each size are synthesized from the HCPCS descriptions (cycled, with a
+    per-cycle token so later cycles add vocabulary, as a larger code system does), so
+    the figures show how the index scales rather than how accurate it is.
+    """
+    import pandas as pd
+
+    from src.services.inference.index.tfidf_index import TfidfIndex
+    from src.services.inference.methods.lexical_inference import LexInference
+
+    descs = pd.read_csv(hcpcs_path)["description"].astype(str).tolist()
+    out: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-index-") as tmp:
+        for size in sizes:
+            table = Path(tmp) / f"codes-{size}.csv"
+            pd.DataFrame({
+                "code": [f"S{i:07d}" for i in range(size)],
+                "description": [f"{descs[i % len(descs)]} v{i // len(descs)}" for i in range(size)],
+            }).to_csv(table, index=False)
+
+            by_kind: Dict[str, Any] = {}
+            for kind, n_features in (("vocabulary", 0), ("hashing", hashing_features)):
+                t0 = time.perf_counter()
+                index = TfidfIndex.fit(table, n_features=n_features)
+                build_s = time.perf_counter() - t0
+                method = LexInference(hcpcs_path=table, index=index)
+
+                t0 = time.perf_counter()
+                method.infer_batch(texts)
+                score_s = time.perf_counter() - t0
+
+                # a second pass under tracemalloc, which would distort the timing above
+                tracemalloc.start()
+                method.infer_batch(texts)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                by_kind[kind] = {
+                    "build_s": build_s,
+                    "index_mb": index.nbytes / 2**20,
+                    "vocab_terms": len(index.vectorizer.vocabulary_) if not n_features else 0,
+                    "per_doc_ms": score_s * 1000.0 / len(texts),
+                    "docs_per_s": len(texts) / score_s if score_s > 0 else float("inf"),
+                    "score_peak_mb": peak / 2**20,
+                }
+            out[str(size)] = by_kind
+    return out
+
+
+def benchmark_output_formats(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Write time and on-disk size of the same result records as json, jsonl and columnar
+    output, the latter once per backend installed here (parquet needs pyarrow).
+    """
+    from src.utils.columnar import parquet_available
+    from src.utils.streams import open_result_writer
+
+    targets = [("json", "json", "auto"), ("jsonl", "jsonl", "auto")]
+    if parquet_available():
+        targets.append(("columnar_parquet", "columnar", "parquet"))
+    targets += [("columnar_npz", "columnar", "npz"), ("columnar_csv", "columnar", "csv")]
+
+    out: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-output-") as tmp:
+        for name, output_format, backend in targets:
+            path = Path(tmp) / name
+            t0 = time.perf_counter()
+            with open_result_writer(path, output_format, columnar_backend=backend) as writer:
+                for record in records:
+                    writer.write(record)
+            write_s = time.perf_counter() - t0
+
+            files = list(path.iterdir()) if path.is_dir() else [path]
+            out[name] = {
+                "write_s": write_s,
+                "records_per_s": len(records) / write_s if write_s > 0 else float("inf"),
+                "size_mb": sum(p.stat().st_size for p in files) / 2**20,
+            }
+    return out
+
+
+def run_benchmark(
+    methods: List[str],
+    corpus: List[Tuple[str, str, List[str]]],
+    ks: Sequence[int] = (1, 5, 10),
+    executor: str = "serial",
+    cascade: bool = False,
+    index_sizes: Sequence[int] = (),
+    hashing_features: int = 1 << 20,
+) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "format_version": BENCHMARK_FORMAT_VERSION,
+        "timestamp": now_iso(),
+        "python": platform.python_version(),
+        "n_docs": len(corpus),
+        "startup": {"cli_import_s": measure_import_time(cwd=Path(__file__).resolve().parents[3])},
+        "methods": {},
+    }
+    for m in methods:
+        report["methods"][m] = benchmark_method(m, corpus, ks)
+    results: List[Dict[str, Any]] = []
+    report["pipeline"] = benchmark_pipeline(methods, corpus, ks, executor=executor, results_out=results)
+    report["output"] = benchmark_output_formats(
+        [{"policy_id": policy_id, **r} for (policy_id, _, _), r in zip(corpus, results)]
+    )
+    if cascade:
+        # the same corpus with cheapest-first scheduling, against the full run above
+        casc = benchmark_pipeline(methods, corpus, ks, executor=executor, cascade=True)
+        casc["saved_s"] = report["pipeline"]["cold_s"] - casc["cold_s"]
+        report["cascade"] = casc
+    if index_sizes:
+        texts = [text for _, text, _ in corpus]
+        report["index_scaling"] = benchmark_index_scaling(texts, index_sizes, hashing_features=hashing_features)
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def flatten_metrics(report: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a report as {"methods.lexical.latency.p95_ms": value, ...}."""
+    out: Dict[str, float] = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten_metrics(value, prefix=f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key != "n_docs":
+            out[name] = float(value)
+    return out
+
+
+def compare_to_baseline(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.10,
+) -> List[Dict[str, Any]]:
+    """
+    Metrics that got worse than the baseline by more than `threshold` (relative change).
+    Direction is taken from the metric name: throughput / precision / recall should not
+    drop, latencies / timings / memory should not grow. Metrics missing on either side
+    are ignored. Each regression is marked "gating" when it is an accuracy metric;
+    the others are warnings.
+    """
+    current, base = flatten_metrics(report), flatten_metrics(baseline)
+    regressions = []
+    for name in sorted(current.keys() & base.keys()):
+        higher_better = _direction(name)
+        if higher_better is None:
+            continue
+        old, new = base[name], current[name]
+        if old == 0:
+            continue
+        change = (new - old) / abs(old)
+        worse = -change if higher_better else change
+        if worse > threshold:
+            regressions.append(
+                {"metric": name, "baseline": old, "current": new, "change": change, "gating": _is_accuracy(name)}
+            )
+    return regressions
+
+
+def check_budgets(report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Absolute budgets that hold regardless of any baseline (currently: CLI import time)."""
+    import_s = report.get("startup", {}).get("cli_import_s")
+    if import_s is None or import_s <= CLI_IMPORT_BUDGET_S:
+        return []
+    return [{
+        "metric": "startup.cli_import_s",
+        "budget": CLI_IMPORT_BUDGET_S,
+        "current": import_s,
+        "change": import_s / CLI_IMPORT_BUDGET_S - 1,
+    }]
+
+
+def _is_accuracy(name: str) -> bool:
+    return _leaf(name) in _ACCURACY_METRICS
+
+
+def _direction(name: str) -> Optional[bool]:
+    leaf = _leaf(name)
+    for suffix, higher_better in _HIGHER_IS_BETTER.items():
+        if leaf.endswith(suffix):
+            return higher_better
+    return None
+
+
+def _leaf(name: str) -> str:
+    # "pipeline.accuracy.precision@5" -> "precision"
+    return name.rsplit(".", 1)[-1].split("@")[0]
+
+
+def _get(obj: Any, field: str) -> Any:
+    return obj[field] if isinstance(obj, dict) else getattr(obj, field)
@@ -0,0 +1,56 @@
+# src/services/inference/cascade.py
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+from src.services.inference.methods.registry import get_spec
+
+
+@dataclass(frozen=True)
+class CascadeRules:
+    """
+    When the cascade may skip a costlier method for a document.
+
+    Methods run cheapest-first (MethodSpec.cost). Before a method whose cost is at
+    least skip_from_cost runs, each document is checked: once the methods that already
+    ran have produced min_codes distinct codes at confidence >= min_confidence, the
+    document is settled and the method is skipped for it. Cheaper methods always run.
+    """
+
+    min_confidence: float = 0.9
+    min_codes: int = 1
+    skip_from_cost: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "CascadeRules":
+        return cls(
+            min_confidence=float(os.getenv("CASCADE_MIN_CONFIDENCE", cls.min_confidence)),
+            min_codes=int(os.getenv("CASCADE_MIN_CODES", cls.min_codes)),
+            skip_from_cost=float(os.getenv("CASCADE_SKIP_FROM_COST", cls.skip_from_cost)),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def may_skip(self, method: str) -> bool:
+        return get_spec(method).cost >= self.skip_from_cost
+
+    def settled(self, confident: Dict[Tuple[str, str], float]) -> bool:
+        return len(confident) >= self.min_codes
+
+    def skip_reason(self, confident: Dict[Tuple[str, str], float]) -> str:
+        return f"{len(confident)} code(s) at confidence >= {self.min_confidence} from cheaper methods"
+
+    def add_codes(self, confident: Dict[Tuple[str, str], float], codes: Iterable[Any]) -> None:
+        """Fold a method's codes into a document's (code_system, code) -> confidence of settled codes."""
+        for ic in codes:
+            if ic.confidence >= self.min_confidence:
+                key = (ic.code_system or "HCPCS", ic.code)
+                confident[key] = max(ic.confidence, confident.get(key, 0.0))
+
+
+def cascade_order(methods: List[str]) -> List[int]:
+    """Indices of methods cheapest-first; methods of equal cost keep the requested order."""
+    return sorted(range(len(methods)), key=lambda j: get_spec(methods[j]).cost)
@@ -0,0 +1,263 @@
+# src/services/inference/index/dense_index.py
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.services.inference.index.tfidf_index import TfidfIndex
+
+DENSE_FORMAT_VERSION = "dense-v1"
+
+
+class DenseIndex:
+    """
+    Dense (LSA) embedding index over a code table, derived from its TfidfIndex.
+
+    TruncatedSVD projects the TF-IDF space to n_components dimensions; code
+    embeddings are stored L2-normalised as one contiguous float32 matrix, and
+    queries are embedded with the same projection (components_). Exact search is a
+    blocked matrix product with argpartition; with IVF enabled, codes are also
+    bucketed by k-means and only the nprobe closest buckets are scored.
+
+    Artifact layout (one directory per format version + source sha + params):
+      meta.json, components.npy, embeddings.npy
+      ivf_centroids.npy, ivf_order.npy, ivf_offsets.npy   (only with IVF)
+    """
+
+    def __init__(
+        self,
+        components: np.ndarray,
+        embeddings: np.ndarray,
+        source_sha: str,
+        n_components: int,
+        ivf_centroids: Optional[np.ndarray] = None,
+        ivf_order: Optional[np.ndarray] = None,
+        ivf_offsets: Optional[np.ndarray] = None,
+        artifact_dir: Optional[Path] = None,
+    ):
+        self.components = components  # (n_components, n_terms) float32
+        self.embeddings = embeddings  # (n_codes, n_components) float32, rows L2-normalised
+        self.source_sha = source_sha
+        self.n_components = n_components
+        self.ivf_centroids = ivf_centroids
+        self.ivf_order = ivf_order
+        self.ivf_offsets = ivf_offsets
+        self.artifact_dir = artifact_dir
+
+    @property
+    def has_ivf(self) -> bool:
+        return self.ivf_centroids is not None
+
+    @property
+    def version(self) -> str:
+        """Identifies the artifact; reported as index_version in audits."""
+        suffix = f"-ivf{len(self.ivf_centroids)}" if self.has_ivf else ""
+        return f"{DENSE_FORMAT_VERSION}-{self.source_sha[:12]}-k{self.n_components}{suffix}"
+
+    @classmethod
+    def build(
+        cls,
+        tfidf: TfidfIndex,
+        n_components: int = 128,
+        ivf_lists: int = 0,
+        seed: int = 0,
+    ) -> "DenseIndex":
+        from sklearn.decomposition import TruncatedSVD
+
+        n_codes, n_terms = tfidf.X.shape
+        n_components = max(1, min(n_components, n_terms - 1, n_codes - 1))
+        svd = TruncatedSVD(n_components=n_components, random_state=seed)
+        embeddings = _normalize_rows(svd.fit_transform(tfidf.X).astype(np.float32))
+        components = np.ascontiguousarray(svd.components_, dtype=np.float32)
+
+        centroids = order = offsets = None
+        if ivf_lists and n_codes > ivf_lists:
+            centroids, order, offsets = _build_ivf(embeddings, ivf_lists, seed)
+
+        return cls(
+            components=components,
+            embeddings=np.ascontiguousarray(embeddings),
+            source_sha=tfidf.source_sha,
+            n_components=n_components,
+            ivf_centroids=centroids,
+            ivf_order=order,
+            ivf_offsets=offsets,
+        )
+
+    def save(self, root: str | Path) -> Path:
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        final_dir = root / self.version
+        if (final_dir / "meta.json").exists():
+            self.artifact_dir = final_dir
+            return final_dir
+
+        tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=root))
+        try:
+            np.save(tmp_dir / "components.npy", self.components)
+            np.save(tmp_dir / "embeddings.npy", self.embeddings)
+            if self.has_ivf:
+                np.save(tmp_dir / "ivf_centroids.npy", self.ivf_centroids)
+                np.save(tmp_dir / "ivf_order.npy", self.ivf_order)
+                np.save(tmp_dir / "ivf_offsets.npy", self.ivf_offsets)
+
+            meta = {
+                "format_version": DENSE_FORMAT_VERSION,
+                "version": self.version,
+                "source_sha": self.source_sha,
+                "n_components": self.n_components,
+                "shape": list(self.embeddings.shape),
+                "ivf_lists": int(len(self.ivf_centroids)) if self.has_ivf else 0,
+            }
+            # meta.json is written last: its presence marks a complete artifact
+            with (tmp_dir / "meta.json").open("w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+
+            try:
+                os.replace(tmp_dir, final_dir)
+            except OSError:
+                # another process won the race; its artifact is equivalent
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self.artifact_dir = final_dir
+        return final_dir
+
+    @classmethod
+    def load(cls, artifact_dir: str | Path, mmap: bool = True) -> "DenseIndex":
+        artifact_dir = Path(artifact_dir)
+        with (artifact_dir / "meta.json").open("r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != DENSE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported dense index format: {meta.get('format_version')}")
+
+        mmap_mode = "r" if mmap else None
+        ivf = {}
+        if meta.get("ivf_lists"):
+            for name in ("ivf_centroids", "ivf_order", "ivf_offsets"):
+                ivf[name] = np.load(artifact_dir / f"{name}.npy", mmap_mode=mmap_mode)
+
+        return cls(
+            components=np.load(artifact_dir / "components.npy", mmap_mode=mmap_mode),
+            embeddings=np.load(artifact_dir / "embeddings.npy", mmap_mode=mmap_mode),
+            source_sha=meta["source_sha"],
+            n_components=meta["n_components"],
+            artifact_dir=artifact_dir,
+            **ivf,
+        )
+
+    @classmethod
+    def load_or_build(
+        cls,
+        tfidf: TfidfIndex,
+        root: str | Path,
+        n_components: int = 128,
+        ivf_lists: int = 0,
+    ) -> "DenseIndex":
+        artifact_dir = Path(root) / _expected_version(tfidf, n_components, ivf_lists)
+        if (artifact_dir / "meta.json").exists():
+            return cls.load(artifact_dir)
+
+        index = cls.build(tfidf, n_components=n_components, ivf_lists=ivf_lists)
+        return cls.load(index.save(root))
+
+    # -- querying ---------------------------------------------------------------
+
+    def project(self, tfidf_rows) -> np.ndarray:
+        """
+        Project L2-normalised TF-IDF rows (sparse) into the embedding space, unnormalised.
+        A projection's norm (at most 1) is the share of its row that the code-table
+        components capture, so its dot product with a code embedding is the cosine
+        scaled down for text the code table does not describe.
+        """
+        return np.asarray(tfidf_rows @ self.components.T, dtype=np.float32)
+
+    def embed(self, tfidf_rows) -> np.ndarray:
+        """Project L2-normalised TF-IDF rows (sparse) into the embedding space, as unit vectors."""
+        return _normalize_rows(self.project(tfidf_rows))
+
+    def search(self, Q: np.ndarray, k: int, nprobe: int = 8, block_rows: int = 8192) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k codes per query row by cosine similarity.
+        Returns (indices, scores), each (n_queries, k), best first.
+        """
+        k = min(k, self.embeddings.shape[0])
+        if self.has_ivf:
+            return self._search_ivf(Q, k, nprobe)
+        return _blocked_top_k(Q, self.embeddings, k, block_rows)
+
+    def _search_ivf(self, Q: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        nprobe = min(nprobe, len(self.ivf_centroids))
+        probes = _top_k_rows(Q @ self.ivf_centroids.T, nprobe)[0]
+
+        out_idx = np.zeros((Q.shape[0], k), dtype=np.int64)
+        out_scores = np.full((Q.shape[0], k), -np.inf, dtype=np.float32)
+        for qi, lists in enumerate(probes):
+            cands = np.concatenate([
+                self.ivf_order[self.ivf_offsets[b]:self.ivf_offsets[b + 1]] for b in lists
+            ])
+            if len(cands) == 0:
+                continue
+            scores = self.embeddings[cands] @ Q[qi]
+            kk = min(k, len(cands))
+            top = np.argpartition(-scores, kk - 1)[:kk]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            out_idx[qi, :kk] = cands[top]
+            out_scores[qi, :kk] = scores[top]
+        return out_idx, out_scores
+
+
+def _expected_version(tfidf: TfidfIndex, n_components: int, ivf_lists: int) -> str:
+    n_codes, n_terms = tfidf.X.shape
+    n_components = max(1, min(n_components, n_terms - 1, n_codes - 1))
+    suffix = f"-ivf{ivf_lists}" if ivf_lists and n_codes > ivf_lists else ""
+    return f"{DENSE_FORMAT_VERSION}-{tfidf.source_sha[:12]}-k{n_components}{suffix}"
+
+
+def _normalize_rows(M: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(M, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (M / norms).astype(np.float32, copy=False)
+
+
+def _top_k_rows(S: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    part = np.argpartition(-S, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(S, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def _blocked_top_k(Q: np.ndarray, E: np.ndarray, k: int, block_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k over E in row blocks, so the score matrix never exceeds n_queries x block_rows."""
+    best_idx = np.empty((Q.shape[0], 0), dtype=np.int64)
+    best_scores = np.empty((Q.shape[0], 0), dtype=np.float32)
+    for lo in range(0, E.shape[0], block_rows):
+        S = Q @ E[lo:lo + block_rows].T
+        kk = min(k, S.shape[1])
+        idx, scores = _top_k_rows(S, kk)
+        cand_idx = np.concatenate([best_idx, idx + lo], axis=1)
+        cand_scores = np.concatenate([best_scores, scores], axis=1)
+        keep = min(k, cand_scores.shape[1])
+        sel, best_scores = _top_k_rows(cand_scores, keep)
+        best_idx = np.take_along_axis(cand_idx, sel, axis=1)
+    return best_idx, best_scores
+
+
+def _build_ivf(embeddings: np.ndarray, n_lists: int, seed: int):
+    from sklearn.cluster import KMeans
+
+    km = KMeans(n_clusters=n_lists, n_init=1, random_state=seed).fit(embeddings)
+    centroids = _normalize_rows(km.cluster_centers_.astype(np.float32))
+    labels = km.labels_
+    order = np.argsort(labels, kind="stable").astype(np.int64)
+    offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=n_lists), out=offsets[1:])
+    return centroids, order, offsets
@@ -0,0 +1,164 @@
+# src/services/inference/index/shared_index.py
+from __future__ import annotations
+
+import json
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.services.inference.index.tfidf_index import HashingTfidfVectorizer, TfidfIndex, vocabulary_terms
+
+# arrays of the fitted index, in the dtypes TfidfIndex.save() writes them
+_ARRAYS = (("idf", np.float64), ("X_data", np.float64), ("X_indices", np.int32), ("X_indptr", np.int64))
+
+
+class SharedTfidfIndex:
+    """
+    A TfidfIndex published in multiprocessing.shared_memory for a pool of workers.
+
+    The owner copies the idf vector, the CSR arrays and the vocabulary / code table
+    (as UTF-8 JSON blobs; a hashed index has an empty vocabulary) into named
+    shared-memory blocks once. handle() is a small
+    picklable description of those blocks; attach(handle) in a worker rebuilds a
+    TfidfIndex whose arrays are zero-copy views of the shared blocks, so the matrix
+    and the fitted vectorizer state are never pickled into each worker.
+
+    Only the owner unlinks the blocks (close()); workers keep theirs open for their
+    lifetime.
+    """
+
+    def __init__(self, index: TfidfIndex):
+        self.index = index
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self._handle: Dict[str, Any] = {}
+
+        X = index.X.tocsr()
+        arrays = {
+            "idf": index.vectorizer.idf_,
+            "X_data": X.data,
+            "X_indices": X.indices,
+            "X_indptr": X.indptr,
+        }
+        terms = [] if index.n_features else vocabulary_terms(index.vectorizer)
+
+        try:
+            blocks: Dict[str, Any] = {}
+            for name, dtype in _ARRAYS:
+                src = np.ascontiguousarray(arrays[name], dtype=dtype)
+                blocks[name] = self._publish_array(src)
+            blocks["vocab"] = self._publish_bytes(json.dumps(terms).encode("utf-8"))
+            blocks["codes"] = self._publish_bytes(
+                json.dumps({"codes": index.codes, "descriptions": index.descs}).encode("utf-8")
+            )
+        except BaseException:
+            self.close()
+            raise
+
+        self._handle = {
+            "blocks": blocks,
+            "shape": list(X.shape),
+            "source_sha": index.source_sha,
+            "ngram_range": list(index.ngram_range),
+            "stop_words": index.stop_words,
+            "n_features": index.n_features,
+            "fit_sha": index.fit_sha,
+            "delta": index.delta,
+        }
+
+    def handle(self) -> Dict[str, Any]:
+        return self._handle
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.size for b in self._blocks)
+
+    def close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+    def __enter__(self) -> "SharedTfidfIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _publish_array(self, src: np.ndarray) -> Dict[str, Any]:
+        # size=0 is rejected by SharedMemory; one spare byte keeps empty arrays valid
+        block = shared_memory.SharedMemory(create=True, size=max(1, src.nbytes))
+        self._blocks.append(block)
+        np.ndarray(src.shape, dtype=src.dtype, buffer=block.buf)[...] = src
+        return {"name": block.name, "shape": list(src.shape), "dtype": src.dtype.str}
+
+    def _publish_bytes(self, blob: bytes) -> Dict[str, Any]:
+        block = shared_memory.SharedMemory(create=True, size=max(1, len(blob)))
+        self._blocks.append(block)
+        block.buf[:len(blob)] = blob
+        return {"name": block.name, "size": len(blob)}
+
+
+def attach(handle: Dict[str, Any]) -> Tuple[TfidfIndex, List[shared_memory.SharedMemory]]:
+    """
+    Rebuild the TfidfIndex described by handle on top of the shared blocks.
+    Returns the index and the attached blocks; the caller must keep the blocks
+    referenced for as long as the index is used.
+    """
+    opened: List[shared_memory.SharedMemory] = []
+
+    def open_block(spec: Dict[str, Any]) -> shared_memory.SharedMemory:
+        block = shared_memory.SharedMemory(name=spec["name"])
+        opened.append(block)
+        return block
+
+    blocks = handle["blocks"]
+    arrays: Dict[str, np.ndarray] = {}
+    for name, _ in _ARRAYS:
+        spec = blocks[name]
+        arr = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=open_block(spec).buf)
+        arr.flags.writeable = False
+        arrays[name] = arr
+
+    terms = _read_json(open_block(blocks["vocab"]), blocks["vocab"]["size"])
+    table = _read_json(open_block(blocks["codes"]), blocks["codes"]["size"])
+
+    X = csr_matrix(
+        (arrays["X_data"], arrays["X_indices"], arrays["X_indptr"]),
+        shape=tuple(handle["shape"]),
+        copy=False,
+    )
+    ngram_range = tuple(handle["ngram_range"])
+    if handle["n_features"]:
+        vectorizer = HashingTfidfVectorizer(handle["n_features"], ngram_range, handle["stop_words"], idf=arrays["idf"])
+    else:
+        vectorizer = TfidfVectorizer(
+            stop_words=handle["stop_words"],
+            ngram_range=ngram_range,
+            min_df=1,
+            vocabulary={term: col for col, term in enumerate(terms)},
+        )
+        # restores the fitted transformer without refitting, as TfidfIndex.load() does
+        vectorizer.idf_ = arrays["idf"]
+
+    index = TfidfIndex(
+        codes=table["codes"],
+        descs=table["descriptions"],
+        vectorizer=vectorizer,
+        X=X,
+        source_sha=handle["source_sha"],
+        ngram_range=ngram_range,
+        stop_words=handle["stop_words"],
+        fit_sha=handle["fit_sha"],
+        delta=handle["delta"],
+    )
+    return index, opened
+
+
+def _read_json(block: shared_memory.SharedMemory, size: int) -> Any:
+    return json.loads(bytes(block.buf[:size]).decode("utf-8"))
@@ -0,0 +1,432 @@
+# src/services/inference/index/tfidf_index.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from src.utils.cache import normalize_text, sha256_file
+
+INDEX_FORMAT_VERSION = "tfidf-v1"
+
+# default feature space of a hashed index: 2**20 columns, an 8 MB idf vector
+DEFAULT_HASHING_FEATURES = 1 << 20
+
+
+class HashingTfidfVectorizer:
+    """
+    Bounded-memory stand-in for a fitted TfidfVectorizer over large code tables.
+
+    Terms are hashed into n_features columns (HashingVectorizer, no sign flipping), so
+    no vocabulary is kept, and weighted by an idf vector precomputed over the table with
+    TfidfVectorizer's smoothed formula. Columns no description contains get idf 0, so,
+    like out-of-vocabulary terms, they do not count towards a query's norm. Rows are
+    L2-normalised, so transform() matches TfidfVectorizer's output up to hash
+    collisions. Memory is fixed by n_features, however many distinct terms (n-grams)
+    the table has.
+    """
+
+    def __init__(
+        self,
+        n_features: int = DEFAULT_HASHING_FEATURES,
+        ngram_range: Tuple[int, int] = (1, 2),
+        stop_words: Optional[str] = "english",
+        idf: Optional[np.ndarray] = None,
+    ):
+        self.n_features = n_features
+        self.idf_ = idf
+        self._hasher = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=tuple(ngram_range),
+            stop_words=stop_words,
+            alternate_sign=False,
+            norm=None,
+        )
+
+    def fit_transform(self, texts: List[str]) -> csr_matrix:
+        counts = self._hasher.transform(texts)
+        # CSR rows hold each column once, so the column counts are document frequencies
+        df = np.bincount(counts.indices, minlength=self.n_features)
+        idf = np.log((1 + counts.shape[0]) / (1 + df)) + 1.0
+        self.idf_ = np.where(df > 0, idf, 0.0)
+        return self._weight(counts)
+
+    def transform(self, texts: List[str]) -> csr_matrix:
+        return self._weight(self._hasher.transform(texts))
+
+    def build_analyzer(self):
+        return self._hasher.build_analyzer()
+
+    def count_unseen(self, terms: List[str]) -> int:
+        """How many terms hash to a column no description of the fitted table contained."""
+        if not terms:
+            return 0
+        unseen = self.idf_ == 0
+        cols = self._hasher.transform(terms)
+        return sum(1 for r in range(cols.shape[0]) if unseen[cols.indices[cols.indptr[r]:cols.indptr[r + 1]]].any())
+
+    def _weight(self, counts: csr_matrix) -> csr_matrix:
+        counts = counts.astype(np.float64)
+        counts.data *= self.idf_[counts.indices]
+        return normalize(counts, norm="l2", copy=False)
+
+
+class TfidfIndex:
+    """
+    Fitted TF-IDF state over a code table: the vectorizer (vocabulary + idf) and
+    the CSR matrix of L2-normalised description vectors, one row per code.
+
+    Artifact layout (one directory per format version + source sha):
+      meta.json                          format version, source sha, shape, vectorizer params
+      codes.json                         {"codes": [...], "descriptions": [...]}
+      vocab.json                         terms ordered by column index
+      idf.npy, X_data.npy, X_indices.npy, X_indptr.npy
+    The .npy arrays are loaded with mmap_mode="r", so every process that opens the
+    same artifact shares one physical copy through the page cache.
+
+    fit_sha is the sha of the table the vocabulary and idf were fitted on. It equals
+    source_sha for a full fit; an index produced by update() keeps its base's fit_sha
+    and records what changed in delta (see update()).
+
+    With n_features > 0 the vectorizer is a HashingTfidfVectorizer: the artifact has no
+    vocab.json, its directory name carries the feature count, and memory no longer grows
+    with the vocabulary of large tables (ICD-10-CM, CPT).
+    """
+
+    def __init__(
+        self,
+        codes: List[str],
+        descs: List[str],
+        vectorizer: TfidfVectorizer,
+        X: csr_matrix,
+        source_sha: str,
+        ngram_range: Tuple[int, int] = (1, 2),
+        stop_words: Optional[str] = "english",
+        artifact_dir: Optional[Path] = None,
+        fit_sha: Optional[str] = None,
+        delta: Optional[Dict[str, Any]] = None,
+    ):
+        self.codes = codes
+        self.descs = descs
+        self.vectorizer = vectorizer
+        self.X = X
+        self.source_sha = source_sha
+        self.ngram_range = tuple(ngram_range)
+        self.stop_words = stop_words
+        self.artifact_dir = artifact_dir
+        self.fit_sha = fit_sha or source_sha
+        self.delta = delta
+
+    @property
+    def is_incremental(self) -> bool:
+        return self.fit_sha != self.source_sha
+
+    @property
+    def n_features(self) -> int:
+        """Hashed feature count, or 0 for a vocabulary index."""
+        return self.vectorizer.n_features if isinstance(self.vectorizer, HashingTfidfVectorizer) else 0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the matrix and idf arrays (the vocabulary of a vocabulary index is not counted)."""
+        X = self.X
+        return int(X.data.nbytes + X.indices.nbytes + X.indptr.nbytes + np.asarray(self.vectorizer.idf_).nbytes)
+
+    @classmethod
+    def fit(
+        cls,
+        table_path: str | Path,
+        ngram_range: Tuple[int, int] = (1, 2),
+        stop_words: Optional[str] = "english",
+        source_sha: Optional[str] = None,
+        n_features: int = 0,
+    ) -> "TfidfIndex":
+        codes, descs = _read_table(table_path)
+
+        if n_features:
+            vectorizer = HashingTfidfVectorizer(n_features, ngram_range=ngram_range, stop_words=stop_words)
+        else:
+            vectorizer = TfidfVectorizer(stop_words=stop_words, ngram_range=tuple(ngram_range), min_df=1)
+        X = vectorizer.fit_transform([normalize_text(d) for d in descs]).tocsr()
+
+        return cls(
+            codes=codes,
+            descs=descs,
+            vectorizer=vectorizer,
+            X=X,
+            source_sha=source_sha or sha256_file(table_path),
+            ngram_range=ngram_range,
+            stop_words=stop_words,
+        )
+
+    def update(self, table_path: str | Path, source_sha: Optional[str] = None) -> "TfidfIndex":
+        """
+        Derive the index for a revised code table without refitting.
+
+        The table is diffed against this index by code: removed codes and codes whose
+        description changed lose their rows, and added / changed codes are vectorized
+        with this index's frozen vocabulary and idf and appended. Rows of unchanged codes
+        are kept as they are, so their scores against any text do not change and cached
+        results can be refreshed by scoring only the appended rows.
+
+        Terms in new descriptions that are not in the frozen vocabulary are ignored;
+        delta["oov_ratio"] reports their share of the new descriptions' words, so callers
+        can fall back to a full fit() once the vocabulary has drifted too far.
+        """
+        codes, descs = _read_table(table_path)
+        # a code may have several rows (fit() keeps each as its own row), so codes are
+        # compared by their descriptions in table order and listed once each
+        new = _rows_by_code(codes, descs)
+        old = _rows_by_code(self.codes, self.descs)
+
+        removed = [c for c in old if c not in new]
+        changed = [c for c in old if c in new and new[c] != old[c]]
+        added = [c for c in new if c not in old]
+        dropped = set(removed) | set(changed)
+
+        keep_rows = [i for i, c in enumerate(self.codes) if c not in dropped]
+        appended = [(c, d) for c in changed + added for d in new[c]]
+        appended_descs = [normalize_text(d) for _, d in appended]
+
+        X = self.X.tocsr()[keep_rows]
+        if appended:
+            X = vstack([X, self.vectorizer.transform(appended_descs)], format="csr")
+
+        analyzer = self.vectorizer.build_analyzer()
+        # unigrams only: an unseen bigram of known words is not vocabulary drift
+        terms = [t for desc in appended_descs for t in analyzer(desc) if " " not in t]
+        n_terms = len(terms)
+        if isinstance(self.vectorizer, HashingTfidfVectorizer):
+            n_oov = self.vectorizer.count_unseen(terms)
+        else:
+            vocab = self.vectorizer.vocabulary_
+            n_oov = sum(1 for t in terms if t not in vocab)
+
+        delta = {
+            "base_sha": self.source_sha,
+            "added": added,
+            "removed": removed,
+            "changed": changed,
+            # rows [first_appended_row:] hold the added / changed codes
+            "first_appended_row": len(keep_rows),
+            "oov_ratio": round(n_oov / n_terms, 4) if n_terms else 0.0,
+        }
+        return TfidfIndex(
+            codes=[self.codes[i] for i in keep_rows] + [c for c, _ in appended],
+            descs=[self.descs[i] for i in keep_rows] + [d for _, d in appended],
+            vectorizer=self.vectorizer,
+            X=X,
+            source_sha=source_sha or sha256_file(table_path),
+            ngram_range=self.ngram_range,
+            stop_words=self.stop_words,
+            fit_sha=self.fit_sha,
+            delta=delta,
+        )
+
+    def save(self, root: str | Path) -> Path:
+        """
+        Write the artifact under root. The directory is assembled in a temp dir and
+        renamed into place, so concurrent builders never expose a half-written index.
+        """
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        final_dir = artifact_dir_for(root, self.source_sha, self.n_features)
+        if (final_dir / "meta.json").exists():
+            self.artifact_dir = final_dir
+            return final_dir
+
+        tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=root))
+        try:
+            if not self.n_features:
+                with (tmp_dir / "vocab.json").open("w", encoding="utf-8") as f:
+                    json.dump(vocabulary_terms(self.vectorizer), f)
+            with (tmp_dir / "codes.json").open("w", encoding="utf-8") as f:
+                json.dump({"codes": self.codes, "descriptions": self.descs}, f)
+
+            X = self.X.tocsr()
+            np.save(tmp_dir / "idf.npy", np.ascontiguousarray(self.vectorizer.idf_, dtype=np.float64))
+            np.save(tmp_dir / "X_data.npy", np.ascontiguousarray(X.data, dtype=np.float64))
+            np.save(tmp_dir / "X_indices.npy", np.ascontiguousarray(X.indices, dtype=np.int32))
+            np.save(tmp_dir / "X_indptr.npy", np.ascontiguousarray(X.indptr, dtype=np.int64))
+
+            meta = {
+                "format_version": INDEX_FORMAT_VERSION,
+                "source_sha": self.source_sha,
+                "shape": list(X.shape),
+                "nnz": int(X.nnz),
+                "vectorizer": {"ngram_range": list(self.ngram_range), "stop_words": self.stop_words},
+            }
+            if self.n_features:
+                meta["vectorizer"]["n_features"] = self.n_features
+            if self.is_incremental:
+                meta["fit_sha"] = self.fit_sha
+                meta["delta"] = self.delta
+            # meta.json is written last: its presence marks a complete artifact
+            with (tmp_dir / "meta.json").open("w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+
+            try:
+                os.replace(tmp_dir, final_dir)
+            except OSError:
+                # another process won the race; its artifact is equivalent
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self.artifact_dir = final_dir
+        return final_dir
+
+    @classmethod
+    def load(cls, artifact_dir: str | Path, mmap: bool = True) -> "TfidfIndex":
+        artifact_dir = Path(artifact_dir)
+        with (artifact_dir / "meta.json").open("r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format: {meta.get('format_version')}")
+
+        with (artifact_dir / "codes.json").open("r", encoding="utf-8") as f:
+            table = json.load(f)
+
+        mmap_mode = "r" if mmap else None
+        idf = np.load(artifact_dir / "idf.npy", mmap_mode=mmap_mode)
+        data = np.load(artifact_dir / "X_data.npy", mmap_mode=mmap_mode)
+        indices = np.load(artifact_dir / "X_indices.npy", mmap_mode=mmap_mode)
+        indptr = np.load(artifact_dir / "X_indptr.npy", mmap_mode=mmap_mode)
+        X = csr_matrix((data, indices, indptr), shape=tuple(meta["shape"]), copy=False)
+
+        params = meta["vectorizer"]
+        ngram_range = tuple(params["ngram_range"])
+        if params.get("n_features"):
+            vectorizer = HashingTfidfVectorizer(params["n_features"], ngram_range, params["stop_words"], idf=idf)
+        else:
+            with (artifact_dir / "vocab.json").open("r", encoding="utf-8") as f:
+                terms = json.load(f)
+            vectorizer = TfidfVectorizer(
+                stop_words=params["stop_words"],
+                ngram_range=ngram_range,
+                min_df=1,
+                vocabulary={term: col for col, term in enumerate(terms)},
+            )
+            # restores the fitted transformer without refitting
+            vectorizer.idf_ = idf
+
+        return cls(
+            codes=table["codes"],
+            descs=table["descriptions"],
+            vectorizer=vectorizer,
+            X=X,
+            source_sha=meta["source_sha"],
+            ngram_range=ngram_range,
+            stop_words=params["stop_words"],
+            artifact_dir=artifact_dir,
+            fit_sha=meta.get("fit_sha"),
+            delta=meta.get("delta"),
+        )
+
+    @classmethod
+    def load_or_build(
+        cls,
+        table_path: str | Path,
+        root: str | Path,
+        source_sha: Optional[str] = None,
+        n_features: int = 0,
+    ) -> "TfidfIndex":
+        """Load the artifact for this table's sha, building and saving it first if missing."""
+        source_sha = source_sha or sha256_file(table_path)
+        artifact_dir = artifact_dir_for(root, source_sha, n_features)
+        if (artifact_dir / "meta.json").exists():
+            return cls.load(artifact_dir)
+
+        index = cls.fit(table_path, source_sha=source_sha, n_features=n_features)
+        index.save(root)
+        return cls.load(artifact_dir)
+
+
+def artifact_dir_for(root: str | Path, source_sha: str, n_features: int = 0) -> Path:
+    # hashed and vocabulary indexes of the same table live side by side
+    suffix = f"-h{n_features}" if n_features else ""
+    return Path(root) / f"{INDEX_FORMAT_VERSION}{suffix}-{source_sha}"
+
+
+def vocabulary_terms(vectorizer: TfidfVectorizer) -> List[str]:
+    """The fitted vocabulary as a list of terms ordered by column."""
+    vocab = vectorizer.vocabulary_
+    terms = [""] * len(vocab)
+    for term, col in vocab.items():
+        terms[col] = term
+    return terms
+
+
+def _rows_by_code(codes: List[str], descs: List[str]) -> Dict[str, List[str]]:
+    """code -> its descriptions, one per table row, in table order."""
+    rows: Dict[str, List[str]] = {}
+    for code, desc in zip(codes, descs):
+        rows.setdefault(code, []).append(desc)
+    return rows
+
+
+def _read_table(table_path: str | Path) -> Tuple[List[str], List[str]]:
+    # pandas is only needed when (re)building, not when loading an artifact
+    import pandas as pd
+
+    table_path = Path(table_path)
+    df = pd.read_csv(table_path)
+    if "code" not in df.columns or "description" not in df.columns:
+        raise ValueError(f"{table_path.name} must have columns: code, description")
+    return df["code"].astype(str).tolist(), df["description"].astype(str).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the persisted TF-IDF index for a code table.")
+    parser.add_argument("--table", default="src/tests/inputs/hcpcs.csv", help="CSV with code, description columns.")
+    parser.add_argument("--out", default="src/tests/cache/index", help="Directory that holds index artifacts.")
+    parser.add_argument(
+        "--update-from",
+        default=None,
+        help="Existing artifact directory to update incrementally (frozen vocabulary / idf) instead of refitting.",
+    )
+    parser.add_argument(
+        "--max-oov-ratio",
+        type=float,
+        default=0.2,
+        help="With --update-from, refit from scratch when more than this share of new description terms is out of vocabulary.",
+    )
+    parser.add_argument(
+        "--hashing-features",
+        type=int,
+        default=0,
+        help=f"Hash terms into this many features (e.g. {DEFAULT_HASHING_FEATURES}) instead of fitting a vocabulary; "
+             "for large tables such as ICD-10-CM.",
+    )
+    args = parser.parse_args()
+
+    if args.update_from:
+        base = TfidfIndex.load(args.update_from)
+        index = base.update(args.table)
+        delta = index.delta
+        print(
+            f"Diff vs {base.source_sha[:12]}: {len(delta['added'])} added, {len(delta['removed'])} removed, "
+            f"{len(delta['changed'])} changed; oov_ratio={delta['oov_ratio']}"
+        )
+        if delta["oov_ratio"] > args.max_oov_ratio:
+            print(f"oov_ratio above {args.max_oov_ratio}; refitting the vocabulary")
+            index = TfidfIndex.fit(args.table, n_features=base.n_features)
+    else:
+        index = TfidfIndex.fit(args.table, n_features=args.hashing_features)
+
+    artifact_dir = index.save(args.out)
+    print(f"Index for {args.table} (sha={index.source_sha[:12]}) written to {artifact_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,56 @@
 # src/services/inference/methods/base.py
-from src.models.schemas import InferenceResult
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from src.models.records import ResultRecord
+
+if TYPE_CHECKING:
+    from src.utils.text_source import TextSource
 
 class InferenceMethod:
-    def infer(self, policy_text: str) -> InferenceResult:
+    METHOD_NAME = "base"
+    METHOD_VERSION = "v1"
+    # CPU-bound methods may be moved to a process pool by the orchestrator
+    CPU_BOUND = False
+
+    def infer(self, policy_text: str) -> ResultRecord:
         raise NotImplementedError
 
+    def infer_batch(self, policy_texts: List[str], text_shas: Optional[List[str]] = None) -> List[ResultRecord]:
+        """
+        Default batch behaviour: one infer() per text.
+        Methods with a cheaper vectorized path should override this.
+        text_shas (sha256 of each text) is supplied by the orchestrator so the
+        caching layer hashes each document once; methods may ignore it.
+        """
+        return [self.infer(t) for t in policy_texts]
+
+    def infer_source(self, source: "TextSource") -> ResultRecord:
+        """
+        infer() for a document read through a TextSource (a large --input file).
+        Default: the source's shared full-text string; methods that can work on
+        source.iter_chunks() override this so the document is never held whole.
+        """
+        return self.infer_batch([source.text()], [source.sha256()])[0]
+
+    def cache_params(self) -> Dict[str, Any]:
+        """
+        Everything besides the text that determines this method's output.
+        Used to build result-cache keys; bump METHOD_VERSION when scoring changes.
+        """
+        return {"method_version": self.METHOD_VERSION}
+
+    def close(self) -> None:
+        """Release clients, threads or handles the method holds; the default holds none."""
+
+    def previous_cache_params(self) -> Optional[Dict[str, Any]]:
+        """
+        cache_params() of the generation this method's index was updated from, when
+        results cached under it can be brought up to date by refresh_cached().
+        """
+        return None
+
+    def refresh_cached(self, policy_texts: List[str], cached: List[ResultRecord]) -> List[Optional[ResultRecord]]:
+        """
+        Update results cached under previous_cache_params() for the current index.
+        None means the text must be scored from scratch.
+        """
+        return [None] * len(policy_texts)
@@ -0,0 +1,306 @@
+# src/services/inference/methods/cached.py
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src.services.inference.methods.base import InferenceMethod
+from src.models.records import ResultRecord
+from src.utils.cache import CacheStore, make_cache_key, sha256_text
+from src.utils.metrics import span
+
+if TYPE_CHECKING:
+    from src.utils.near_dup import NearDupIndex
+    from src.utils.result_pack import ResultPack
+    from src.utils.text_source import TextSource
+
+
+class CachedInference(InferenceMethod):
+    """
+    Read-through / write-through result cache around any InferenceMethod.
+
+    Keys are make_cache_key(method=inner.METHOD_NAME, policy_text_sha, inner.cache_params()),
+    so they change with the method version and its parameters. Every returned audit
+    is annotated with cache_hit / cached_result_key / cache_path.
+
+    Concurrent calls for the same key are deduplicated: the first caller computes,
+    the others wait for its result instead of hitting the inner method again.
+
+    When the inner method's index was updated incrementally (previous_cache_params()),
+    a miss is looked up under the previous generation's key first; a result found there
+    is refreshed by the inner method (refresh_cached()) and stored under the new key,
+    annotated cache_refreshed, instead of being recomputed from scratch.
+
+    With a near_dup index, a text that misses both is matched against previously
+    computed texts by MinHash/LSH; the cached result of the most similar one at or above
+    the index threshold is reused, with audit parameters near_duplicate = {text_sha,
+    similarity} naming where it came from and cache_hit False. Offsets and mention
+    counts from the other text are dropped from the codes' details, and the reused
+    result is not stored under this text's key, so a later exact lookup never mistakes
+    it for this text's own result. Only computed texts are indexed, so reuse never
+    chains from one reused result to the next.
+
+    Read-only result packs built offline (utils/result_pack.py) are consulted before
+    the store. Only packs built with the inner method's current cache params are kept,
+    so a pack for another method version or code table is ignored. Pack hits are
+    annotated cache_hit and result_pack (the pack's name), and are not copied into the
+    store.
+    """
+
+    def __init__(
+        self,
+        inner: InferenceMethod,
+        store: CacheStore,
+        near_dup: Optional[NearDupIndex] = None,
+        packs: Optional[List[ResultPack]] = None,
+    ):
+        self.inner = inner
+        self.store = store
+        self.near_dup = near_dup
+        params = inner.cache_params()
+        self.packs = [p for p in packs or [] if p.serves(inner.METHOD_NAME, params)]
+        self.METHOD_NAME = inner.METHOD_NAME
+        self.METHOD_VERSION = inner.METHOD_VERSION
+        self.CPU_BOUND = inner.CPU_BOUND
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache_path(self) -> str:
+        path = getattr(self.store, "path", None)
+        return str(path) if path is not None else type(self.store).__name__
+
+    def cache_params(self) -> Dict[str, Any]:
+        return self.inner.cache_params()
+
+    def close(self) -> None:
+        # the store is shared with the other strategies and stays open
+        self.inner.close()
+
+    def infer(self, policy_text: str) -> ResultRecord:
+        return self.infer_batch([policy_text])[0]
+
+    def infer_batch(self, policy_texts: List[str], text_shas: Optional[List[str]] = None) -> List[ResultRecord]:
+        if text_shas is None:
+            text_shas = [sha256_text(t) for t in policy_texts]
+
+        params = self.inner.cache_params()
+        keys = [make_cache_key(method=self.METHOD_NAME, policy_text_sha=sha, params=params) for sha in text_shas]
+        found: Dict[str, Dict[str, Any]] = {}
+        packed: Dict[str, ResultPack] = {}
+        if self.packs:
+            with span("pack_lookup"):
+                for pack in self.packs:
+                    hits = pack.get_many(k for k in dict.fromkeys(keys) if k not in found)
+                    found.update(hits)
+                    packed.update(dict.fromkeys(hits, pack))
+                    if len(found) == len(set(keys)):
+                        break
+        with span("cache_lookup"):
+            found.update(self.store.get_many(k for k in dict.fromkeys(keys) if k not in found))
+
+        refreshed: Dict[str, Dict[str, Any]] = {}
+        previous_params = self.inner.previous_cache_params()
+        if previous_params is not None and len(found) < len(keys):
+            with span("cache_refresh"):
+                refreshed = self._refresh_previous(keys, policy_texts, text_shas, found, previous_params)
+            found.update(refreshed)
+
+        reused: Dict[str, Dict[str, Any]] = {}
+        if self.near_dup is not None and len(found) < len(keys):
+            with span("near_dup_lookup"):
+                reused = self._reuse_near_duplicates(keys, policy_texts, text_shas, found, params)
+            found.update(reused)
+
+        owned: Dict[str, List[int]] = {}  # keys this call computes
+        waiting: Dict[str, List[int]] = {}  # keys another caller is already computing
+        waiting_futures: Dict[str, Future] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in found:
+                    continue
+                if key in owned:
+                    owned[key].append(i)
+                elif key in waiting:
+                    waiting[key].append(i)
+                elif key in self._inflight:
+                    waiting[key] = [i]
+                    waiting_futures[key] = self._inflight[key]
+                else:
+                    owned[key] = [i]
+                    self._inflight[key] = Future()
+
+        results: List[Optional[ResultRecord]] = [None] * len(policy_texts)
+        for i, key in enumerate(keys):
+            if key in found:
+                # cached is an InferenceResult-shaped dict; rebuilt without validation
+                hit = key not in refreshed and key not in reused
+                results[i] = self._annotate(ResultRecord.from_dict(found[key]), key, cache_hit=hit)
+                if key in refreshed:
+                    results[i].audit.parameters["cache_refreshed"] = True
+                if key in packed:
+                    results[i].audit.parameters["cache_path"] = str(packed[key].artifact_dir)
+                    results[i].audit.parameters["result_pack"] = packed[key].name
+
+        if owned:
+            self._compute_owned(owned, policy_texts, text_shas, results)
+
+        for key, idxs in waiting.items():
+            dumped = waiting_futures[key].result()
+            for i in idxs:
+                result = self._annotate(ResultRecord.from_dict(dumped), key, cache_hit=False)
+                result.audit.parameters["inflight_shared"] = True
+                results[i] = result
+
+        return results
+
+    def infer_source(self, source: TextSource) -> ResultRecord:
+        """
+        The cache around inner.infer_source: the key comes from the source's streamed
+        sha256, and a miss is computed from the source, so streaming methods never
+        hold the whole document. Near-duplicate reuse and lazy refresh need the full
+        text and are not attempted.
+        """
+        key = make_cache_key(method=self.METHOD_NAME, policy_text_sha=source.sha256(), params=self.inner.cache_params())
+        with span("pack_lookup"):
+            for pack in self.packs:
+                cached = pack.get_many([key]).get(key)
+                if cached is not None:
+                    result = self._annotate(ResultRecord.from_dict(cached), key, cache_hit=True)
+                    result.audit.parameters["cache_path"] = str(pack.artifact_dir)
+                    result.audit.parameters["result_pack"] = pack.name
+                    return result
+        with span("cache_lookup"):
+            cached = self.store.get(key)
+        if cached is not None:
+            return self._annotate(ResultRecord.from_dict(cached), key, cache_hit=True)
+
+        result = self.inner.infer_source(source)
+        with span("cache_write"):
+            self.store.put(key, result.to_dict())
+        return self._annotate(result, key, cache_hit=False)
+
+    def _refresh_previous(
+        self,
+        keys: List[str],
+        policy_texts: List[str],
+        text_shas: List[str],
+        found: Dict[str, Dict[str, Any]],
+        previous_params: Dict[str, Any],
+    ) -> Dict[str, Dict[str, Any]]:
+        firsts: Dict[str, int] = {}
+        for i, key in enumerate(keys):
+            if key not in found and key not in firsts:
+                firsts[key] = i
+        previous_keys = {
+            key: make_cache_key(method=self.METHOD_NAME, policy_text_sha=text_shas[i], params=previous_params)
+            for key, i in firsts.items()
+        }
+        stale = self.store.get_many(previous_keys.values())
+        todo = [key for key in firsts if previous_keys[key] in stale]
+        if not todo:
+            return {}
+
+        updated = self.inner.refresh_cached(
+            [policy_texts[firsts[key]] for key in todo],
+            [ResultRecord.from_dict(stale[previous_keys[key]]) for key in todo],
+        )
+        writes = {key: result.to_dict() for key, result in zip(todo, updated) if result is not None}
+        if writes:
+            with span("cache_write"):
+                self.store.put_many(writes)
+        return writes
+
+    def _reuse_near_duplicates(
+        self,
+        keys: List[str],
+        policy_texts: List[str],
+        text_shas: List[str],
+        found: Dict[str, Dict[str, Any]],
+        params: Dict[str, Any],
+    ) -> Dict[str, Dict[str, Any]]:
+        matches: Dict[str, List[Tuple[str, float]]] = {}
+        for i, key in enumerate(keys):
+            if key not in found and key not in matches:
+                matches[key] = self.near_dup.query(text_shas[i], policy_texts[i])
+
+        candidate_keys = {
+            sha: make_cache_key(method=self.METHOD_NAME, policy_text_sha=sha, params=params)
+            for candidates in matches.values()
+            for sha, _ in candidates
+        }
+        if not candidate_keys:
+            return {}
+        cached = self.store.get_many(candidate_keys.values())
+
+        out: Dict[str, Dict[str, Any]] = {}
+        for key, candidates in matches.items():
+            # best first: reuse the most similar text that has a result for these params
+            for sha, sim in candidates:
+                source = cached.get(candidate_keys[sha])
+                if source is None:
+                    continue
+                reused = ResultRecord.from_dict(source)
+                for code in reused.inferred_codes:
+                    code.details = _without_offsets(code.details)
+                reused.audit.parameters["near_duplicate"] = {"text_sha": sha, "similarity": round(sim, 4)}
+                # not written to the store: the key belongs to this text, the result to another
+                out[key] = reused.to_dict()
+                break
+        return out
+
+    def _compute_owned(
+        self,
+        owned: Dict[str, List[int]],
+        policy_texts: List[str],
+        text_shas: List[str],
+        results: List[Optional[ResultRecord]],
+    ) -> None:
+        firsts = [idxs[0] for idxs in owned.values()]
+        writes: Dict[str, Dict[str, Any]] = {}
+        error: Optional[BaseException] = None
+        try:
+            computed = self.inner.infer_batch([policy_texts[i] for i in firsts], [text_shas[i] for i in firsts])
+            if len(computed) != len(owned):
+                raise RuntimeError(f"{self.METHOD_NAME} returned {len(computed)} results for {len(owned)} texts")
+
+            for (key, idxs), result in zip(owned.items(), computed):
+                writes[key] = result.to_dict()
+                results[idxs[0]] = self._annotate(result, key, cache_hit=False)
+                # exact duplicates inside this batch share the single computation
+                for i in idxs[1:]:
+                    results[i] = self._annotate(ResultRecord.from_dict(writes[key]), key, cache_hit=False)
+
+            # write-through cache
+            with span("cache_write"):
+                self.store.put_many(writes)
+            if self.near_dup is not None:
+                with span("near_dup_index"):
+                    self.near_dup.add_many((text_shas[i], policy_texts[i]) for i in firsts)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # every owned key is resolved, so concurrent callers waiting on it never block;
+            # a result computed before a failed cache write is still handed to them
+            with self._lock:
+                for key in owned:
+                    fut = self._inflight.pop(key)
+                    if key in writes:
+                        fut.set_result(writes[key])
+                    else:
+                        fut.set_exception(error)
+
+    def _annotate(self, result: ResultRecord, cache_key: str, cache_hit: bool) -> ResultRecord:
+        result.audit.parameters["cache_hit"] = cache_hit
+        result.audit.parameters["cached_result_key"] = cache_key
+        result.audit.parameters["cache_path"] = self.cache_path
+        return result
+
+
+def _without_offsets(details: Any) -> Any:
+    # "passage_offsets=..." (lexical, rag) and "mentions=...; offsets=..." (regex) describe the source text
+    if not isinstance(details, str):
+        return details
+    return "; ".join(p for p in details.split("; ") if not p.startswith(("passage_offsets=", "mentions=", "offsets=")))
@@ -1,157 +1,419 @@
 # src/services/inference/methods/lexical_inference.py
 from __future__ import annotations
 
-import json
 from pathlib import Path
-from typing import Any, Dict, Optional, List
-import pandas as pd
+from typing import Any, Dict, Iterator, Optional, List, Tuple
+import numpy as np
 
 from src.services.inference.methods.base import InferenceMethod
-from src.models.schemas import InferenceResult, InferredCode, Justification, Audit, now_iso
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from src.utils.cache import make_cache_key, sha256_file, normalize_text
+from src.services.inference.index.tfidf_index import TfidfIndex
+from src.models.records import AuditRecord, CodeRecord, ResultRecord
+from src.models.schemas import now_iso
+from src.utils.cache import sha256_file, normalize_text
+from src.utils.metrics import span
+from src.utils.passages import iter_passages, iter_passages_chunks
+from src.utils.streams import batched
+from src.utils.text_source import TextSource
 
 
 class LexInference(InferenceMethod):
     """
-    Lexical inference (stub scoring for now) + JSON-file caching.
-    Cache format:
-      {
-        "version": "v1",
-        "entries": {
-           "<cache_key>": { ...InferenceResult dict... }
-        }
-      }
+    Lexical inference: TF-IDF cosine between policy text and code descriptions.
+
+    Long policies are scored per passage: the text is split into overlapping
+    passages (passage_chars / passage_overlap), passages are scored against the
+    index in fixed-size blocks, and scores are aggregated per code with "max" or
+    "topn_mean". passage_chars=0 scores the whole document as one vector.
+
+    With an incrementally updated index (TfidfIndex.update), results cached for the
+    previous code table are refreshed by scoring the text against the appended rows
+    only (refresh_cached), since rows of unchanged codes score exactly as before.
+
+    code_tables adds code systems next to HCPCS (hcpcs_path), e.g. {"CPT": ..., "ICD10": ...}.
+    Each table has its own index; all are scored together and each system contributes
+    up to top_k codes tagged with its code_system. Indexes are scored code_block rows at
+    a time and only each block's top-k is kept, so the dense score state is bounded by
+    code_block rather than by table size. hashing_features > 0 builds the indexes with
+    hashed features and precomputed idf instead of a vocabulary (HashingTfidfVectorizer).
     """
 
+    CODE_SYSTEMS = ("HCPCS", "CPT", "ICD10")
+
     METHOD_NAME = "lexical"
-    METHOD_VERSION = "v1"
+    METHOD_VERSION = "v2"
+    AGGREGATES = ("max", "topn_mean")
+    CPU_BOUND = True
 
     def __init__(
         self,
-        cache_path: str | Path = "src/tests/cache/cached_results.json",
         hcpcs_path: str | Path = "src/tests/inputs/hcpcs.csv",
         top_k: int = 5,
         threshold: float = 0.25,
+        index_dir: str | Path = "src/tests/cache/index",
+        index: Optional[TfidfIndex] = None,
+        passage_chars: int = 2000,
+        passage_overlap: int = 200,
+        aggregate: str = "max",
+        top_n: int = 3,
+        passage_batch: int = 256,
+        doc_batch: int = 64,
+        code_tables: Optional[Dict[str, str | Path]] = None,
+        hashing_features: int = 0,
+        code_block: int = 8192,
     ):
-        self.cache_path = Path(cache_path)
+        if aggregate not in self.AGGREGATES:
+            raise ValueError(f"aggregate must be one of {self.AGGREGATES}, got {aggregate!r}")
+        for system in code_tables or {}:
+            if system not in self.CODE_SYSTEMS[1:]:
+                raise ValueError(f"code_tables keys must be in {self.CODE_SYSTEMS[1:]}, got {system!r}")
+
         self.hcpcs_path = Path(hcpcs_path)
         self.top_k = top_k
         self.threshold = threshold
-        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.passage_chars = passage_chars
+        self.passage_overlap = passage_overlap
+        self.aggregate = aggregate
+        self.top_n = top_n
+        self.passage_batch = passage_batch
+        self.doc_batch = doc_batch
+        self.hashing_features = hashing_features
+        self.code_block = max(1, code_block)
+
+        self._hcpcs_sha = sha256_file(self.hcpcs_path)
+
+        # fitted TF-IDF index: memory-mapped artifact keyed by hcpcs_sha, built on first use
+        if index is None:
+            index = TfidfIndex.load_or_build(
+                self.hcpcs_path, index_dir, source_sha=self._hcpcs_sha, n_features=hashing_features
+            )
+        self._index = index
+        self._codes = index.codes
+        self._descs = index.descs
+        self._vectorizer = index.vectorizer
+        self._X = index.X
 
-        # load hcpcs table once (v1)
-        self._hcpcs_df = pd.read_csv(self.hcpcs_path)
-        if "code" not in self._hcpcs_df.columns or "description" not in self._hcpcs_df.columns:
-            raise ValueError("hcpcs.csv must have columns: code, description")
+        # (code_system, index) in scoring order; HCPCS first
+        self._systems: List[Tuple[str, TfidfIndex]] = [("HCPCS", index)]
+        self._table_shas: Dict[str, str] = {}
+        for system, path in (code_tables or {}).items():
+            sha = sha256_file(path)
+            self._table_shas[system] = sha
+            self._systems.append(
+                (system, TfidfIndex.load_or_build(path, index_dir, source_sha=sha, n_features=hashing_features))
+            )
+        self._by_system = dict(self._systems)
 
-        self._codes = self._hcpcs_df["code"].astype(str).tolist()
-        self._descs = self._hcpcs_df["description"].astype(str).tolist()
+    def infer(self, policy_text: str) -> ResultRecord:
+        return self.infer_batch([policy_text])[0]
 
-        # build TF-IDF index once (v1)
-        self._vectorizer = TfidfVectorizer(stop_words="english", ngram_range=(1, 2), min_df=1)
-        self._X = self._vectorizer.fit_transform([normalize_text(d) for d in self._descs])
+    def infer_batch(self, policy_texts: List[str], text_shas: Optional[List[str]] = None) -> List[ResultRecord]:
+        """
+        Batch entry point: one vectorizer pass over all texts. Result caching is
+        handled uniformly by CachedInference (see methods/cached.py).
+        """
+        return self._compute_batch(policy_texts)
 
-        self._hcpcs_sha = sha256_file(self.hcpcs_path)
+    def infer_source(self, source: TextSource) -> ResultRecord:
+        if not self.passage_chars:
+            # whole-document scoring normalizes the full text
+            return super().infer_source(source)
+        # passages are cut from the source's chunks as they are scored
+        return self._compute_batch([source])[0]
+
+    def cache_params(self) -> Dict[str, Any]:
+        return self._params()
+
+    def _compute(self, policy_text: str) -> ResultRecord:
+        return self._compute_batch([policy_text])[0]
 
-    def infer(self, policy_text: str) -> InferenceResult:
-        params = {
+    def _params(self) -> Dict[str, Any]:
+        params: Dict[str, Any] = {
             "method_version": self.METHOD_VERSION,
             "top_k": self.top_k,
             "threshold": self.threshold,
             "hcpcs_sha": self._hcpcs_sha,
         }
-        cache_key = make_cache_key(method=self.METHOD_NAME, policy_text=policy_text, params=params)
+        if self._table_shas:
+            params["code_tables"] = dict(self._table_shas)
+        if self.hashing_features:
+            params["hashing_features"] = self.hashing_features
+        if self._index.is_incremental:
+            # frozen vocabulary / idf score differently from a full fit of the same table
+            params["index_fit_sha"] = self._index.fit_sha
+        if self.passage_chars:
+            params["passages"] = {
+                "passage_chars": self.passage_chars,
+                "passage_overlap": self.passage_overlap,
+                "aggregate": self.aggregate,
+                "top_n": self.top_n if self.aggregate == "topn_mean" else None,
+            }
+        return params
+
+    def previous_cache_params(self) -> Optional[Dict[str, Any]]:
+        delta = self._index.delta
+        if not delta:
+            return None
+        params = self._params()
+        params["hcpcs_sha"] = delta["base_sha"]
+        if delta["base_sha"] == self._index.fit_sha:
+            # the previous generation was the full fit itself
+            params.pop("index_fit_sha", None)
+        return params
+
+    def refresh_cached(self, policy_texts: List[str], cached: List[ResultRecord]) -> List[Optional[ResultRecord]]:
+        """
+        Bring results cached for the previous code table up to date without rescoring
+        every code: kept codes stay as cached, and only the appended rows (added and
+        changed codes) are scored and merged in. A result that contains a removed or
+        changed code returns None, because the code ranked just below it is unknown.
+        Codes of other code systems are kept as cached; their tables are unchanged.
+        """
+        delta = self._index.delta
+        dropped = set(delta["removed"]) | set(delta["changed"])
+        out: List[Optional[ResultRecord]] = [None] * len(policy_texts)
+        todo = [
+            d for d, r in enumerate(cached)
+            if not any(ic.code in dropped and ic.code_system == "HCPCS" for ic in r.inferred_codes)
+        ]
+        if not todo:
+            return out
+
+        first = delta["first_appended_row"]
+        X_new = self._X[first:]
+        for lo in range(0, len(todo), self.doc_batch):
+            group = todo[lo:lo + self.doc_batch]
+            texts = [policy_texts[d] for d in group]
+            if X_new.shape[0] == 0:
+                sims, starts, ends = np.zeros((len(group), 0)), None, None
+            elif self.passage_chars:
+                sims, starts, ends = self._passage_scores(texts, X_new)
+            else:
+                sims, starts, ends = self._document_scores(texts, X_new), None, None
+
+            with span("top_k"):
+                for g, d in enumerate(group):
+                    codes = cached[d].inferred_codes
+                    candidates = [(ic.confidence, ic) for ic in codes if ic.code_system == "HCPCS"]
+                    for j in np.flatnonzero(sims[g] >= self.threshold).tolist():
+                        offsets = None if starts is None else (int(starts[g, j]), int(ends[g, j]))
+                        score = float(sims[g, j])
+                        candidates.append((score, self._inferred_code(first + j, score, offsets)))
+                    candidates.sort(key=lambda c: -c[0])
+                    inferred = [ic for _, ic in candidates[:self.top_k]]
+                    others = [ic for ic in codes if ic.code_system != "HCPCS"]
+                    if others:
+                        inferred = sorted(inferred + others, key=lambda ic: -ic.confidence)
+                    out[d] = ResultRecord(
+                        inferred,
+                        self._audit(refreshed_from=delta["base_sha"], rescored_codes=int(X_new.shape[0])),
+                    )
+        return out
 
-        store = self._load_cache_store()
-        cached = store["entries"].get(cache_key)
+    def _compute_batch(self, policy_texts: List[str]) -> List[ResultRecord]:
+        results: List[ResultRecord] = []
+        # documents are scored in groups so the per-code state stays bounded
+        for lo in range(0, len(policy_texts), self.doc_batch):
+            group = policy_texts[lo:lo + self.doc_batch]
+            per_system = [(system, self._system_top_k(group, index)) for system, index in self._systems]
 
-        if cached is not None:
-            # cached is already an InferenceResult-like dict -> rebuild Pydantic model
-            result = InferenceResult(**cached)
-            # annotate audit
-            result.audit.parameters["cache_hit"] = True
-            result.audit.parameters["cached_result_key"] = cache_key
-            result.audit.parameters["cache_path"] = str(self.cache_path)
-            return result
+            for d in range(len(group)):
+                inferred: List[CodeRecord] = []
+                for system, (top_idx, top_scores, starts, ends) in per_system:
+                    spans = None if starts is None else (starts[d], ends[d])
+                    inferred.extend(self._codes_above_threshold(top_idx[d], top_scores[d], spans, system))
+                if len(per_system) > 1:
+                    inferred.sort(key=lambda ic: -ic.confidence)
+                results.append(ResultRecord(inferred, self._audit()))
 
-        # Cache miss: compute
-        result = self._compute(policy_text)
+        return results
 
-        # annotate audit for miss
-        result.audit.parameters["cache_hit"] = False
-        result.audit.parameters["cached_result_key"] = cache_key
-        result.audit.parameters["cache_path"] = str(self.cache_path)
+    def _system_top_k(self, policy_texts: List[str], index: TfidfIndex):
+        """
+        Top-k rows of one index per document, as (top_idx, top_scores, starts, ends);
+        starts / ends are the best passage's offsets per selected code (None without
+        passages). The index is scored code_block rows at a time and the blocks' top-k
+        are merged, so no (docs x codes) matrix of the whole table is materialised.
+        """
+        X = index.X
+        n_codes = X.shape[0]
+        n_blocks = max(1, -(-n_codes // self.code_block))
 
-        # write-through cache
-        store["entries"][cache_key] = result.model_dump()
-        self._save_cache_store(store)
+        if self.passage_chars:
+            passages = self._vectorized_passages(policy_texts, index.vectorizer)
+            if n_blocks > 1:
+                # vectorized once, scored against every code block
+                passages = list(passages)
+        else:
+            Q = self._document_vectors(policy_texts, index.vectorizer)
 
-        return result
+        parts = []
+        for b in range(n_blocks):
+            c0 = b * self.code_block
+            Xb = X if n_blocks == 1 else X[c0:c0 + self.code_block]
+            if self.passage_chars:
+                sims, starts, ends = self._passage_scores(policy_texts, Xb, passages)
+            else:
+                sims, starts, ends = self._document_scores(policy_texts, Xb, Q), None, None
+            with span("top_k"):
+                idx, scores = self._top_k(sims)
+            if starts is not None:
+                starts, ends = np.take_along_axis(starts, idx, axis=1), np.take_along_axis(ends, idx, axis=1)
+            parts.append((idx + c0, scores, starts, ends))
 
-    def _compute(self, policy_text: str) -> InferenceResult:
-        text = normalize_text(policy_text)
-        q = self._vectorizer.transform([text])
-        sims = cosine_similarity(q, self._X).ravel()  # shape: (num_codes,)
+        if len(parts) == 1:
+            return parts[0]
 
-        # get top candidates
-        top_idx = sims.argsort()[::-1][: self.top_k]
+        with span("top_k"):
+            idx = np.hstack([p[0] for p in parts])
+            sel, scores = self._top_k(np.hstack([p[1] for p in parts]))
+            if parts[0][2] is None:
+                return np.take_along_axis(idx, sel, axis=1), scores, None, None
+            starts = np.take_along_axis(np.hstack([p[2] for p in parts]), sel, axis=1)
+            ends = np.take_along_axis(np.hstack([p[3] for p in parts]), sel, axis=1)
+            return np.take_along_axis(idx, sel, axis=1), scores, starts, ends
 
-        inferred: List[InferredCode] = []
-        for i in top_idx:
-            score = float(sims[i])
+    def _document_vectors(self, policy_texts: List[str], vectorizer=None):
+        vectorizer = self._vectorizer if vectorizer is None else vectorizer
+        with span("normalize"):
+            texts = [normalize_text(t) for t in policy_texts]
+        with span("vectorize"):
+            return vectorizer.transform(texts)
+
+    def _document_scores(self, policy_texts: List[str], X=None, Q=None) -> np.ndarray:
+        X = self._X if X is None else X
+        Q = self._document_vectors(policy_texts) if Q is None else Q
+        with span("similarity"):
+            # TF-IDF rows are L2-normalised, so the sparse dot product is the cosine similarity
+            return (Q @ X.T).toarray()  # shape: (num_docs, num_codes)
+
+    def _passage_scores(
+        self, policy_texts: List[str], X=None, passages=None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Stream passages of every document through the index passage_batch at a time.
+        Returns per-document aggregated scores (num_docs, num_codes) and the offsets of
+        the best-scoring passage per code. Memory is O(num_docs * num_codes), independent
+        of document length. X defaults to the whole index; refresh_cached and blocked
+        scoring pass a row slice, the latter with the passages already vectorized.
+        """
+        X = self._X if X is None else X
+        if passages is None:
+            passages = self._vectorized_passages(policy_texts, self._vectorizer)
+        n_docs, n_codes = len(policy_texts), X.shape[0]
+        best = np.zeros((n_docs, n_codes))
+        best_start = np.zeros((n_docs, n_codes), dtype=np.int64)
+        best_end = np.zeros((n_docs, n_codes), dtype=np.int64)
+        counts = np.zeros(n_docs, dtype=np.int64)
+        topn = np.zeros((n_docs, self.top_n, n_codes)) if self.aggregate == "topn_mean" else None
+        cols = np.arange(n_codes)
+
+        for doc_ids, starts, ends, Q in passages:
+            with span("similarity"):
+                S = (Q @ X.T).toarray()  # shape: (num_passages_in_block, num_codes)
+
+            # passages of one document are contiguous in the stream
+            cuts = np.flatnonzero(np.diff(doc_ids)) + 1
+            with span("aggregate"):
+                for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(doc_ids)]):
+                    d = doc_ids[lo]
+                    seg = S[lo:hi]
+                    am = seg.argmax(axis=0)
+                    m = seg[am, cols]
+                    improve = m > best[d]
+                    best[d, improve] = m[improve]
+                    best_start[d, improve] = starts[lo + am[improve]]
+                    best_end[d, improve] = ends[lo + am[improve]]
+                    counts[d] += hi - lo
+
+                    if topn is not None:
+                        stacked = np.vstack([topn[d], seg])
+                        topn[d] = np.partition(stacked, -self.top_n, axis=0)[-self.top_n:]
+
+        if topn is None:
+            return best, best_start, best_end
+
+        # scores are >= 0, so zero padding leaves the sum of the real top-n intact
+        denom = np.maximum(1, np.minimum(counts, self.top_n))[:, None]
+        return topn.sum(axis=1) / denom, best_start, best_end
+
+    def _vectorized_passages(self, policy_texts: List[str], vectorizer) -> Iterator[Tuple[Any, Any, Any, Any]]:
+        """Passage blocks as (doc_ids, starts, ends, Q), Q being the passages' TF-IDF rows."""
+        for block in batched(self._iter_passages(policy_texts), self.passage_batch):
+            doc_ids = np.fromiter((b[0] for b in block), dtype=np.int64, count=len(block))
+            starts = np.fromiter((b[1] for b in block), dtype=np.int64, count=len(block))
+            ends = np.fromiter((b[2] for b in block), dtype=np.int64, count=len(block))
+
+            with span("normalize"):
+                passages = [normalize_text(b[3]) for b in block]
+            with span("vectorize"):
+                Q = vectorizer.transform(passages)
+            yield doc_ids, starts, ends, Q
+
+    def _iter_passages(self, policy_texts: List[str | TextSource]) -> Iterator[Tuple[int, int, int, str]]:
+        for d, text in enumerate(policy_texts):
+            if isinstance(text, TextSource):
+                passages = iter_passages_chunks(text.iter_chunks(), self.passage_chars, self.passage_overlap)
+            else:
+                passages = iter_passages(text, self.passage_chars, self.passage_overlap)
+            for start, end, passage in passages:
+                yield d, start, end, passage
+
+    def _top_k(self, sims: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized top-k per row: argpartition to the k best, then sort only those k.
+        """
+        k = min(self.top_k, sims.shape[1])
+        if k <= 0:
+            empty = np.empty((sims.shape[0], 0), dtype=np.intp)
+            return empty, empty.astype(sims.dtype)
+
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(sims, part, axis=1)
+        order = np.argsort(-part_scores, axis=1, kind="stable")
+        return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+    def _codes_above_threshold(
+        self,
+        top_idx: np.ndarray,
+        top_scores: np.ndarray,
+        spans: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+        system: str = "HCPCS",
+    ) -> List[CodeRecord]:
+        inferred: List[CodeRecord] = []
+        for rank, (i, score) in enumerate(zip(top_idx.tolist(), top_scores.tolist())):
             if score < self.threshold:
                 continue
+            offsets = None if spans is None else (int(spans[0][rank]), int(spans[1][rank]))
+            inferred.append(self._inferred_code(i, score, offsets, system))
+        return inferred
 
-            # confidence mapping: keep it simple and monotonic
-            # (cosine similarity is already 0..1 for TF-IDF cosine)
-            confidence = max(0.0, min(1.0, score))
-
-            inferred.append(
-                InferredCode(
-                    code=str(self._codes[i]),
-                    confidence=confidence,
-                    justification=Justification(
-                        reason="Lexical similarity between policy text and HCPCS description.",
-                        details=f"score={score:.4f}; matched_description={self._descs[i][:200]}"
-                    ),
-                )
-            )
+    def _inferred_code(
+        self, i: int, score: float, offsets: Optional[Tuple[int, int]] = None, system: str = "HCPCS"
+    ) -> CodeRecord:
+        index = self._by_system[system]
+        details = f"score={score:.4f}; matched_description={index.descs[i][:200]}"
+        if offsets is not None:
+            details += f"; passage_offsets={offsets[0]}-{offsets[1]}"
+
+        # confidence mapping: keep it simple and monotonic
+        # (cosine similarity is already 0..1 for TF-IDF cosine)
+        confidence = max(0.0, min(1.0, score))
+
+        return CodeRecord(
+            str(index.codes[i]),
+            confidence,
+            f"Lexical similarity between policy text and {system} description.",
+            details,
+            code_system=system,
+        )
 
-        audit = Audit(
-            timestamp=now_iso(),
-            method=self.METHOD_NAME,
-            parameters={
-                "method_version": self.METHOD_VERSION,
-                "top_k": self.top_k,
-                "threshold": self.threshold,
-                "hcpcs_sha": self._hcpcs_sha,
+    def _audit(self, **extra: Any) -> AuditRecord:
+        return AuditRecord(
+            now_iso(),
+            self.METHOD_NAME,
+            {
+                **self._params(),
                 "vectorizer": {"ngram_range": [1, 2], "stop_words": "english"},
+                **extra,
             },
         )
-        return InferenceResult(inferred_codes=inferred, audit=audit)
-
-    def _load_cache_store(self) -> Dict[str, Any]:
-        if not self.cache_path.exists():
-            return {"version": "v1", "entries": {}}
-
-        try:
-            with self.cache_path.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-            if not isinstance(data, dict):
-                return {"version": "v1", "entries": {}}
-            data.setdefault("version", "v1")
-            data.setdefault("entries", {})
-            if not isinstance(data["entries"], dict):
-                data["entries"] = {}
-            return data
-        except json.JSONDecodeError:
-            # If file is corrupted, don't crash the pipeline
-            return {"version": "v1", "entries": {}}
-
-    def _save_cache_store(self, store: Dict[str, Any]) -> None:
-        tmp = self.cache_path.with_suffix(self.cache_path.suffix + ".tmp")
-        with tmp.open("w", encoding="utf-8") as f:
-            json.dump(store, f, indent=2)
-        tmp.replace(self.cache_path)
\ No newline at end of file
@@ -1,46 +1,93 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 from src.services.inference.methods.base import InferenceMethod
 from src.services.llm.client import LLMClient
-from src.models.schemas import InferenceResult, InferredCode, Justification, Audit, now_iso
+from src.services.llm.prompt import PromptSelector
+from src.models.records import AuditRecord, CodeRecord, ResultRecord
+from src.models.schemas import now_iso
+from src.utils.metrics import REGISTRY, span
 
 class LLMInference(InferenceMethod):
-    def __init__(self, endpoint: str | None = None):
+    METHOD_NAME = "llm"
+    METHOD_VERSION = "v1"
+
+    def __init__(
+        self,
+        endpoint: str | None = None,
+        model: str | None = None,
+        prompt: Optional[PromptSelector] = None,
+        **client_options: Any,
+    ):
         self.endpoint = endpoint or "mock"
-        self.llm_client = LLMClient(endpoint=self.endpoint)
-
-    def infer(self, policy_text: str) -> InferenceResult:
-        response = self.llm_client.query(policy_text)
-        return self._to_result(response)
-
-    def _to_result(self, response: Dict[str, Any]) -> InferenceResult:
-        codes = []
-        for c in response.get("codes", []):
-            # if justification comes back as a string, normalize it to Justification
-            justification = c.get("justification", "")
-            if isinstance(justification, str):
-                just_obj = Justification(reason=justification)
-            else:
-                # if you later return {reason, details}
-                just_obj = Justification(**justification)
-
-            codes.append(
-                InferredCode(
-                    code=c["code"],
-                    confidence=float(c["confidence"]),
-                    justification=just_obj
-                )
-            )
-
-        audit = Audit(
-            timestamp=response.get("timestamp") or now_iso(),
-            method="llm",
-            parameters={
-                "endpoint": self.endpoint,
-                "model": response.get("model", "unknown"),
-                "mode": "mock" if self.endpoint == "mock" else "remote",
-            },
-        )
-
-        return InferenceResult(inferred_codes=codes, audit=audit)
\ No newline at end of file
+        # the model behind the endpoint; part of the cache key so a model swap invalidates results
+        self.model = model or ("mock-llm-v1" if self.endpoint == "mock" else "default")
+        # prompt: passage selection under a size budget; None sends every policy in full
+        self.prompt = prompt
+        # client_options: timeout_s, max_concurrency, max_retries, batch_size (see LLMClient)
+        self.llm_client = LLMClient(endpoint=self.endpoint, **client_options)
+
+    def infer(self, policy_text: str) -> ResultRecord:
+        return self.infer_batch([policy_text])[0]
+
+    def infer_batch(self, policy_texts: List[str], text_shas: Optional[List[str]] = None) -> List[ResultRecord]:
+        with span("llm_prompt_select"):
+            selections = [self._select(t) for t in policy_texts]
+        prompts = [p for ps, _ in selections for p in ps]
+
+        # one concurrent (and optionally micro-batched) round-trip for the whole batch
+        with span("llm_round_trip"):
+            responses = self.llm_client.query_many(prompts)
+
+        results, i = [], 0
+        for ps, stats in selections:
+            results.append(self._to_result(responses[i:i + len(ps)], stats))
+            i += len(ps)
+        return results
+
+    def close(self) -> None:
+        self.llm_client.close()
+
+    def cache_params(self) -> Dict[str, Any]:
+        params = {"method_version": self.METHOD_VERSION, "endpoint": self.endpoint, "model": self.model}
+        if self.prompt is not None:
+            params["prompt"] = self.prompt.params()
+        return params
+
+    def _select(self, policy_text: str) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+        if self.prompt is None:
+            return [policy_text], None
+        prompts, stats = self.prompt.select(policy_text)
+        REGISTRY.inc("llm_prompt_chars_in_total", stats["chars_in"], help="Policy characters given to the LLM method.")
+        REGISTRY.inc("llm_prompt_chars_sent_total", stats["chars_sent"], help="Prompt characters sent to the LLM.")
+        return prompts, stats
+
+    def _to_result(
+        self, responses: List[Dict[str, Any]], prompt_stats: Optional[Dict[str, Any]] = None
+    ) -> ResultRecord:
+        # several prompts for one policy: a code keeps its most confident answer
+        best: Dict[str, CodeRecord] = {}
+        for response in responses:
+            for c in response.get("codes", []):
+                # justification comes back as a string, or as {reason, details}
+                justification = c.get("justification", "")
+                if isinstance(justification, str):
+                    reason, details = justification, None
+                else:
+                    reason, details = str(justification["reason"]), justification.get("details")
+
+                code = CodeRecord(str(c["code"]), float(c["confidence"]), reason, details)
+                if code.code not in best or code.confidence > best[code.code].confidence:
+                    best[code.code] = code
+
+        first = responses[0]
+        parameters = {
+            "endpoint": self.endpoint,
+            "model": first.get("model", "unknown"),
+            "mode": "mock" if self.endpoint == "mock" else "remote",
+        }
+        if prompt_stats is not None:
+            parameters["prompt"] = prompt_stats
+        audit = AuditRecord(first.get("timestamp") or now_iso(), self.METHOD_NAME, parameters)
+
+        return ResultRecord(list(best.values()), audit)
\ No newline at end of file
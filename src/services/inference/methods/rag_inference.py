@@ -1,43 +1,161 @@
 from __future__ import annotations
 
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
 from src.services.inference.methods.base import InferenceMethod
-from src.models.schemas import InferenceResult, InferredCode, Justification, Audit, now_iso
+from src.services.inference.index.dense_index import DenseIndex
+from src.services.inference.index.tfidf_index import TfidfIndex
+from src.models.records import AuditRecord, CodeRecord, ResultRecord
+from src.models.schemas import now_iso
+from src.utils.cache import sha256_file, normalize_text
+from src.utils.metrics import span
+from src.utils.passages import iter_passages
+from src.utils.streams import batched
 
 
 class RAGInference(InferenceMethod):
-    def __init__(self, top_k: int = 5, index_version: str = "mock-index-v1"):
+    """
+    Local retrieval: dense (LSA) similarity between policy passages and HCPCS descriptions.
+
+    The code table is embedded once into a persisted DenseIndex (TruncatedSVD over the
+    shared TF-IDF index). Each policy is split into passages, passages are embedded and
+    searched in blocks, and a code's score is its best passage's score.
+
+    threshold applies to the cosine similarity between passage and description. Ranking
+    and confidence use the score: the cosine times the passage's coverage, the norm of
+    its TF-IDF vector's projection onto the LSA components (at most 1). A passage about
+    things the code table does not describe has a small projection, and normalising it
+    alone makes it look close to whatever codes it leans towards (an ambulance policy
+    has cosine 0.88 against brachytherapy codes). Its codes still pass the cosine
+    threshold but get a low confidence, so they do not outrank lexical hits in the
+    orchestrator's max-merge.
+    ivf_lists > 0 enables the approximate clustered index (nprobe buckets per query).
+    """
+
+    METHOD_NAME = "rag"
+    METHOD_VERSION = "v3"
+    CPU_BOUND = True
+
+    def __init__(
+        self,
+        hcpcs_path: str | Path = "src/tests/inputs/hcpcs.csv",
+        top_k: int = 5,
+        threshold: float = 0.5,
+        index_dir: str | Path = "src/tests/cache/index",
+        n_components: int = 128,
+        ivf_lists: int = 0,
+        nprobe: int = 8,
+        passage_chars: int = 1000,
+        passage_overlap: int = 100,
+        passage_batch: int = 256,
+        index: Optional[DenseIndex] = None,
+        tfidf: Optional[TfidfIndex] = None,
+    ):
+        self.hcpcs_path = Path(hcpcs_path)
         self.top_k = top_k
-        self.index_version = index_version
-
-    def infer(self, policy_text: str) -> InferenceResult:
-        # Mocked response for demonstration purposes (replace with real retrieval later)
-        inferred = [
-            InferredCode(
-                code="A1234",
-                confidence=0.85,
-                justification=Justification(
-                    reason="Matched keywords related to service A.",
-                    details="Mock RAG hit: 'service A' found in retrieved context."
-                ),
-            ),
-            InferredCode(
-                code="B5678",
-                confidence=0.75,
-                justification=Justification(
-                    reason="Contextual relevance based on retrieved policy context.",
-                    details="Mock RAG: similarity score above threshold."
-                ),
-            ),
-        ]
-
-        audit = Audit(
-            timestamp=now_iso(),
-            method="rag",
-            parameters={
-                "top_k": self.top_k,
-                "index_version": self.index_version,
-                "mode": "mock"
+        self.threshold = threshold
+        self.nprobe = nprobe
+        self.passage_chars = passage_chars
+        self.passage_overlap = passage_overlap
+        self.passage_batch = passage_batch
+
+        # the dense index is derived from the same TF-IDF artifact the lexical method uses
+        if tfidf is None:
+            tfidf = TfidfIndex.load_or_build(self.hcpcs_path, index_dir, source_sha=sha256_file(self.hcpcs_path))
+        if index is None:
+            index = DenseIndex.load_or_build(tfidf, index_dir, n_components=n_components, ivf_lists=ivf_lists)
+        self._tfidf = tfidf
+        self._index = index
+        self._codes = tfidf.codes
+        self._descs = tfidf.descs
+
+    @property
+    def index_version(self) -> str:
+        return self._index.version
+
+    def cache_params(self) -> Dict[str, Any]:
+        return self._params()
+
+    def _params(self) -> Dict[str, Any]:
+        params: Dict[str, Any] = {
+            "method_version": self.METHOD_VERSION,
+            "top_k": self.top_k,
+            "threshold": self.threshold,
+            "index_version": self.index_version,
+            "passages": {"passage_chars": self.passage_chars, "passage_overlap": self.passage_overlap},
+        }
+        if self._index.has_ivf:
+            params["nprobe"] = self.nprobe
+        return params
+
+    def infer(self, policy_text: str) -> ResultRecord:
+        return self.infer_batch([policy_text])[0]
+
+    def infer_batch(self, policy_texts: List[str], text_shas: Optional[List[str]] = None) -> List[ResultRecord]:
+        # code -> (score, coverage, start, end) of the best passage, per document
+        best: List[Dict[int, Tuple[float, float, int, int]]] = [{} for _ in policy_texts]
+
+        for block in batched(self._iter_passages(policy_texts), self.passage_batch):
+            with span("normalize"):
+                passages = [normalize_text(b[3]) for b in block]
+            with span("vectorize"):
+                # unnormalised: search scores are cosine x coverage (see the class docstring)
+                Q = self._index.project(self._tfidf.vectorizer.transform(passages))
+                coverage = np.linalg.norm(Q, axis=1).tolist()
+            with span("similarity"):
+                # per-passage top_k is enough: a code in a document's top_k by max-over-passages
+                # is also in the top_k of its best passage
+                top_idx, top_scores = self._index.search(Q, self.top_k, nprobe=self.nprobe)
+            for (d, start, end, _), cov, idx_row, score_row in zip(
+                block, coverage, top_idx.tolist(), top_scores.tolist()
+            ):
+                doc_best = best[d]
+                for i, score in zip(idx_row, score_row):
+                    if i not in doc_best or score > doc_best[i][0]:
+                        doc_best[i] = (score, cov, start, end)
+
+        with span("top_k"):
+            return [self._to_result(doc_best) for doc_best in best]
+
+    def _iter_passages(self, policy_texts: List[str]) -> Iterator[Tuple[int, int, int, str]]:
+        for d, text in enumerate(policy_texts):
+            for start, end, passage in iter_passages(text, self.passage_chars, self.passage_overlap):
+                yield d, start, end, passage
+
+    def _to_result(self, doc_best: Dict[int, Tuple[float, float, int, int]]) -> ResultRecord:
+        ranked = sorted(doc_best.items(), key=lambda kv: (-kv[1][0], kv[0]))[:self.top_k]
+
+        inferred: List[CodeRecord] = []
+        for i, (score, cov, start, end) in ranked:
+            cosine = score / cov if cov else 0.0
+            if cosine < self.threshold:
+                continue
+            inferred.append(
+                CodeRecord(
+                    str(self._codes[i]),
+                    max(0.0, min(1.0, score)),
+                    "Retrieved by semantic similarity between a policy passage and the HCPCS description.",
+                    (
+                        f"score={score:.4f}; cosine={cosine:.4f}; coverage={cov:.4f}; "
+                        f"matched_description={self._descs[i][:200]}; "
+                        f"passage_offsets={start}-{end}"
+                    ),
+                )
+            )
+
+        audit = AuditRecord(
+            now_iso(),
+            self.METHOD_NAME,
+            {
+                **self._params(),
+                "index": {
+                    "n_components": self._index.n_components,
+                    "ivf_lists": len(self._index.ivf_centroids) if self._index.has_ivf else 0,
+                    "artifact_dir": str(self._index.artifact_dir),
+                },
             },
         )
-
-        return InferenceResult(inferred_codes=inferred, audit=audit)
\ No newline at end of file
+        return ResultRecord(inferred, audit)
@@ -1,52 +1,172 @@
+import csv
 import re
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 from src.services.inference.methods.base import InferenceMethod
-from src.models.schemas import InferenceResult, InferredCode, Justification, Audit, now_iso
+from src.models.records import AuditRecord, CodeRecord, ResultRecord
+from src.models.schemas import now_iso
+from src.utils.cache import sha256_file
+from src.utils.metrics import span
+
+if TYPE_CHECKING:
+    from src.utils.text_source import TextSource
 
 # HCPCS Level II (alpha + 4 digits) like G0008, A0428, J0120
-HCPCS_ALPHA = re.compile(r"\b([A-V][0-9]{4})\b", re.IGNORECASE)
+HCPCS_ALPHA = r"\b(?P<HCPCS>[A-V][0-9]{4})\b"
 
 # Contextual CPT: "CPT 99213"
-CPT_CONTEXT = re.compile(r"\bCPT(?:®)?\s*([0-9]{5})\b", re.IGNORECASE)
+CPT_CONTEXT = r"\bCPT(?:®)?\s*(?P<CPT>[0-9]{5})\b"
 
 # Contextual ICD-10: "ICD-10 Z00.00" / "ICD10-CM E11.9"
-ICD10_CONTEXT = re.compile(
-    r"\bICD-?10(?:-CM)?\s*([A-TV-Z][0-9][0-9A-Z](?:\.[0-9A-Z]{1,4})?)\b",
-    re.IGNORECASE,
-)
+ICD10_CONTEXT = r"\bICD-?10(?:-CM)?\s*(?P<ICD10>[A-TV-Z][0-9][0-9A-Z](?:\.[0-9A-Z]{1,4})?)\b"
+
+# one alternation, so the text is walked once; the named group that matched is the code system
+CODE_PATTERN = re.compile("|".join([CPT_CONTEXT, ICD10_CONTEXT, HCPCS_ALPHA]), re.IGNORECASE)
+
+# no match can be longer than this (barring runs of whitespace after "CPT"/"ICD-10"),
+# so a match ending this far before the end of a chunk cannot change when more text arrives
+SCAN_MARGIN = 64
+
+Hit = Tuple[str, str, int, int]  # (code_system, code, start, end)
+
+
+def scan_chunks(chunks: Iterable[str], margin: int = SCAN_MARGIN) -> Iterator[Hit]:
+    """
+    Single-pass incremental scan over a text delivered in chunks.
+
+    Matches are emitted once they end at least `margin` characters before the end of
+    the text seen so far; only the unresolved tail is carried into the next chunk,
+    so each character is scanned once plus at most `margin` characters per chunk.
+    Offsets are absolute positions in the concatenated text.
+    """
+    carry = ""
+    scan_from = 0  # where scanning resumes in carry; carry[scan_from - 1] is look-behind context
+    base = 0  # absolute offset of carry[0]
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf = carry + chunk
+        safe = len(buf) - margin
+        resume = max(scan_from, safe)
+        for m in CODE_PATTERN.finditer(buf, scan_from):
+            if m.end() > safe:
+                # may still grow or change with the next chunk: rescan it from its start
+                resume = min(resume, m.start())
+                break
+            yield _hit(m, base)
+
+        # keep one character before the resume point so \b sees the real preceding text
+        keep_from = max(0, resume - 1)
+        carry = buf[keep_from:]
+        scan_from = resume - keep_from
+        base += keep_from
+
+    for m in CODE_PATTERN.finditer(carry, scan_from):
+        yield _hit(m, base)
+
+
+def _hit(m: "re.Match[str]", base: int) -> Hit:
+    system = m.lastgroup
+    code = m.group(system).upper()
+    start, end = m.span(system)
+    return system, code, base + start, base + end
+
+
+def _table_key(code: str) -> str:
+    # code tables may or may not store the ICD-10 dot
+    return code.strip().upper().replace(".", "")
+
+
+@lru_cache(maxsize=8)
+def _load_code_set(path: str, sha: str) -> FrozenSet[str]:
+    # sha is part of the lru key so an edited table is reloaded
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        col = header.index("code") if "code" in header else 0
+        return frozenset(_table_key(row[col]) for row in reader if len(row) > col and row[col].strip())
+
 
 class RegexInference(InferenceMethod):
-    def infer(self, policy_text: str) -> InferenceResult:
-        found = []
+    """
+    Explicit code mentions, found with one combined scanner in a single pass.
 
-        for code in sorted(set(HCPCS_ALPHA.findall(policy_text))):
-            c = code.upper()
-            found.append(InferredCode(
-                code=c,
-                code_system="HCPCS",
-                confidence=1.0,
-                justification=Justification(reason=f"Explicitly mentioned in policy text: {c}")
-            ))
+    Every hit is checked against a hash set of valid codes: HCPCS against hcpcs_path,
+    CPT against cpt_path and ICD-10 against icd10_path. Hits that are not in their
+    table are dropped and counted in the audit; systems without a table are not
+    validated, so CPT and ICD-10 mentions are kept on the pattern alone unless a
+    table is configured (hcpcs_path holds only a few Level I codes and is no CPT list).
+    """
 
-        for code in sorted(set(CPT_CONTEXT.findall(policy_text))):
-            found.append(InferredCode(
-                code=code,
-                code_system="CPT",
-                confidence=1.0,
-                justification=Justification(reason=f"Explicitly mentioned in policy text: CPT {code}")
-            ))
+    METHOD_NAME = "regex"
+    METHOD_VERSION = "v2"
+    PATTERNS = ["HCPCS_ALPHA", "CPT_CONTEXT", "ICD10_CONTEXT"]
+    SYSTEM_LABELS = {"HCPCS": "", "CPT": "CPT ", "ICD10": "ICD-10 "}
+    MAX_OFFSETS = 5  # offsets listed per code in justification.details
+
+    def __init__(
+        self,
+        hcpcs_path: Optional[str | Path] = "src/tests/inputs/hcpcs.csv",
+        cpt_path: Optional[str | Path] = None,
+        icd10_path: Optional[str | Path] = None,
+        chunk_chars: int = 1 << 20,
+    ):
+        self.chunk_chars = chunk_chars
+        paths = {"HCPCS": hcpcs_path, "CPT": cpt_path, "ICD10": icd10_path}
+        self._tables: Dict[str, Tuple[str, FrozenSet[str]]] = {}
+        for system, path in paths.items():
+            if path:
+                sha = sha256_file(path)
+                self._tables[system] = (sha, _load_code_set(str(path), sha))
 
-        for code in sorted(set(ICD10_CONTEXT.findall(policy_text))):
-            c = code.upper()
-            found.append(InferredCode(
-                code=c,
-                code_system="ICD10",
-                confidence=1.0,
-                justification=Justification(reason=f"Explicitly mentioned in policy text: ICD-10 {c}")
+    def cache_params(self) -> Dict[str, Any]:
+        return {
+            "method_version": self.METHOD_VERSION,
+            "patterns": self.PATTERNS,
+            "tables": {system: sha for system, (sha, _) in self._tables.items()},
+        }
+
+    def infer(self, policy_text: str) -> ResultRecord:
+        return self.infer_chunks(
+            policy_text[i:i + self.chunk_chars] for i in range(0, len(policy_text), self.chunk_chars)
+        )
+
+    def infer_source(self, source: "TextSource") -> ResultRecord:
+        # decoded chunks come straight off the mapped file
+        return self.infer_chunks(source.iter_chunks(self.chunk_chars))
+
+    def infer_chunks(self, chunks: Iterable[str]) -> ResultRecord:
+        """Scan a document delivered incrementally (e.g. read from disk) without joining it."""
+        offsets: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+        rejected: Dict[str, int] = {}
+        with span("scan"):
+            for system, code, start, end in scan_chunks(chunks):
+                table = self._tables.get(system)
+                if table is not None and _table_key(code) not in table[1]:
+                    rejected[system] = rejected.get(system, 0) + 1
+                    continue
+                offsets.setdefault((system, code), []).append((start, end))
+
+        found = []
+        order = list(self.SYSTEM_LABELS)
+        for (system, code), spans in sorted(offsets.items(), key=lambda kv: (order.index(kv[0][0]), kv[0][1])):
+            shown = ",".join(f"{s}-{e}" for s, e in spans[:self.MAX_OFFSETS])
+            found.append(CodeRecord(
+                code,
+                1.0,
+                f"Explicitly mentioned in policy text: {self.SYSTEM_LABELS[system]}{code}",
+                f"mentions={len(spans)}; offsets={shown}",
+                code_system=system,
             ))
 
-        audit = Audit(
-            timestamp=now_iso(),
-            method="regex",
-            parameters={"patterns": ["HCPCS_ALPHA", "CPT_CONTEXT", "ICD10_CONTEXT"]},
+        audit = AuditRecord(
+            now_iso(),
+            self.METHOD_NAME,
+            {
+                "patterns": self.PATTERNS,
+                "validated": {system: system in self._tables for system in self.SYSTEM_LABELS},
+                "rejected": rejected,
+            },
         )
-        return InferenceResult(inferred_codes=found, audit=audit)
\ No newline at end of file
+        return ResultRecord(found, audit)
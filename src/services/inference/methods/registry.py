@@ -0,0 +1,49 @@
+# src/services/inference/methods/registry.py
+from __future__ import annotations
+
+import importlib
+from dataclasses import dataclass
+from typing import Dict, List, Type
+
+
+@dataclass(frozen=True)
+class MethodSpec:
+    """Where an inference method lives; its module is imported only when the method is used."""
+
+    name: str
+    module: str
+    class_name: str
+    # mirrors the class's CPU_BOUND, so executors can route the method without importing it
+    cpu_bound: bool = False
+    # rough relative cost per document; the cascade runs methods cheapest-first
+    cost: float = 1.0
+
+
+METHODS: Dict[str, MethodSpec] = {
+    spec.name: spec
+    for spec in (
+        MethodSpec("regex", "src.services.inference.methods.regex_inference", "RegexInference", cost=1.0),
+        MethodSpec(
+            "lexical", "src.services.inference.methods.lexical_inference", "LexInference", cpu_bound=True, cost=5.0
+        ),
+        MethodSpec("llm", "src.services.inference.methods.llm_inference", "LLMInference", cost=100.0),
+        MethodSpec("rag", "src.services.inference.methods.rag_inference", "RAGInference", cpu_bound=True, cost=20.0),
+    )
+}
+
+
+def method_names() -> List[str]:
+    return list(METHODS)
+
+
+def get_spec(name: str) -> MethodSpec:
+    try:
+        return METHODS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown inference method: {name}") from None
+
+
+def load_method_class(name: str) -> Type:
+    """Import the method's module (first use only; Python caches it) and return its class."""
+    spec = get_spec(name)
+    return getattr(importlib.import_module(spec.module), spec.class_name)
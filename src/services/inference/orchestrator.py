@@ -1,65 +1,572 @@
+import multiprocessing
 import os
-from dotenv import load_dotenv
-from src.models.schemas import InferenceResult, Audit, now_iso
-from src.services.inference.methods.llm_inference import LLMInference
-from src.services.inference.methods.rag_inference import RAGInference
-from src.services.inference.methods.regex_inference import RegexInference
-from src.services.inference.methods.lexical_inference import LexInference
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from src.models.records import AuditRecord, ResultRecord
+from src.models.schemas import now_iso
+from src.services.inference.cascade import CascadeRules, cascade_order
+from src.services.inference.methods.cached import CachedInference
+from src.services.inference.methods.registry import get_spec, load_method_class
+from src.utils.cache import open_cache_store, sha256_text
+from src.utils.metrics import REGISTRY, STAGE_HELP, STAGE_METRIC, collect_spans, span
+from src.utils.text_source import TextSource
+
+EXECUTORS = ("serial", "thread", "process")
 
-load_dotenv()
 
 class InferenceOrchestrator:
-    def __init__(self, methods: list[str]):
+    """
+    Runs the selected strategies over a batch of policy texts and merges their codes.
+
+    executor:
+      - "serial":  strategies run one after another in this thread
+      - "thread":  all strategies run concurrently, one daemon thread each
+      - "process": CPU-bound strategies (CPU_BOUND = True) run in a process pool,
+                   the rest in threads
+    timeouts maps method -> seconds ("*" = default) and applies to the concurrent
+    executors; a method that fails or times out contributes an empty result whose
+    audit records the status, and the other methods' results are still merged. The
+    serial executor cannot interrupt a method, so timeouts with it are a ValueError.
+
+    With use_cache, every strategy is wrapped in CachedInference over one shared
+    result store, and each text is hashed once per batch for all methods. Setting
+    NEAR_DUP_THRESHOLD additionally lets the NEAR_DUP_METHODS reuse cached results of
+    near-identical texts (see utils/near_dup.py). Result packs under RESULT_PACK_DIR,
+    built offline by build_result_pack.py, are consulted before the store (see
+    utils/result_pack.py). Exact duplicate texts within a batch are scored once, with or
+    without the cache.
+
+    Each method's audit carries the stage timings of the batch call that produced it
+    (parameters["timings"]), and the same timings feed the metrics REGISTRY.
+
+    method_kwargs maps method -> constructor overrides applied on top of the env
+    configuration, e.g. {"lexical": {"index": shared_index}}. Methods run in the process
+    pool get them through the worker initializer, so they must be picklable there.
+
+    cascade (True for CascadeRules.from_env(), or explicit CascadeRules) runs the
+    methods one at a time, cheapest-first by MethodSpec.cost, and skips costlier methods
+    for documents the cheaper ones already settled. Skipped methods contribute an empty
+    result with status "skipped"; the orchestrator audit's "cascade" entry records the
+    order, the rules, what ran and was skipped (and why) and the cost spent / avoided.
+    """
+
+    def __init__(
+        self,
+        methods: list[str],
+        executor: str = "serial",
+        timeouts: dict[str, float] | None = None,
+        max_workers: int | None = None,
+        use_cache: bool = True,
+        method_kwargs: dict[str, dict] | None = None,
+        cascade: bool | CascadeRules = False,
+    ):
         if not methods:
             raise ValueError("methods must be a non-empty list")
+        if executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {EXECUTORS}, got {executor!r}")
+        if timeouts and executor == "serial":
+            raise ValueError("timeouts apply to the thread and process executors; the serial executor ignores them")
+
+        load_env()
         self.methods = methods
-        self.strategies = [self._make_strategy(m) for m in methods]
+        self.executor = executor
+        self.timeouts = dict(timeouts or {})
+        self.max_workers = max_workers
+        self.use_cache = use_cache
+        self.cascade = CascadeRules.from_env() if cascade is True else (cascade or None)
+        self.cache_store = open_result_cache() if use_cache else None
+        self.near_dup = _open_near_dup_index() if use_cache else None
+        self.result_packs = _open_result_packs() if use_cache else []
+        self.method_kwargs = method_kwargs or {}
+        self._remote_methods = {
+            m for m in methods if executor == "process" and get_spec(m).cpu_bound
+        }
+        # strategies that run in the process pool are built inside the workers
+        self.strategies = [
+            None if m in self._remote_methods
+            else self._make_strategy(
+                m, self.cache_store, self.near_dup, self.result_packs, **self.method_kwargs.get(m, {})
+            )
+            for m in methods
+        ]
+        self._process_pool: ProcessPoolExecutor | None = None
 
     def _merge_results(self, method_results):
-        merged = {}  # (code_system, code) -> InferredCode
+        merged = {}  # (code_system, code) -> CodeRecord
         for mr in method_results:
             for ic in mr.inferred_codes:
-                key = (getattr(ic, "code_system", "HCPCS") or "HCPCS", ic.code)
+                key = (ic.code_system or "HCPCS", ic.code)
                 if key not in merged or ic.confidence > merged[key].confidence:
                     merged[key] = ic
 
-        out = list(merged.values())
-        out.sort(key=lambda ic: (getattr(ic, "code_system", "HCPCS") or "HCPCS", ic.code))
-        return out
+        return [merged[key] for key in sorted(merged)]
+
+    @staticmethod
+    def _make_strategy(method: str, cache_store=None, near_dup=None, packs=None, **overrides):
+        strategy = InferenceOrchestrator._make_method(method, **overrides)
+        if cache_store is None:
+            return strategy
+        if method.lower() not in _near_dup_methods():
+            near_dup = None
+        return CachedInference(strategy, cache_store, near_dup=near_dup, packs=packs)
 
-    def _make_strategy(self, method: str):
+    @staticmethod
+    def _make_method(method: str, **overrides):
+        """
+        Build one method from env configuration (overrides win over env values). Its
+        module is imported here, on first use, so e.g. a regex-only run never imports
+        scikit-learn.
+        """
         method = method.lower()
+        load_env()
 
         if method == "llm":
             endpoint = os.getenv("LLM_ENDPOINT", "mock")
-            return LLMInference(endpoint=endpoint)
+            if "prompt" not in overrides:
+                overrides["prompt"] = _llm_prompt_selector()
+            return load_method_class("llm")(
+                endpoint=endpoint,
+                model=os.getenv("LLM_MODEL"),
+                timeout_s=float(os.getenv("LLM_TIMEOUT_S", "10")),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+                batch_size=int(os.getenv("LLM_BATCH_SIZE", "1")),
+                **overrides,
+            )
 
         if method == "rag":
-            return RAGInference()
+            return load_method_class("rag")(
+                hcpcs_path=os.getenv("HCPCS_PATH", "src/tests/inputs/hcpcs.csv"),
+                index_dir=os.getenv("RAG_INDEX_DIR") or os.getenv("LEXICAL_INDEX_DIR", "src/tests/cache/index"),
+                n_components=int(os.getenv("RAG_COMPONENTS", "128")),
+                ivf_lists=int(os.getenv("RAG_IVF_LISTS", "0")),
+                nprobe=int(os.getenv("RAG_NPROBE", "8")),
+                threshold=float(os.getenv("RAG_THRESHOLD", "0.5")),
+                **overrides,
+            )
         
         if method == "regex":
-            return RegexInference()
+            return load_method_class("regex")(
+                hcpcs_path=os.getenv("HCPCS_PATH", "src/tests/inputs/hcpcs.csv"),
+                cpt_path=os.getenv("CPT_PATH") or None,
+                icd10_path=os.getenv("ICD10_PATH") or None,
+                **overrides,
+            )
 
         if method == "lexical":
-            cache_path = os.getenv("LEXICAL_CACHE_PATH", "src/tests/cache/cached_results.json")
             hcpcs_path = os.getenv("HCPCS_PATH", "src/tests/inputs/hcpcs.csv")
-            return LexInference(cache_path=cache_path, hcpcs_path=hcpcs_path)
+            index_dir = os.getenv("LEXICAL_INDEX_DIR", "src/tests/cache/index")
+            passage_chars = int(os.getenv("LEXICAL_PASSAGE_CHARS", "2000"))
+            aggregate = os.getenv("LEXICAL_AGGREGATE", "max")
+            return load_method_class("lexical")(
+                hcpcs_path=hcpcs_path,
+                index_dir=index_dir,
+                passage_chars=passage_chars,
+                aggregate=aggregate,
+                code_tables=_lexical_code_tables(),
+                hashing_features=int(os.getenv("LEXICAL_HASHING_FEATURES", "0")),
+                code_block=int(os.getenv("LEXICAL_CODE_BLOCK", "8192")),
+                **overrides,
+            )
 
         raise ValueError(f"Unknown inference method: {method}")
 
     def run_inference(self, policy_text: str):
-        method_outputs = [s.infer(policy_text) for s in self.strategies]
-        final_codes = self._merge_results(method_outputs)
+        return self.run_inference_batch([policy_text])[0]
+
+    def run_inference_source(self, source: TextSource):
+        """
+        run_inference for one document read through a TextSource. Methods receive the
+        source itself (see InferenceMethod.infer_source), so regex scanning, passage
+        cutting and the cache-key hash each stream over the mapped file; the executor,
+        timeouts and cascade apply as for a batch of one.
+        """
+        text_shas = [source.sha256()] if self.use_cache else None
+        if self.cascade is not None:
+            per_method, decisions = self._run_cascade([source], text_shas)
+            return self._build_output([results[0] for results in per_method], cascade=decisions[0])
+        per_method = self._run_strategies([source], text_shas)
+        return self._build_output([results[0] for results in per_method])
+
+    def run_inference_batch(self, policy_texts: list[str]):
+        """
+        Run every strategy once over the whole batch (so vectorized methods
+        can score all texts together), then assemble one result per text.
+        """
+        unique = list(dict.fromkeys(policy_texts))
+        if len(unique) < len(policy_texts):
+            # exact duplicates in the batch are scored once and share the result
+            by_text = dict(zip(unique, self.run_inference_batch(unique)))
+            return [by_text[t] for t in policy_texts]
+
+        # hash each document once; every cached strategy reuses it for its key
+        text_shas = [sha256_text(t) for t in policy_texts] if self.use_cache else None
+        if self.cascade is not None:
+            per_method, decisions = self._run_cascade(policy_texts, text_shas)
+            return [
+                self._build_output(list(method_outputs), cascade=decision)
+                for method_outputs, decision in zip(zip(*per_method), decisions)
+            ]
+        per_method = self._run_strategies(policy_texts, text_shas)
+        return [self._build_output(list(method_outputs)) for method_outputs in zip(*per_method)]
+
+    def _run_strategies(self, policy_texts: list[str], text_shas: list[str] | None = None):
+        if self.executor == "serial":
+            out = [self._run_method(m, s, policy_texts, text_shas) for m, s in zip(self.methods, self.strategies)]
+            self._observe(out)
+            return out
+
+        futures = [self._submit(m, s, policy_texts, text_shas) for m, s in zip(self.methods, self.strategies)]
+        started = time.monotonic()
+        out = [self._await(m, fut, started, len(policy_texts)) for m, fut in zip(self.methods, futures)]
+        self._observe(out)
+        return out
+
+    def _run_method(self, method: str, strategy, policy_texts: list[str], text_shas: list[str] | None):
+        """One method over the batch with the configured executor and timeout."""
+        if self.executor == "serial":
+            try:
+                return _timed_infer(strategy, policy_texts, text_shas)
+            except Exception as e:
+                return self._failed(method, len(policy_texts), "error", f"{type(e).__name__}: {e}")
+        fut = self._submit(method, strategy, policy_texts, text_shas)
+        return self._await(method, fut, time.monotonic(), len(policy_texts))
+
+    def _await(self, method: str, fut: Future, started: float, n: int):
+        timeout = self.timeouts.get(method, self.timeouts.get("*"))
+        remaining = None if timeout is None else max(0.0, started + timeout - time.monotonic())
+        try:
+            return fut.result(timeout=remaining)
+        except FuturesTimeout:
+            fut.cancel()
+            return self._failed(method, n, "timeout", f"exceeded {timeout}s")
+        except Exception as e:
+            return self._failed(method, n, "error", f"{type(e).__name__}: {e}")
+
+    def _run_cascade(self, policy_texts: list[str], text_shas: list[str] | None):
+        """
+        Cheapest-first pass: each method runs only on the documents that are not yet
+        settled (methods below rules.skip_from_cost always run on all of them).
+        Returns per-method results aligned with self.methods and one decision dict per text.
+        """
+        rules = self.cascade
+        n = len(policy_texts)
+        order = cascade_order(self.methods)
+        confident = [{} for _ in range(n)]
+        decisions = [
+            {
+                "order": [self.methods[j] for j in order],
+                "rules": rules.to_dict(),
+                "ran": [],
+                "skipped": {},
+                "cost_units": {"spent": 0.0, "avoided": 0.0},
+                "method_cost": {},
+            }
+            for _ in range(n)
+        ]
+        per_method = [None] * len(self.methods)
+
+        for j in order:
+            m, strategy = self.methods[j], self.strategies[j]
+            cost = get_spec(m).cost
+            active = list(range(n))
+            if rules.may_skip(m):
+                active = [d for d in active if not rules.settled(confident[d])]
+
+            results = [None] * n
+            ms_per_doc = None
+            if active:
+                ran = self._run_method(
+                    m,
+                    strategy,
+                    [policy_texts[d] for d in active],
+                    None if text_shas is None else [text_shas[d] for d in active],
+                )
+                self._observe([ran], methods=[m])
+                timings = ran[0].audit.parameters.get("timings") if ran else None
+                if timings:
+                    ms_per_doc = round(timings["total_ms"] / max(1, timings["batch_docs"]), 3)
+                for d, r in zip(active, ran):
+                    results[d] = r
+                    rules.add_codes(confident[d], r.inferred_codes)
+                    decisions[d]["ran"].append(m)
+                    decisions[d]["cost_units"]["spent"] += cost
+
+            skipped = 0
+            for d in range(n):
+                decisions[d]["method_cost"][m] = {"units": cost, "ms_per_doc": ms_per_doc}
+                if results[d] is None:
+                    reason = rules.skip_reason(confident[d])
+                    results[d] = ResultRecord([], AuditRecord(now_iso(), m, {"status": "skipped", "reason": reason}))
+                    decisions[d]["skipped"][m] = reason
+                    decisions[d]["cost_units"]["avoided"] += cost
+                    skipped += 1
+            if skipped:
+                REGISTRY.inc("inference_skipped_total", skipped, help="Documents a cascade skipped per method.", method=m)
+            per_method[j] = results
+
+        return per_method, decisions
+
+    def warm_up(self) -> None:
+        """
+        Get ready to serve without scoring anything: the in-process methods (and their
+        indexes) were built in __init__; this also starts the process-pool workers,
+        which build their methods as they start. Nothing is written to the result
+        cache and no remote service (e.g. the LLM endpoint) is called.
+        """
+        if not self._remote_methods:
+            return
+        pool = self._pool()
+        for fut in [pool.submit(_warm_worker) for _ in range(self._pool_size())]:
+            fut.result()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self._pool_size(),
+                mp_context=process_context(sorted(self._remote_methods)),
+                initializer=_init_worker,
+                initargs=(
+                    sorted(self._remote_methods),
+                    self.use_cache,
+                    {m: self.method_kwargs[m] for m in self._remote_methods if m in self.method_kwargs},
+                ),
+            )
+        return self._process_pool
+
+    def _pool_size(self) -> int:
+        return self.max_workers or len(self._remote_methods)
+
+    def _submit(self, method: str, strategy, policy_texts: list[str], text_shas: list[str] | None):
+        if method in self._remote_methods:
+            return self._pool().submit(_infer_in_worker, method, policy_texts, text_shas)
+
+        return _submit_daemon(_timed_infer, strategy, policy_texts, text_shas, name=f"inference-{method}")
+
+    @staticmethod
+    def _failed(method: str, n: int, status: str, error: str):
+        return [
+            ResultRecord([], AuditRecord(now_iso(), method, {"status": status, "error": error}))
+            for _ in range(n)
+        ]
+
+    def _observe(self, per_method, methods: list[str] | None = None) -> None:
+        """Feed each method's batch timings and outcome counts into the metrics registry."""
+        for m, results in zip(methods or self.methods, per_method):
+            REGISTRY.inc("inference_documents_total", len(results), help="Documents scored per method.", method=m)
+            if not results:
+                continue
+            params = results[0].audit.parameters
+            status = params.get("status")
+            if status in ("timeout", "error"):
+                REGISTRY.inc("inference_failures_total", help="Failed method batches.", method=m, status=status)
+                continue
+
+            hits = sum(1 for r in results if r.audit.parameters.get("cache_hit"))
+            if hits:
+                REGISTRY.inc("inference_cache_hits_total", hits, help="Results served from the cache.", method=m)
+            packed = sum(1 for r in results if r.audit.parameters.get("result_pack"))
+            if packed:
+                REGISTRY.inc("inference_pack_hits_total", packed, help="Results served from result packs.", method=m)
+
+            timings = params.get("timings")
+            if timings:
+                REGISTRY.observe(
+                    "inference_method_seconds", timings["total_ms"] / 1000,
+                    help="Wall time of one method batch call.", method=m,
+                )
+                for stage, ms in timings["stages_ms"].items():
+                    REGISTRY.observe(STAGE_METRIC, ms / 1000, help=STAGE_HELP, component=m, stage=stage)
+
+    def close(self) -> None:
+        # don't block on strategies that already timed out
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        for strategy in self.strategies:
+            if strategy is not None:
+                strategy.close()
+
+    def _build_output(self, method_outputs, cascade: dict | None = None):
+        with span("merge", component="orchestrator"):
+            final_codes = self._merge_results(method_outputs)
+
+        parameters = {
+            "methods": self.methods,
+            "strategy_count": len(self.methods),
+            "executor": self.executor,
+            "cache": self.use_cache,
+        }
+        failed = {
+            m: r.audit.parameters["status"]
+            for m, r in zip(self.methods, method_outputs)
+            if r.audit.parameters.get("status") in ("timeout", "error")
+        }
+        if failed:
+            parameters["failed_methods"] = failed
+        if cascade is not None:
+            parameters["cascade"] = cascade
 
         return {
             "methods_run": self.methods,
             "by_method": [{"method": m, "output": r} for m, r in zip(self.methods, method_outputs)],
-            "output": InferenceResult(
-                inferred_codes=final_codes,
-                audit=Audit(
-                    timestamp=now_iso(),
-                    method="orchestrator",
-                    parameters={"methods": self.methods, "strategy_count": len(self.strategies)},
-                ),
-            ),
-        }
\ No newline at end of file
+            "output": ResultRecord(final_codes, AuditRecord(now_iso(), "orchestrator", parameters)),
+        }
+
+
+def _submit_daemon(fn, *args, name: str = "inference") -> Future:
+    """
+    Run fn(*args) on a daemon thread. Unlike pool threads, a call that was abandoned
+    after a timeout does not keep the interpreter alive at exit.
+    """
+    fut: Future = Future()
+
+    def run():
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return fut
+
+
+def _timed_infer(strategy, policy_texts: list[str], text_shas: list[str] | None):
+    """
+    strategy.infer_batch with its stage spans collected; the batch timings are attached
+    to every result's audit (they travel back from process-pool workers with it).
+    """
+    with collect_spans() as spans:
+        t0 = time.perf_counter()
+        if len(policy_texts) == 1 and isinstance(policy_texts[0], TextSource):
+            # see run_inference_source
+            results = [strategy.infer_source(policy_texts[0])]
+        else:
+            results = strategy.infer_batch(policy_texts, text_shas)
+        total = time.perf_counter() - t0
+
+    stages_ms = {stage: round(sec * 1000, 3) for stage, sec in spans.items()}
+    for r in results:
+        r.audit.parameters["timings"] = {
+            "batch_docs": len(policy_texts),
+            "total_ms": round(total * 1000, 3),
+            "stages_ms": dict(stages_ms),
+        }
+    return results
+
+
+_ENV_LOADED = False
+
+
+def load_env() -> None:
+    # .env is read on first use rather than at import, keeping `import` side-effect free
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _ENV_LOADED = True
+
+
+def open_result_cache():
+    # LEXICAL_CACHE_PATH is the pre-CachedInference name of the same setting
+    cache_path = os.getenv("CACHE_PATH") or os.getenv("LEXICAL_CACHE_PATH") or "src/tests/cache/cached_results.sqlite"
+    return open_cache_store(cache_path)
+
+
+def _open_near_dup_index():
+    threshold = float(os.getenv("NEAR_DUP_THRESHOLD", "0") or 0)
+    if threshold <= 0:
+        return None
+    from src.utils.near_dup import NearDupIndex
+
+    return NearDupIndex(os.getenv("NEAR_DUP_PATH", "src/tests/cache/near_dup.sqlite"), threshold=threshold)
+
+
+def _open_result_packs():
+    # unset: no packs; packs that do not match a method's cache params are skipped per method
+    root = os.getenv("RESULT_PACK_DIR")
+    if not root:
+        return []
+    from src.utils.result_pack import open_result_packs
+
+    return open_result_packs(root)
+
+
+def _near_dup_methods() -> set[str]:
+    # regex is exact and cheap, so it is rescored rather than reused by default
+    raw = os.getenv("NEAR_DUP_METHODS", "lexical,rag,llm")
+    return {m.strip().lower() for m in raw.split(",") if m.strip()}
+
+
+def _lexical_code_tables() -> dict[str, str]:
+    # "CPT=path/cpt.csv,ICD10=path/icd10.csv": code tables scored next to HCPCS_PATH
+    tables = {}
+    for part in os.getenv("LEXICAL_CODE_TABLES", "").split(","):
+        system, sep, path = part.partition("=")
+        if not part.strip():
+            continue
+        if not sep or not path.strip():
+            raise ValueError(f"LEXICAL_CODE_TABLES entries must look like SYSTEM=path, got {part!r}")
+        tables[system.strip().upper()] = path.strip()
+    return tables
+
+
+def _llm_prompt_selector():
+    # opt-in: without LLM_PROMPT_CHARS or LLM_PROMPT_TOKENS every policy is sent in full
+    budget_chars = int(os.getenv("LLM_PROMPT_CHARS", "0") or 0)
+    budget_tokens = int(os.getenv("LLM_PROMPT_TOKENS", "0") or 0)
+    if budget_chars <= 0 and budget_tokens <= 0:
+        return None
+    from src.services.llm.prompt import PromptSelector
+
+    return PromptSelector(
+        budget_chars=budget_chars,
+        budget_tokens=budget_tokens or None,
+        passage_chars=int(os.getenv("LLM_PROMPT_PASSAGE_CHARS", "1000")),
+        max_calls=int(os.getenv("LLM_PROMPT_MAX_CALLS", "1")),
+        ranker=os.getenv("LLM_PROMPT_RANKER", "regex"),
+        hcpcs_path=os.getenv("HCPCS_PATH", "src/tests/inputs/hcpcs.csv"),
+        index_dir=os.getenv("LEXICAL_INDEX_DIR", "src/tests/cache/index"),
+    )
+
+
+# -- process pool workers -------------------------------------------------------
+
+_WORKER_STRATEGIES = {}
+
+
+def process_context(methods: list[str]):
+    # Forking while strategy threads are mid-call can copy held locks into the child
+    # and deadlock it, so workers come from a clean forkserver (spawn where unavailable).
+    # The forkserver imports the workers' method modules once, before forking them.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__] + [get_spec(m).module for m in methods])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(methods: list[str], use_cache: bool, method_kwargs: dict[str, dict]) -> None:
+    load_env()
+    # each worker opens its own handle on the shared result store
+    cache_store = open_result_cache() if use_cache else None
+    near_dup = _open_near_dup_index() if use_cache else None
+    packs = _open_result_packs() if use_cache else []
+    for m in methods:
+        _WORKER_STRATEGIES[m] = InferenceOrchestrator._make_strategy(
+            m, cache_store, near_dup, packs, **method_kwargs.get(m, {})
+        )
+
+
+def _warm_worker() -> None:
+    # the pool initializer (_init_worker) has built the worker's methods by now
+    return None
+
+
+def _infer_in_worker(method: str, policy_texts: list[str], text_shas: list[str] | None):
+    return _timed_infer(_WORKER_STRATEGIES[method], policy_texts, text_shas)
@@ -0,0 +1,177 @@
+# src/services/inference/parallel.py
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import chain
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from src.services.inference.orchestrator import InferenceOrchestrator, load_env, process_context
+from src.utils.streams import PolicyRecord, batched, non_empty
+
+
+class CorpusPool:
+    """
+    Splits a corpus across a pool of worker processes, each running an
+    InferenceOrchestrator over the methods, and yields results in input order.
+    executor ("serial" or "thread") and timeouts configure each worker's orchestrator;
+    the process executor would start a pool per worker and is not supported.
+
+    When lexical is selected, the TF-IDF index is loaded once here and published in
+    multiprocessing.shared_memory (see index/shared_index.py); each worker attaches to
+    it at startup instead of unpickling or re-reading the matrix and vectorizer.
+
+    Batches are submitted as the input is read, with at most max_in_flight batches
+    outstanding (default 2 per worker), so memory stays bounded by the window rather
+    than by the corpus. Results of a batch are yielded once it and every earlier
+    batch are done.
+    """
+
+    def __init__(
+        self,
+        methods: List[str],
+        workers: Optional[int] = None,
+        use_cache: bool = True,
+        max_in_flight: Optional[int] = None,
+        cascade: bool = False,
+        executor: str = "serial",
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        if executor == "process":
+            raise ValueError("corpus workers run methods serially or in threads; the process executor is not supported")
+        load_env()
+        self.methods = methods
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.use_cache = use_cache
+        self.max_in_flight = max(1, max_in_flight or 2 * self.workers)
+
+        self._shared = None
+        handles: Dict[str, Dict[str, Any]] = {}
+        if "lexical" in methods:
+            self._shared = _share_lexical_index()
+            handles["lexical"] = self._shared.handle()
+
+        try:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=process_context(methods),
+                initializer=_init_corpus_worker,
+                initargs=(methods, use_cache, handles, cascade, executor, timeouts),
+            )
+        except BaseException:
+            self.close()
+            raise
+
+    def map_batches(self, batches: Iterable[List[str]]) -> Iterator[List[Dict[str, Any]]]:
+        """Score each batch of texts in a worker; yields one result list per batch, in order."""
+        pending: Deque[Future] = deque()
+        for texts in batches:
+            if len(pending) >= self.max_in_flight:
+                yield pending.popleft().result()
+            pending.append(self._pool.submit(_infer_corpus_batch, texts))
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self) -> None:
+        pool, self._pool = getattr(self, "_pool", None), None
+        try:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        finally:
+            # workers are gone (or broken), so the shared blocks can be released
+            if self._shared is not None:
+                self._shared.close()
+                self._shared = None
+
+    def __enter__(self) -> "CorpusPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_pipeline_records_parallel(
+    records: Iterable[PolicyRecord],
+    methods: List[str],
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    batch_size: int = 64,
+    cascade: bool = False,
+    executor: str = "serial",
+    timeouts: Optional[Dict[str, float]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    iter_pipeline_records spread over a CorpusPool: same (metadata, text) input, same
+    output records in the same order, with batches scored on `workers` processes.
+    """
+    batches = batched(non_empty(records), batch_size)
+    first = next(batches, None)
+    if first is None:
+        # an empty input never starts the pool
+        return
+
+    metas: Deque[List[Dict[str, Any]]] = deque()
+
+    def texts_of(batches: Iterable[List[PolicyRecord]]) -> Iterator[List[str]]:
+        for batch in batches:
+            metas.append([meta for meta, _ in batch])
+            yield [text for _, text in batch]
+
+    with CorpusPool(
+        methods, workers=workers, use_cache=use_cache, cascade=cascade, executor=executor, timeouts=timeouts
+    ) as pool:
+        for results in pool.map_batches(texts_of(chain([first], batches))):
+            for meta, result in zip(metas.popleft(), results):
+                yield {**meta, **result}
+
+
+def _share_lexical_index():
+    # imported here so a pool without lexical never imports scikit-learn in the parent
+    from src.services.inference.index.shared_index import SharedTfidfIndex
+    from src.services.inference.index.tfidf_index import TfidfIndex
+    from src.utils.cache import sha256_file
+
+    hcpcs_path = os.getenv("HCPCS_PATH", "src/tests/inputs/hcpcs.csv")
+    index_dir = os.getenv("LEXICAL_INDEX_DIR", "src/tests/cache/index")
+    n_features = int(os.getenv("LEXICAL_HASHING_FEATURES", "0"))
+    index = TfidfIndex.load_or_build(hcpcs_path, index_dir, source_sha=sha256_file(hcpcs_path), n_features=n_features)
+    return SharedTfidfIndex(index)
+
+
+# -- pool workers ---------------------------------------------------------------
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_corpus_worker(
+    methods: List[str],
+    use_cache: bool,
+    handles: Dict[str, Dict[str, Any]],
+    cascade: bool = False,
+    executor: str = "serial",
+    timeouts: Optional[Dict[str, float]] = None,
+) -> None:
+    method_kwargs: Dict[str, Dict[str, Any]] = {}
+    blocks: List[Any] = []
+    if "lexical" in handles:
+        from src.services.inference.index.shared_index import attach
+
+        index, opened = attach(handles["lexical"])
+        blocks.extend(opened)
+        method_kwargs["lexical"] = {"index": index}
+
+    _WORKER["orchestrator"] = InferenceOrchestrator(
+        methods=methods,
+        executor=executor,
+        timeouts=timeouts,
+        use_cache=use_cache,
+        method_kwargs=method_kwargs,
+        cascade=cascade,
+    )
+    # the index arrays are views of these blocks; they stay mapped for the worker's lifetime
+    _WORKER["blocks"] = blocks
+
+
+def _infer_corpus_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    return _WORKER["orchestrator"].run_inference_batch(texts)
@@ -1,21 +1,149 @@
 # src/services/inference/runner.py
 from __future__ import annotations
 
-from typing import List, Dict, Any
-from src.services.inference.orchestrator import InferenceOrchestrator
+from pathlib import Path
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
+from src.services.inference.orchestrator import InferenceOrchestrator, load_env
+from src.utils.cache import make_cache_key, sha256_text
+from src.utils.streams import PolicyRecord, batched, non_empty
+from src.utils.text_source import TextSource
 
-def run_pipeline_texts(policy_texts: List[str], methods: List[str]) -> List[Dict[str, Any]]:
+def run_pipeline_texts(
+    policy_texts: List[str],
+    methods: List[str],
+    executor: str = "serial",
+    timeouts: Optional[Dict[str, float]] = None,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    workers: int = 1,
+    cascade: bool = False,
+) -> List[Dict[str, Any]]:
     """
     Run inference for each policy text using the provided methods in order.
     Returns one result object per input policy text.
     """
-    orchestrator = InferenceOrchestrator(methods=methods)
-    results: List[Dict[str, Any]] = []
+    records = (({}, t) for t in policy_texts)
+    return list(iter_pipeline_records(
+        records, methods, executor=executor, timeouts=timeouts, max_workers=max_workers, use_cache=use_cache,
+        workers=workers, cascade=cascade,
+    ))
 
-    for policy_text in policy_texts:
-        text = policy_text.strip()
-        if not text:
-            continue
-        results.append(orchestrator.run_inference(text))
 
-    return results
\ No newline at end of file
+def iter_pipeline_records(
+    records: Iterable[PolicyRecord],
+    methods: List[str],
+    executor: str = "serial",
+    timeouts: Optional[Dict[str, float]] = None,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    batch_size: int = 64,
+    workers: int = 1,
+    cascade: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming form of run_pipeline_texts: consumes (metadata, text) records lazily,
+    scores them batch_size at a time and yields one result per non-empty policy, in
+    input order, with the record's metadata (row, policy_id) merged in front.
+    Memory is bounded by the batch size, not by the corpus size.
+
+    workers > 1 scores batches on a pool of worker processes instead (see
+    parallel.CorpusPool); the output is the same, in the same order. Each worker runs
+    the methods with the given executor ("serial" or "thread") and timeouts;
+    max_workers sizes the process executor, which corpus workers do not support. cascade runs
+    methods cheapest-first and skips costly ones for settled documents (see
+    InferenceOrchestrator).
+    """
+    if workers > 1:
+        from src.services.inference.parallel import iter_pipeline_records_parallel
+
+        yield from iter_pipeline_records_parallel(
+            records, methods, workers=workers, use_cache=use_cache, batch_size=batch_size, cascade=cascade,
+            executor=executor, timeouts=timeouts,
+        )
+        return
+
+    orchestrator = None
+    try:
+        for batch in batched(non_empty(records), batch_size):
+            if orchestrator is None:
+                # built on the first non-empty batch, so an empty input costs nothing
+                orchestrator = InferenceOrchestrator(
+                    methods=methods, executor=executor, timeouts=timeouts, max_workers=max_workers, use_cache=use_cache,
+                    cascade=cascade,
+                )
+            results = orchestrator.run_inference_batch([text for _, text in batch])
+            for (meta, _), result in zip(batch, results):
+                yield {**meta, **result}
+    finally:
+        if orchestrator is not None:
+            orchestrator.close()
+
+
+def iter_source_records(
+    source: TextSource,
+    methods: List[str],
+    executor: str = "serial",
+    timeouts: Optional[Dict[str, float]] = None,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    cascade: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    iter_pipeline_records for a single large policy file: the document is scored
+    through the TextSource (see InferenceOrchestrator.run_inference_source) instead of
+    being read into a string. Yields its one result, or nothing for an empty file.
+    """
+    if source.is_empty():
+        return
+    orchestrator = InferenceOrchestrator(
+        methods=methods, executor=executor, timeouts=timeouts, max_workers=max_workers, use_cache=use_cache,
+        cascade=cascade,
+    )
+    try:
+        yield orchestrator.run_inference_source(source)
+    finally:
+        orchestrator.close()
+
+
+def build_result_pack(
+    records: Iterable[PolicyRecord],
+    methods: List[str],
+    root: str | Path,
+    batch_size: int = 64,
+    source: Optional[str] = None,
+) -> Path:
+    """
+    Score a corpus with each method (no result cache) and write the results as a
+    read-only pack under root (see utils/result_pack.py). Entries are keyed exactly as
+    CachedInference keys them, so an orchestrator with RESULT_PACK_DIR=root serves these
+    policies from the pack. Repeated texts are scored once.
+    """
+    from src.utils.result_pack import write_result_pack
+
+    load_env()
+    strategies = [InferenceOrchestrator._make_method(m) for m in methods]
+    params = [s.cache_params() for s in strategies]
+    seen = set()
+
+    def entries() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for batch in batched(non_empty(records), batch_size):
+            texts, shas = [], []
+            for _, text in batch:
+                sha = sha256_text(text)
+                if sha not in seen:
+                    seen.add(sha)
+                    texts.append(text)
+                    shas.append(sha)
+            if not texts:
+                continue
+            for strategy, p in zip(strategies, params):
+                for sha, result in zip(shas, strategy.infer_batch(texts, shas)):
+                    yield make_cache_key(method=strategy.METHOD_NAME, policy_text_sha=sha, params=p), result.to_dict()
+
+    try:
+        return write_result_pack(
+            root, entries(), {s.METHOD_NAME: p for s, p in zip(strategies, params)}, source=source
+        )
+    finally:
+        for strategy in strategies:
+            strategy.close()
@@ -0,0 +1,261 @@
+# src/services/inference/server.py
+from __future__ import annotations
+
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.inference.orchestrator import InferenceOrchestrator
+from src.utils.metrics import REGISTRY
+from src.utils.parser import to_jsonable
+
+
+class Overloaded(Exception):
+    """The micro-batch queue has no room for the request."""
+
+
+class MicroBatcher:
+    """
+    Collects texts from concurrent requests into batches for one warm orchestrator.
+
+    A batch is dispatched when it reaches max_batch texts or when its oldest text has
+    waited max_wait_s, whichever comes first, so vectorized methods score many
+    requests in one pass. At most max_queue texts may wait; submit_many() raises
+    Overloaded beyond that instead of letting latency grow without bound.
+    """
+
+    def __init__(
+        self,
+        orchestrator: InferenceOrchestrator,
+        max_batch: int = 32,
+        max_wait_s: float = 0.01,
+        max_queue: int = 256,
+    ):
+        self.orchestrator = orchestrator
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max_wait_s
+        self.max_queue = max(1, max_queue)
+
+        self._items: Deque[Tuple[str, Future, float]] = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._started = time.monotonic()
+        self._latencies: Deque[float] = deque(maxlen=1024)
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "batches": 0, "max_batch_seen": 0}
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit_many(self, texts: List[str]) -> List[Future]:
+        """Queue all texts or none of them."""
+        now = time.monotonic()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("batcher is stopped")
+            if len(self._items) + len(texts) > self.max_queue:
+                self._stats["rejected"] += len(texts)
+                REGISTRY.inc("server_texts_total", len(texts), help="Texts received by the server.", status="rejected")
+                raise Overloaded(f"queue full ({len(self._items)}/{self.max_queue} waiting)")
+            futures = []
+            for text in texts:
+                fut: Future = Future()
+                self._items.append((text, fut, now))
+                futures.append(fut)
+            self._stats["submitted"] += len(texts)
+            self._cond.notify()
+        return futures
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            out: Dict[str, Any] = dict(self._stats)
+            out["queue_depth"] = len(self._items)
+            latencies = list(self._latencies)
+        out.update({
+            "queue_capacity": self.max_queue,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_s * 1000,
+            "uptime_s": round(time.monotonic() - self._started, 3),
+            "avg_batch_size": round(out["completed"] / out["batches"], 3) if out["batches"] else 0.0,
+        })
+        if latencies:
+            p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+            out["latency_ms"] = {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
+        return out
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._worker.join(timeout=5)
+
+    def _next_batch(self) -> List[Tuple[str, Future, float]]:
+        with self._cond:
+            while not self._items and not self._stopped:
+                self._cond.wait()
+            if not self._items:
+                return []
+            # the oldest waiting text sets the deadline for this batch
+            deadline = self._items[0][2] + self.max_wait_s
+            while len(self._items) < self.max_batch and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(self.max_batch, len(self._items))
+            return [self._items.popleft() for _ in range(n)]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            started = time.monotonic()
+            for _, _, enqueued in batch:
+                REGISTRY.observe("server_queue_wait_seconds", started - enqueued, help="Time a text waited for its batch.")
+            try:
+                results = self.orchestrator.run_inference_batch([text for text, _, _ in batch])
+            except Exception as e:
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                self._record(batch, "failed")
+                continue
+
+            for (_, fut, _), result in zip(batch, results):
+                fut.set_result(result)
+            self._record(batch, "completed")
+
+    def _record(self, batch: List[Tuple[str, Future, float]], status: str) -> None:
+        now = time.monotonic()
+        with self._cond:
+            self._stats[status] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+            self._latencies.extend(now - enqueued for _, _, enqueued in batch)
+        REGISTRY.inc("server_texts_total", len(batch), help="Texts received by the server.", status=status)
+        REGISTRY.inc("server_batches_total", help="Micro-batches dispatched to the orchestrator.")
+
+
+class _InferenceHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path in ("/health", "/healthz"):
+            return self._reply(200, {"status": "ok", "methods": self.server.batcher.orchestrator.methods})
+        if self.path == "/stats":
+            return self._reply(200, self.server.batcher.stats())
+        if self.path == "/metrics":
+            return self._reply_text(200, REGISTRY.render_prometheus(), "text/plain; version=0.0.4")
+        return self._reply(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/infer":
+            return self._reply(404, {"error": f"unknown path {self.path}"})
+
+        length = int(self.headers.get("Content-Length", "0"))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._reply(400, {"error": "invalid json"})
+        if not isinstance(payload, dict):
+            return self._reply(400, {"error": "expected a JSON object"})
+
+        single = "text" in payload
+        texts = [payload["text"]] if single else payload.get("texts")
+        if not isinstance(texts, list) or not texts or not all(isinstance(t, str) and t.strip() for t in texts):
+            return self._reply(400, {"error": "expected {\"text\": str} or {\"texts\": [str, ...]} with non-empty texts"})
+
+        try:
+            futures = self.server.batcher.submit_many([t.strip() for t in texts])
+        except Overloaded as e:
+            return self._reply(503, {"error": "overloaded", "detail": str(e)}, headers={"Retry-After": "1"})
+
+        deadline = time.monotonic() + self.server.request_timeout_s
+        try:
+            results = [f.result(timeout=max(0.0, deadline - time.monotonic())) for f in futures]
+        except FuturesTimeout:
+            return self._reply(504, {"error": f"timed out after {self.server.request_timeout_s}s"})
+        except Exception as e:
+            return self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+        body = to_jsonable(results[0]) if single else {"results": to_jsonable(results)}
+        return self._reply(200, body)
+
+    def _reply(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        self._reply_text(status, json.dumps(body), "application/json", headers)
+
+    def _reply_text(self, status: int, text: str, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        blob = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(blob)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(blob)
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class InferenceServer(ThreadingHTTPServer):
+    """
+    Local HTTP front end for a warm InferenceOrchestrator.
+
+      POST /infer    {"text": ...} -> one result, or {"texts": [...]} -> {"results": [...]}
+      GET  /health   liveness and configured methods
+      GET  /stats    queue depth, batch sizes, rejections, latency percentiles
+      GET  /metrics  metrics registry in Prometheus text format
+
+    503 with Retry-After means the micro-batch queue is full.
+    """
+
+    daemon_threads = True
+    # listen backlog; socketserver's default of 5 resets bursts of concurrent clients
+    request_queue_size = 128
+
+    def __init__(self, address: Tuple[str, int], batcher: MicroBatcher, request_timeout_s: float = 60.0):
+        super().__init__(address, _InferenceHandler)
+        self.batcher = batcher
+        self.request_timeout_s = request_timeout_s
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class UnixInferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """The same HTTP endpoints served on a Unix domain socket."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, path: str, batcher: MicroBatcher, request_timeout_s: float = 60.0):
+        if os.path.exists(path):
+            os.unlink(path)  # stale socket from a previous run
+        super().__init__(path, _InferenceHandler)
+        self.batcher = batcher
+        self.request_timeout_s = request_timeout_s
+
+    @property
+    def url(self) -> str:
+        return f"unix://{self.server_address}"
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
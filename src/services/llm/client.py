@@ -1,13 +1,22 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+import asyncio
 import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     requests = None  # lets you run in mock mode without requests installed
 
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# statuses that mean "this endpoint does not accept batched payloads"
+BATCH_UNSUPPORTED_STATUS = {400, 404, 405, 413, 415, 422}
+
 
 class LLMClient:
     """
@@ -15,31 +24,179 @@ class LLMClient:
 
     For this exercise, default to MOCK mode so the pipeline runs locally.
     When you have a real endpoint, set LLM_ENDPOINT to an http(s) URL.
+
+    Remote calls go through one keep-alive connection pool (requests.Session),
+    at most max_concurrency requests are in flight, and transient failures
+    (connection errors, timeouts, 429/5xx) are retried with jittered exponential
+    backoff. With batch_size > 1, several texts are sent per POST as
+    {"texts": [...]} -> {"results": [...]}; if the endpoint rejects batched
+    payloads the client falls back to one text per request.
+
+    aquery / aquery_many are the async API; query / query_many are sync wrappers
+    that run it on one event loop kept in a background thread. The loop, the request
+    threads and the session are created on first use and released by close() (or
+    by using the client as a context manager).
     """
 
-    def __init__(self, endpoint: Optional[str] = None, timeout_s: float = 10.0):
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        timeout_s: float = 10.0,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 8.0,
+        batch_size: int = 1,
+    ):
         # If not provided, read from env; default to "mock" (no network).
         self.endpoint = endpoint or os.getenv("LLM_ENDPOINT", "mock")
         self.timeout_s = timeout_s
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.batch_size = max(1, batch_size)
+        self._batch_supported = self.batch_size > 1
+        self._session = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._session_lock = threading.Lock()
+
+    # -- sync API ---------------------------------------------------------------
 
     def query(self, policy_text: str) -> Dict[str, Any]:
+        return self.query_many([policy_text])[0]
+
+    def query_many(self, policy_texts: List[str]) -> List[Dict[str, Any]]:
+        if self.endpoint == "mock":
+            return [self._mock_response() for _ in policy_texts]
+        # safe from any thread, including one that already runs its own event loop
+        return asyncio.run_coroutine_threadsafe(self.aquery_many(policy_texts), self._get_loop()).result()
+
+    # -- async API --------------------------------------------------------------
+
+    async def aquery(self, policy_text: str) -> Dict[str, Any]:
+        return (await self.aquery_many([policy_text]))[0]
+
+    async def aquery_many(self, policy_texts: List[str]) -> List[Dict[str, Any]]:
         # Mock mode: no network calls, deterministic stub response.
         if self.endpoint == "mock":
-            return {
-                "codes": [
-                    {
-                        "code": "A0428",
-                        "confidence": 0.7,
-                        "justification": "Mock LLM: ambulance transport-related language detected."
-                    }
-                ],
-                "model": "mock-llm-v1"
-            }
+            return [self._mock_response() for _ in policy_texts]
 
         if requests is None:
             raise RuntimeError("requests is required for non-mock LLM_ENDPOINT")
 
-        payload = {"text": policy_text}
-        resp = requests.post(self.endpoint, json=payload, timeout=self.timeout_s)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._batch_supported:
+            batches = [policy_texts[i:i + self.batch_size] for i in range(0, len(policy_texts), self.batch_size)]
+            results = await asyncio.gather(*(self._query_batch(b, semaphore) for b in batches))
+            return [r for batch in results for r in batch]
+
+        return list(await asyncio.gather(*(self._query_one(t, semaphore) for t in policy_texts)))
+
+    async def _query_one(self, policy_text: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        return await self._post_with_retries({"text": policy_text}, semaphore)
+
+    async def _query_batch(self, policy_texts: List[str], semaphore: asyncio.Semaphore) -> List[Dict[str, Any]]:
+        if len(policy_texts) == 1 or not self._batch_supported:
+            return [await self._query_one(t, semaphore) for t in policy_texts]
+
+        try:
+            body = await self._post_with_retries({"texts": policy_texts}, semaphore)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code not in BATCH_UNSUPPORTED_STATUS:
+                raise
+            # endpoint doesn't take batches; remember and fall back to single requests
+            self._batch_supported = False
+            return list(await asyncio.gather(*(self._query_one(t, semaphore) for t in policy_texts)))
+
+        results = body.get("results") if isinstance(body, dict) else None
+        if not isinstance(results, list) or len(results) != len(policy_texts):
+            raise ValueError("batched LLM response must contain one result per text")
+        return results
+
+    async def _post_with_retries(self, payload: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(self._get_executor(), self._post, payload)
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+            # full jitter: sleep uniformly in [0, min(cap, base * 2^attempt)]
+            delay = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt)))
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        resp = self._get_session().post(self.endpoint, json=payload, timeout=self.timeout_s)
         resp.raise_for_status()
-        return resp.json()
\ No newline at end of file
+        return resp.json()
+
+    def _get_session(self):
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # blocking requests run here; sized so the semaphore, not the pool, is the limit
+        with self._session_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+            return self._executor
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._session_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True)
+                thread.start()
+                self._loop, self._loop_thread = loop, thread
+            return self._loop
+
+    def close(self) -> None:
+        with self._session_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop_thread.join()
+                self._loop.close()
+                self._loop = self._loop_thread = None
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def __enter__(self) -> "LLMClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    def _mock_response() -> Dict[str, Any]:
+        return {
+            "codes": [
+                {
+                    "code": "A0428",
+                    "confidence": 0.7,
+                    "justification": "Mock LLM: ambulance transport-related language detected."
+                }
+            ],
+            "model": "mock-llm-v1"
+        }
+
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code in RETRYABLE_STATUS
+    return True
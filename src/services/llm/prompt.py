@@ -0,0 +1,186 @@
+# src/services/llm/prompt.py
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.services.inference.methods.regex_inference import CODE_PATTERN
+from src.utils.cache import normalize_text, sha256_file
+from src.utils.near_dup import fingerprint_text
+from src.utils.passages import iter_passages
+
+# rough size of a token in English policy text, for token budgets
+CHARS_PER_TOKEN = 4
+
+# sentence ends followed by whitespace, and line breaks; codes such as "Z12.11" are not cut
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*")
+
+# shorter sentences ("Yes.", list markers) are never treated as boilerplate
+_MIN_BOILERPLATE_CHARS = 20
+
+_SEPARATOR = "\n...\n"
+
+
+class PromptSelector:
+    """
+    Builds the text sent to the LLM for one policy within a character budget.
+
+    Policies far longer than the budget are reduced in three steps:
+      1. sentences repeated within the policy (headers, disclaimers, revision notes;
+         compared with dates masked) are kept only at their first occurrence;
+      2. the remaining sentences are packed into passages of about passage_chars;
+      3. passages are ranked by code mentions (the regex method's pattern) and, with
+         ranker="tfidf", by their best TF-IDF similarity to a code description, and the
+         best ones are sent in document order until the budget is full.
+
+    With max_calls > 1, relevant passages (score > 0) that did not fit are sent in up to
+    max_calls - 1 further prompts of the same budget; the caller merges the responses.
+    Policies within the budget are sent unchanged.
+    """
+
+    def __init__(
+        self,
+        budget_chars: int = 8000,
+        budget_tokens: Optional[int] = None,
+        passage_chars: int = 1000,
+        max_calls: int = 1,
+        ranker: str = "regex",
+        hcpcs_path: str | Path = "src/tests/inputs/hcpcs.csv",
+        index_dir: str | Path = "src/tests/cache/index",
+        index: Optional[Any] = None,
+    ):
+        if ranker not in ("regex", "tfidf"):
+            raise ValueError(f"ranker must be 'regex' or 'tfidf', got {ranker!r}")
+        self.budget_chars = budget_tokens * CHARS_PER_TOKEN if budget_tokens else budget_chars
+        if self.budget_chars <= 0:
+            raise ValueError("the prompt budget must be positive")
+        self.passage_chars = max(1, min(passage_chars, self.budget_chars))
+        self.max_calls = max(1, max_calls)
+        self.ranker = ranker
+        self.hcpcs_path = Path(hcpcs_path)
+        self.index_dir = index_dir
+        self._index = index
+        # the tfidf ranking depends on the code table, so its hash is part of params()
+        self._hcpcs_sha = sha256_file(self.hcpcs_path) if ranker == "tfidf" else None
+
+    def params(self) -> Dict[str, Any]:
+        """Everything that changes the selected text; part of the LLM cache key."""
+        params = {
+            "budget_chars": self.budget_chars,
+            "passage_chars": self.passage_chars,
+            "max_calls": self.max_calls,
+            "ranker": self.ranker,
+        }
+        if self._hcpcs_sha is not None:
+            params["hcpcs_sha"] = self._hcpcs_sha
+        return params
+
+    def select(self, text: str) -> Tuple[List[str], Dict[str, Any]]:
+        """The prompts to send for text (at least one) and statistics for the audit."""
+        if len(text) <= self.budget_chars:
+            return [text], _stats(text, [text], selected=False)
+
+        sentences, boilerplate = _dedupe_sentences(text)
+        passages = list(self._pack(sentences))
+        scores = self._scores(passages)
+        ranked = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+
+        calls: List[List[int]] = []
+        used = set()
+        for call in range(self.max_calls):
+            # the first prompt is filled with the best passages; later ones only carry relevant overflow
+            candidates = [i for i in ranked if i not in used and (call == 0 or scores[i] > 0)]
+            chosen, size = [], 0
+            for i in candidates:
+                extra = len(passages[i]) + (len(_SEPARATOR) if chosen else 0)
+                if size + extra <= self.budget_chars:
+                    chosen.append(i)
+                    size += extra
+            if not chosen:
+                break
+            used.update(chosen)
+            calls.append(sorted(chosen))
+
+        prompts = [_SEPARATOR.join(passages[i] for i in chosen) for chosen in calls]
+        stats = _stats(text, prompts, selected=True)
+        stats.update(
+            boilerplate_chars=boilerplate,
+            passages=len(passages),
+            passages_sent=len(used),
+        )
+        return prompts, stats
+
+    def _pack(self, sentences: List[str]):
+        """Consecutive sentences joined into passages of at most passage_chars."""
+        current: List[str] = []
+        size = 0
+        for sentence in sentences:
+            if len(sentence) > self.passage_chars:
+                if current:
+                    yield " ".join(current)
+                    current, size = [], 0
+                for _, _, piece in iter_passages(sentence, self.passage_chars, 0):
+                    yield piece
+                continue
+            if current and size + 1 + len(sentence) > self.passage_chars:
+                yield " ".join(current)
+                current, size = [], 0
+            size += len(sentence) + (1 if current else 0)
+            current.append(sentence)
+        if current:
+            yield " ".join(current)
+
+    def _scores(self, passages: List[str]) -> List[float]:
+        scores = [float(sum(1 for _ in CODE_PATTERN.finditer(p))) for p in passages]
+        if self.ranker == "tfidf" and passages:
+            index = self._tfidf()
+            Q = index.vectorizer.transform([normalize_text(p) for p in passages])
+            best = (Q @ index.X.T).max(axis=1).toarray().ravel()
+            scores = [s + float(b) for s, b in zip(scores, best)]
+        return scores
+
+    def _tfidf(self):
+        if self._index is None:
+            # the lexical method's persisted index; scikit-learn is imported only for this ranker
+            from src.services.inference.index.tfidf_index import TfidfIndex
+
+            self._index = TfidfIndex.load_or_build(
+                self.hcpcs_path, self.index_dir, source_sha=self._hcpcs_sha
+            )
+        return self._index
+
+
+def _dedupe_sentences(text: str) -> Tuple[List[str], int]:
+    """Sentences of text in order, repeats dropped; returns them and the characters dropped."""
+    seen_exact, seen = set(), set()
+    kept: List[str] = []
+    dropped = 0
+    for piece in _BOUNDARY.split(text):
+        sentence = piece.strip()
+        if not sentence:
+            continue
+        if len(sentence) >= _MIN_BOILERPLATE_CHARS:
+            # verbatim repeats are the common case and skip fingerprinting
+            if sentence in seen_exact:
+                dropped += len(sentence)
+                continue
+            seen_exact.add(sentence)
+            key = fingerprint_text(sentence)
+            if key in seen:
+                dropped += len(sentence)
+                continue
+            seen.add(key)
+        kept.append(sentence)
+    return kept, dropped
+
+
+def _stats(text: str, prompts: List[str], selected: bool) -> Dict[str, Any]:
+    sent = sum(len(p) for p in prompts)
+    return {
+        "selected": selected,
+        "chars_in": len(text),
+        "chars_sent": sent,
+        "reduction": round(1.0 - sent / len(text), 4) if text else 0.0,
+        "calls": len(prompts),
+    }
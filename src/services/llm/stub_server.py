@@ -0,0 +1,147 @@
+# src/services/llm/stub_server.py
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the remote LLM endpoint, used to exercise LLMClient.
+
+    Accepts {"text": ...} (and {"texts": [...]} when batching is enabled), sleeps
+    latency_s +/- jitter_s, and fails a failure_rate fraction of requests with 503.
+    Responses have the same shape as LLMClient's mock output.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        latency_s: float = 0.05,
+        jitter_s: float = 0.0,
+        failure_rate: float = 0.0,
+        supports_batch: bool = True,
+        seed: int | None = None,
+    ):
+        super().__init__(address, _StubHandler)
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.failure_rate = failure_rate
+        self.supports_batch = supports_batch
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "failures": 0, "texts": 0, "connections": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/infer"
+
+    def serve_in_thread(self) -> threading.Thread:
+        t = threading.Thread(target=self.serve_forever, name="stub-llm", daemon=True)
+        t.start()
+        return t
+
+    def _draw(self) -> Tuple[float, bool]:
+        with self._lock:
+            delay = max(0.0, self.latency_s + self._rng.uniform(-self.jitter_s, self.jitter_s))
+            fail = self._rng.random() < self.failure_rate
+        return delay, fail
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server._count("connections")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._reply(400, {"error": "invalid json"})
+
+        self.server._count("requests")
+        delay, fail = self.server._draw()
+        time.sleep(delay)
+        if fail:
+            self.server._count("failures")
+            return self._reply(503, {"error": "simulated failure"})
+
+        if "texts" in payload:
+            if not self.server.supports_batch:
+                return self._reply(422, {"error": "batching not supported"})
+            texts = payload["texts"]
+            self.server._count("texts", len(texts))
+            return self._reply(200, {"results": [_response_for(t) for t in texts]})
+
+        if "text" not in payload:
+            return self._reply(400, {"error": "missing text"})
+        self.server._count("texts")
+        return self._reply(200, _response_for(payload["text"]))
+
+    def _reply(self, status: int, body: Dict[str, Any]) -> None:
+        blob = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(blob)))
+        self.end_headers()
+        self.wfile.write(blob)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _response_for(text: str) -> Dict[str, Any]:
+    return {
+        "codes": [
+            {
+                "code": "A0428",
+                "confidence": 0.7,
+                "justification": f"Stub LLM: {len(text)} characters received."
+            }
+        ],
+        "model": "stub-llm-v1"
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in LLM endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--no-batch", action="store_true", help="Reject {\"texts\": [...]} payloads.")
+    args = parser.parse_args()
+
+    server = StubLLMServer(
+        (args.host, args.port),
+        latency_s=args.latency_ms / 1000,
+        jitter_s=args.jitter_ms / 1000,
+        failure_rate=args.failure_rate,
+        supports_batch=not args.no_batch,
+    )
+    print(f"Stub LLM listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
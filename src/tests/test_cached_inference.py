@@ -0,0 +1,245 @@
+# src/tests/test_cached_inference.py
+from __future__ import annotations
+
+import shutil
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from src.models.records import AuditRecord, CodeRecord, ResultRecord
+from src.models.schemas import now_iso
+from src.services.inference.methods import cached as cached_module
+from src.services.inference.index.tfidf_index import TfidfIndex
+from src.services.inference.methods.base import InferenceMethod
+from src.services.inference.methods.cached import CachedInference
+from src.services.inference.methods.lexical_inference import LexInference
+from src.utils.cache import MemoryCacheStore, make_cache_key, sha256_text
+from src.utils.near_dup import NearDupIndex
+
+INPUTS = Path(__file__).parent / "inputs"
+
+
+class CountingMethod(InferenceMethod):
+    """One code per text (its first word), with offsets into the text; counts the texts it scores."""
+
+    METHOD_NAME = "counting"
+
+    def __init__(self, gate: Optional[threading.Event] = None, fail: bool = False):
+        self.scored: List[str] = []
+        self.started = threading.Event()
+        self.gate = gate
+        self.fail = fail
+
+    def infer_batch(self, policy_texts, text_shas=None):
+        self.scored.extend(policy_texts)
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(timeout=10)
+        if self.fail:
+            raise RuntimeError("scoring failed")
+        return [
+            ResultRecord(
+                [CodeRecord(t.split()[0], 0.5, "first word", f"score=0.5000; passage_offsets=0-{len(t)}")],
+                AuditRecord(now_iso(), self.METHOD_NAME, {}),
+            )
+            for t in policy_texts
+        ]
+
+
+def _codes(result: ResultRecord):
+    return [(c.code, c.confidence) for c in result.inferred_codes]
+
+
+def test_duplicates_in_a_batch_are_scored_once():
+    inner = CountingMethod()
+    cached = CachedInference(inner, MemoryCacheStore())
+
+    results = cached.infer_batch(["G0008 a", "A0428 b", "G0008 a"])
+
+    assert inner.scored == ["G0008 a", "A0428 b"]
+    assert _codes(results[0]) == _codes(results[2]) == [("G0008", 0.5)]
+    assert [r.audit.parameters["cache_hit"] for r in results] == [False, False, False]
+
+    again = cached.infer("G0008 a")
+    assert again.audit.parameters["cache_hit"] is True
+    assert len(inner.scored) == 2
+
+
+def _concurrent(monkeypatch, cached: CachedInference, inner: CountingMethod, gate: threading.Event, text: str):
+    """Two callers for one text: the second arrives while the first is computing."""
+    waiting = threading.Event()
+
+    class SignallingFuture(Future):
+        def result(self, timeout=None):
+            waiting.set()
+            return super().result(timeout)
+
+    # in-flight keys get futures that report when a second caller starts waiting on them
+    monkeypatch.setattr(cached_module, "Future", SignallingFuture)
+    outcomes = {}
+
+    def call(name):
+        try:
+            outcomes[name] = cached.infer(text)
+        except Exception as e:  # noqa: BLE001 - the test inspects it
+            outcomes[name] = e
+
+    first = threading.Thread(target=call, args=("first",))
+    first.start()
+    assert inner.started.wait(timeout=10)
+    second = threading.Thread(target=call, args=("second",))
+    second.start()
+    assert waiting.wait(timeout=10)
+    gate.set()
+    first.join(timeout=10)
+    second.join(timeout=10)
+    return outcomes
+
+
+def test_concurrent_callers_share_one_computation(monkeypatch):
+    gate = threading.Event()
+    inner = CountingMethod(gate=gate)
+    cached = CachedInference(inner, MemoryCacheStore())
+
+    outcomes = _concurrent(monkeypatch, cached, inner, gate, "G0008 shared")
+
+    assert inner.scored == ["G0008 shared"]
+    assert _codes(outcomes["first"]) == _codes(outcomes["second"]) == [("G0008", 0.5)]
+    assert outcomes["second"].audit.parameters["inflight_shared"] is True
+    assert not cached._inflight
+
+
+def test_a_failed_computation_is_raised_to_every_waiting_caller(monkeypatch):
+    gate = threading.Event()
+    inner = CountingMethod(gate=gate, fail=True)
+    cached = CachedInference(inner, MemoryCacheStore())
+
+    outcomes = _concurrent(monkeypatch, cached, inner, gate, "G0008 failing")
+
+    assert isinstance(outcomes["first"], RuntimeError)
+    assert isinstance(outcomes["second"], RuntimeError)
+    assert inner.scored == ["G0008 failing"]
+    assert not cached._inflight
+
+    # nothing was cached, so the next call computes again
+    inner.fail = False
+    assert _codes(cached.infer("G0008 failing")) == [("G0008", 0.5)]
+    assert len(inner.scored) == 2
+
+
+def test_a_wrong_result_count_fails_instead_of_hanging():
+    class ShortMethod(CountingMethod):
+        def infer_batch(self, policy_texts, text_shas=None):
+            return super().infer_batch(policy_texts)[:-1]
+
+    cached = CachedInference(ShortMethod(), MemoryCacheStore())
+    with pytest.raises(RuntimeError, match="returned 1 results for 2 texts"):
+        cached.infer_batch(["G0008 a", "A0428 b"])
+    assert not cached._inflight
+
+
+# -- refresh after an incremental index update ---------------------------------
+
+POLICY = "Frozen blood thaw and frozen blood preparation are covered when medically necessary."
+
+
+def _assert_same_codes(result: ResultRecord, expected: ResultRecord) -> None:
+    assert [c.code for c in result.inferred_codes] == [c.code for c in expected.inferred_codes]
+    assert [c.confidence for c in result.inferred_codes] == pytest.approx([c.confidence for c in expected.inferred_codes])
+
+
+def _lexical(table: Path, index: TfidfIndex) -> LexInference:
+    return LexInference(hcpcs_path=table, index=index)
+
+
+def _revised_table(tmp_path: Path, extra_rows: str, replace: Optional[tuple] = None) -> Path:
+    text = (INPUTS / "hcpcs.csv").read_text(encoding="utf-8")
+    if replace is not None:
+        text = text.replace(*replace)
+    path = tmp_path / "hcpcs_revised.csv"
+    path.write_text(text.rstrip("\n") + "\n" + extra_rows, encoding="utf-8")
+    return path
+
+
+def _refresh_setup(tmp_path: Path, revised: Path):
+    base_table = tmp_path / "hcpcs.csv"
+    shutil.copy(INPUTS / "hcpcs.csv", base_table)
+    base = TfidfIndex.fit(base_table)
+    store = MemoryCacheStore()
+    before = CachedInference(_lexical(base_table, base), store).infer(POLICY)
+    updated = _lexical(revised, base.update(revised))
+    return before, updated, store
+
+
+def test_results_for_the_previous_table_are_refreshed(tmp_path):
+    revised = _revised_table(tmp_path, "Z9901,Frozen blood thaw service\n")
+    before, updated, store = _refresh_setup(tmp_path, revised)
+    cached = CachedInference(updated, store)
+
+    after = cached.infer(POLICY)
+
+    assert after.audit.parameters["cache_refreshed"] is True
+    assert after.audit.parameters["cache_hit"] is False
+    assert "Z9901" in [c.code for c in after.inferred_codes]
+    assert "Z9901" not in [c.code for c in before.inferred_codes]
+    # the refreshed result is what scoring from scratch on the updated index gives
+    _assert_same_codes(after, updated.infer(POLICY))
+
+    # and it is stored under the new key
+    assert cached.infer(POLICY).audit.parameters["cache_hit"] is True
+
+
+def test_results_holding_a_changed_code_are_recomputed(tmp_path):
+    revised = _revised_table(
+        tmp_path, "Z9901,Frozen blood thaw service\n", replace=("86931,Frozen blood thaw", "86931,Frozen plasma thaw")
+    )
+    before, updated, store = _refresh_setup(tmp_path, revised)
+    assert "86931" in [c.code for c in before.inferred_codes]
+
+    after = CachedInference(updated, store).infer(POLICY)
+
+    assert "cache_refreshed" not in after.audit.parameters
+    assert after.audit.parameters["cache_hit"] is False
+    _assert_same_codes(after, updated.infer(POLICY))
+
+
+# -- near-duplicate reuse --------------------------------------------------------
+
+TEMPLATE = " ".join(f"Clause {i} of the prior authorization policy for durable medical equipment." for i in range(40))
+
+
+def test_near_duplicates_reuse_results_without_storing_them():
+    inner = CountingMethod()
+    store = MemoryCacheStore()
+    cached = CachedInference(inner, store, near_dup=NearDupIndex(threshold=0.8))
+    original = "E0100 " + TEMPLATE
+    revised = "E0100 " + TEMPLATE + " Revised."
+
+    first = cached.infer(original)
+    reused = cached.infer(revised)
+
+    assert inner.scored == [original]
+    assert _codes(reused) == _codes(first)
+    assert reused.audit.parameters["cache_hit"] is False
+    near = reused.audit.parameters["near_duplicate"]
+    assert near["text_sha"] == sha256_text(original)
+    assert near["similarity"] >= 0.8
+    # offsets point into the other text and are dropped
+    assert first.inferred_codes[0].details.endswith(f"passage_offsets=0-{len(original)}")
+    assert reused.inferred_codes[0].details == "score=0.5000"
+
+    key = make_cache_key(method=inner.METHOD_NAME, policy_text_sha=sha256_text(revised), params=inner.cache_params())
+    assert store.get(key) is None
+
+
+def test_unrelated_texts_are_scored():
+    inner = CountingMethod()
+    cached = CachedInference(inner, MemoryCacheStore(), near_dup=NearDupIndex(threshold=0.8))
+    cached.infer("E0100 " + TEMPLATE)
+    other = cached.infer("A0428 Ambulance transport is covered for emergencies only. " * 10)
+
+    assert "near_duplicate" not in other.audit.parameters
+    assert len(inner.scored) == 2
@@ -0,0 +1,83 @@
+# src/tests/test_checkpoint.py
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.utils.checkpoint import Checkpoint
+from src.utils.streams import ResultWriter
+
+METHODS = ["regex"]
+
+
+def _inputs(n: int):
+    # the last record has no policy_id and is keyed by its row
+    return [({"policy_id": f"p{i}" if i < n - 1 else "", "row": i}, f"text {i}") for i in range(n)]
+
+
+def _result(meta, text):
+    return {"policy_id": meta["policy_id"], "row": meta["row"], "text": text}
+
+
+def _run(tmp_path, fmt, records, crash_after=None, commit_every=3):
+    """One run_pipeline-style pass; crash_after stops it without a final commit, like a kill."""
+    output = tmp_path / f"out.{fmt}"
+    checkpoint = Checkpoint(tmp_path / "run.checkpoint", output, METHODS, fmt, commit_every=commit_every)
+    writer = ResultWriter(output, output_format=fmt, resume=checkpoint.resume_point, flush_every=1)
+    written = 0
+    for meta, text in checkpoint.pending(records):
+        if crash_after is not None and written == crash_after:
+            break
+        record = _result(meta, text)
+        writer.write(record)
+        checkpoint.mark(record, writer)
+        written += 1
+    else:
+        checkpoint.commit(writer)
+    writer.close()
+    checkpoint.close()
+    return checkpoint, output
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl"])
+def test_resume_after_crash_matches_uninterrupted_run(tmp_path, fmt):
+    records = _inputs(10)
+    _, reference = _run(tmp_path / "ref", fmt, records)
+
+    # 7 written, 6 committed: the 7th record is past the checkpoint and is written again
+    first, _ = _run(tmp_path / "run", fmt, records, crash_after=7)
+    assert (first.count, len(first.done)) == (6, 6)
+
+    second, output = _run(tmp_path / "run", fmt, records)
+    assert second.resumed
+    assert second.skipped == 6
+    assert output.read_bytes() == reference.read_bytes()
+
+
+def test_keys_use_row_when_policy_id_is_missing(tmp_path):
+    checkpoint, _ = _run(tmp_path, "jsonl", _inputs(4), commit_every=1)
+    assert checkpoint.done == {"p0", "p1", "p2", "row:3"}
+
+
+def test_torn_log_line_is_dropped(tmp_path):
+    records = _inputs(6)
+    _run(tmp_path, "jsonl", records, crash_after=4, commit_every=2)
+    log = tmp_path / "run.checkpoint"
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('{"offset": 99999, "count": 5, "keys": ["p')
+
+    checkpoint = Checkpoint(log, tmp_path / "out.jsonl", METHODS, "jsonl")
+    checkpoint.close()
+    assert checkpoint.done == {"p0", "p1", "p2", "p3"}
+    assert log.read_bytes().endswith(b"\n")
+
+    _, output = _run(tmp_path, "jsonl", records)
+    rows = [json.loads(line)["row"] for line in output.read_text(encoding="utf-8").splitlines()]
+    assert rows == list(range(6))
+
+
+def test_checkpoint_of_another_run_is_rejected(tmp_path):
+    _run(tmp_path, "jsonl", _inputs(3))
+    with pytest.raises(ValueError, match="belongs to another run"):
+        Checkpoint(tmp_path / "run.checkpoint", tmp_path / "out.jsonl", ["regex", "lexical"], "jsonl")
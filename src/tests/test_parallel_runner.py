@@ -0,0 +1,50 @@
+# src/tests/test_parallel_runner.py
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+
+from src.services.inference.runner import iter_pipeline_records
+from src.utils.parser import to_jsonable
+
+INPUTS = Path(__file__).parent / "inputs"
+
+# per run, not per result: the wall-clock parts of an audit
+_VOLATILE = {"timestamp", "timings"}
+
+
+def _corpus(n: int = 30):
+    with open(INPUTS / "hcpcs.csv", "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    records = []
+    for i in range(n):
+        picked = rows[i * 37 % len(rows)], rows[(i * 53 + 11) % len(rows)]
+        text = " ".join(f"{r['description']} ({r['code']}) is covered." for r in picked)
+        # blank policies are dropped by both paths
+        records.append(({"row": i, "policy_id": f"p{i}"}, "  " if i % 9 == 4 else text))
+    return records
+
+
+def _stable(value):
+    if isinstance(value, dict):
+        return {k: _stable(v) for k, v in value.items() if k not in _VOLATILE}
+    if isinstance(value, list):
+        return [_stable(v) for v in value]
+    return value
+
+
+def _run(records, **kwargs):
+    out = iter_pipeline_records(records, ["regex", "lexical"], use_cache=False, batch_size=4, **kwargs)
+    return [_stable(to_jsonable(r)) for r in out]
+
+
+def test_workers_match_a_serial_run(tmp_path, monkeypatch):
+    monkeypatch.setenv("LEXICAL_INDEX_DIR", str(tmp_path / "index"))
+    records = _corpus()
+
+    serial = _run(records)
+    parallel = _run(records, workers=2)
+
+    assert [r["row"] for r in serial] == [i for i in range(30) if i % 9 != 4]
+    assert all(r["output"]["inferred_codes"] for r in serial)
+    assert parallel == serial
@@ -0,0 +1,55 @@
+# src/tests/test_regex_scan.py
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from src.services.inference.methods.regex_inference import CODE_PATTERN, RegexInference, scan_chunks
+
+INPUTS = Path(__file__).parent / "inputs"
+
+# codes next to every kind of boundary the scanner has to carry across chunks:
+# word boundaries, "CPT"/"ICD-10" prefixes with whitespace runs, ICD-10 dots and case
+TEXT = (
+    "Covered: G0008 and A0428; not XG0008 or G00081. CPT 99213, CPT®99214 and cpt   99215. "
+    "ICD-10 Z00.00, ICD10-CM E11.9 and icd-10 z12.11 apply.\n"
+    "Repeat G0008 at the end of a line\nJ0120"
+)
+
+
+def _whole_text_hits(text: str):
+    hits = []
+    for m in CODE_PATTERN.finditer(text):
+        system = m.lastgroup
+        start, end = m.span(system)
+        hits.append((system, m.group(system).upper(), start, end))
+    return hits
+
+
+def _chunks(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, 63, 64, 65, 1000])
+def test_scan_chunks_matches_whole_text_scan(size):
+    expected = _whole_text_hits(TEXT)
+    assert expected  # the fixture text must exercise the scanner
+    assert list(scan_chunks(_chunks(TEXT, size))) == expected
+
+
+@pytest.mark.parametrize("margin", [16, 64])
+def test_scan_chunks_small_margin_and_empty_chunks(margin):
+    chunks = ["", *_chunks(TEXT, 9), ""]
+    assert list(scan_chunks(chunks, margin=margin)) == _whole_text_hits(TEXT)
+
+
+def test_infer_is_independent_of_chunk_size():
+    whole = RegexInference(hcpcs_path=INPUTS / "hcpcs.csv").infer(TEXT)
+    chunked = RegexInference(hcpcs_path=INPUTS / "hcpcs.csv", chunk_chars=4).infer(TEXT)
+
+    def summary(result):
+        return [(c.code_system, c.code, c.details) for c in result.inferred_codes]
+
+    assert summary(chunked) == summary(whole)
+    assert chunked.audit.parameters["rejected"] == whole.audit.parameters["rejected"]
@@ -3,9 +3,13 @@ from __future__ import annotations
 
 import hashlib
 import json
-from typing import Any, Dict
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
 from pathlib import Path
-import hashlib
 
 def sha256_file(path: str | Path) -> str:
     p = Path(path)
@@ -21,17 +25,304 @@ def normalize_text(text: str) -> str:
 def sha256_text(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-def make_cache_key(*, method: str, policy_text: str, params: Dict[str, Any]) -> str:
+def make_cache_key(
+    *,
+    method: str,
+    params: Dict[str, Any],
+    policy_text: Optional[str] = None,
+    policy_text_sha: Optional[str] = None,
+) -> str:
     """
     Cache key depends on:
       - method
-      - normalized text hash
+      - normalized text hash (pass policy_text_sha to reuse a hash computed once per document)
       - params (sorted JSON)
     """
+    if policy_text_sha is None:
+        if policy_text is None:
+            raise ValueError("make_cache_key needs policy_text or policy_text_sha")
+        policy_text_sha = sha256_text(policy_text)
+
     payload = {
         "method": method,
-        "policy_text_sha": sha256_text(policy_text),
+        "policy_text_sha": policy_text_sha,
         "params": params,
     }
     blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
-    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
\ No newline at end of file
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class CacheStore:
+    """
+    Key -> InferenceResult-dict store. Backends implement get/put;
+    batch helpers default to per-key calls.
+    """
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for k in keys:
+            v = self.get(k)
+            if v is not None:
+                out[k] = v
+        return out
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        for k, v in items.items():
+            self.put(k, v)
+
+    def close(self) -> None:
+        pass
+
+
+class HotTier:
+    """
+    Bounded in-process LRU in front of a persistent store.
+    Values are kept as JSON text so callers can never mutate a shared entry.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            created_at, blob = hit
+            if self.ttl_s is not None and time.time() - created_at > self.ttl_s:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return json.loads(blob)
+
+    def put(self, key: str, blob: str, created_at: float) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (created_at, blob)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class MemoryCacheStore(CacheStore):
+    """Process-local store (no persistence); useful for one-off runs."""
+
+    def __init__(self, max_entries: int = 10_000, ttl_s: Optional[float] = None, **_: Any):
+        self.path = None
+        self._hot = HotTier(max_entries=max_entries, ttl_s=ttl_s)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._hot.get(key)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self._hot.put(key, json.dumps(value), time.time())
+
+
+class SQLiteCacheStore(CacheStore):
+    """
+    Indexed on-disk cache: single-key lookups/inserts, LRU + TTL eviction,
+    bounded hot tier, WAL journaling so several worker processes can share one file.
+
+    A v1 JSON cache ({"version": "v1", "entries": {...}}) is not imported: its entries
+    were keyed under cache params no current method produces, so old results are
+    discarded and recomputed on first use.
+    """
+
+    SCHEMA_VERSION = "v2"
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = 100_000,
+        ttl_s: Optional[float] = None,
+        hot_entries: int = 1024,
+        evict_every: int = 256,
+        touch_interval_s: float = 60.0,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.evict_every = evict_every
+        self.touch_interval_s = touch_interval_s
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._hot = HotTier(max_entries=hot_entries, ttl_s=ttl_s)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._puts_since_evict = 0
+
+        self._init_schema()
+
+    # -- connection management -------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        # connections must not cross a fork; reopen in child processes
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _init_schema(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries(accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "INSERT OR IGNORE INTO meta(key, value) VALUES ('schema_version', ?)", (self.SCHEMA_VERSION,)
+            )
+
+    # -- CacheStore API --------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for k in keys:
+            v = self._hot.get(k)
+            if v is not None:
+                out[k] = v
+            else:
+                pending.append(k)
+
+        if not pending:
+            return out
+
+        now = time.time()
+        expired, touched = [], []
+        with self._lock:
+            conn = self._connection()
+            # stay well below SQLITE_MAX_VARIABLE_NUMBER
+            for start in range(0, len(pending), 500):
+                chunk = pending[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, value, created_at, accessed_at FROM entries WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob, created_at, accessed_at in rows:
+                    if self.ttl_s is not None and now - created_at > self.ttl_s:
+                        expired.append(key)
+                        continue
+                    out[key] = json.loads(blob)
+                    self._hot.put(key, blob, created_at)
+                    if now - accessed_at > self.touch_interval_s:
+                        touched.append(key)
+
+            # LRU bookkeeping is coarse-grained so reads rarely need a write lock
+            if touched:
+                conn.executemany("UPDATE entries SET accessed_at = ? WHERE key = ?", [(now, k) for k in touched])
+            if expired:
+                conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in expired])
+
+        return out
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self.put_many({key: value})
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        if not items:
+            return
+
+        now = time.time()
+        rows = [(k, json.dumps(v), now, now) for k, v in items.items()]
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries(key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)", rows
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            for key, blob, created_at, _ in rows:
+                self._hot.put(key, blob, created_at)
+
+            self._puts_since_evict += len(rows)
+            if self._puts_since_evict >= self.evict_every:
+                self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones beyond max_entries."""
+        with self._lock:
+            conn = self._connection()
+            self._puts_since_evict = 0
+            removed = 0
+            if self.ttl_s is not None:
+                removed += conn.execute(
+                    "DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_s,)
+                ).rowcount
+
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                removed += conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                ).rowcount
+            return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+CACHE_BACKENDS = {
+    "sqlite": SQLiteCacheStore,
+    "memory": MemoryCacheStore,
+}
+
+
+def open_cache_store(path: str | Path, backend: Optional[str] = None, **kwargs: Any) -> CacheStore:
+    """
+    Open the configured cache backend (CACHE_BACKEND env, default sqlite).
+    A ".json" path names a legacy v1 file: the SQLite store lives next to it, and the
+    JSON entries are left unread (see SQLiteCacheStore).
+    """
+    backend = (backend or os.getenv("CACHE_BACKEND", "sqlite")).lower()
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown cache backend: {backend}. Allowed: {sorted(CACHE_BACKENDS)}")
+
+    if os.getenv("CACHE_MAX_ENTRIES"):
+        kwargs.setdefault("max_entries", int(os.environ["CACHE_MAX_ENTRIES"]))
+    if os.getenv("CACHE_TTL_S"):
+        kwargs.setdefault("ttl_s", float(os.environ["CACHE_TTL_S"]))
+
+    p = Path(path)
+    if backend == "sqlite":
+        sqlite_path = p.with_suffix(".sqlite") if p.suffix == ".json" else p
+        return SQLiteCacheStore(sqlite_path, **kwargs)
+
+    return CACHE_BACKENDS[backend](**kwargs)
@@ -0,0 +1,145 @@
+# src/utils/checkpoint.py
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.utils.metrics import span
+from src.utils.streams import PolicyRecord, ResultWriter
+
+CHECKPOINT_VERSION = 1
+
+
+def record_key(record: Dict[str, Any]) -> str:
+    """Checkpoint key of an input (metadata) or output record: its policy_id, else its row."""
+    if record.get("policy_id") not in (None, ""):
+        return str(record["policy_id"])
+    return f"row:{record['row']}"
+
+
+class Checkpoint:
+    """
+    Durable progress of a corpus run: which policies are in the output file, and how
+    much of that file is complete.
+
+    The checkpoint is an append-only JSONL log. Its first line names the output file,
+    format and methods; every further line is one commit,
+    {"offset": bytes of complete output, "count": records in them, "keys": [...]}.
+    commit() fsyncs the output before it appends (and fsyncs) the log line, so a logged
+    key is always backed by durable output. Commits are batched, every commit_every
+    records or commit_interval_s seconds, to keep both fsyncs off the per-record path.
+
+    Reopening an existing log resumes the run: pending() skips the logged policies and
+    resume_point tells ResultWriter where the complete output ends. A line torn by a
+    crash is dropped.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        output_path: str | Path,
+        methods: List[str],
+        output_format: str,
+        commit_every: int = 256,
+        commit_interval_s: float = 5.0,
+    ):
+        self.path = Path(path)
+        self.commit_every = max(1, commit_every)
+        self.commit_interval_s = commit_interval_s
+        self.done: Set[str] = set()
+        self.offset = 0
+        self.count = 0
+        self.skipped = 0
+        self._pending: List[str] = []
+        self._last_commit = time.monotonic()
+
+        header = {
+            "version": CHECKPOINT_VERSION,
+            "output": str(Path(output_path).resolve()),
+            "output_format": output_format,
+            "methods": list(methods),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        existing = self._load()
+        if existing is None:
+            self.resumed = False
+            self._f = open(self.path, "w", encoding="utf-8")
+            self._append(header)
+        else:
+            if existing != header:
+                raise ValueError(
+                    f"checkpoint {self.path} belongs to another run ({existing}); "
+                    f"remove it or choose another checkpoint path"
+                )
+            self.resumed = True
+            self._f = open(self.path, "a", encoding="utf-8")
+
+    @property
+    def resume_point(self) -> Optional[Tuple[int, int]]:
+        """(offset, count) for ResultWriter(resume=...), or None for a fresh run."""
+        return (self.offset, self.count) if self.resumed else None
+
+    def pending(self, records: Iterable[PolicyRecord]) -> Iterator[PolicyRecord]:
+        """The records not yet in the checkpoint."""
+        for meta, text in records:
+            if record_key(meta) in self.done:
+                self.skipped += 1
+                continue
+            yield meta, text
+
+    def mark(self, record: Dict[str, Any], writer: ResultWriter) -> None:
+        """Note that record was written by writer; commits when a batch is due."""
+        self._pending.append(record_key(record))
+        if len(self._pending) >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval_s:
+            self.commit(writer)
+
+    def commit(self, writer: ResultWriter) -> None:
+        if self._pending:
+            with span("checkpoint", component="writer"):
+                self.offset = writer.sync()
+                self.count = writer.count
+                self._append({"offset": self.offset, "count": self.count, "keys": self._pending})
+                self.done.update(self._pending)
+                self._pending = []
+        self._last_commit = time.monotonic()
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(entry) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        if not self.path.exists():
+            return None
+        with open(self.path, "rb") as f:
+            blob = f.read()
+        end = blob.rfind(b"\n") + 1
+        if end < len(blob):
+            # a line torn by a crash mid-append; drop it so the next commit starts clean
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+        lines = blob[:end].splitlines()
+        if not lines:
+            return None
+
+        header = json.loads(lines[0])
+        for line in lines[1:]:
+            entry = json.loads(line)
+            self.done.update(entry["keys"])
+            self.offset = entry["offset"]
+            self.count = entry["count"]
+        return header
@@ -0,0 +1,237 @@
+# src/utils/columnar.py
+from __future__ import annotations
+
+import csv
+import gzip
+import importlib.util
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from src.utils.metrics import span
+from src.utils.parser import to_jsonable
+
+COLUMNAR_FORMAT_VERSION = "columnar-v1"
+COLUMNAR_BACKENDS = ("auto", "parquet", "npz", "csv")
+
+CODE_COLUMNS = ("record", "policy_id", "method", "code_system", "code", "confidence", "justification_id")
+RESULT_COLUMNS = ("record", "row", "policy_id", "method", "timestamp", "n_codes", "audit_id")
+_INT_COLUMNS = {"record", "row", "n_codes", "justification_id", "audit_id"}
+_FLOAT_COLUMNS = {"confidence"}
+
+_EXTENSIONS = {"parquet": "parquet", "npz": "npz", "csv": "csv.gz"}
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    """parquet when pyarrow is installed, else compressed npz; explicit choices are checked."""
+    if backend not in COLUMNAR_BACKENDS:
+        raise ValueError(f"backend must be one of {COLUMNAR_BACKENDS}, got {backend!r}")
+    if backend == "auto":
+        return "parquet" if parquet_available() else "npz"
+    if backend == "parquet" and not parquet_available():
+        raise ValueError("the parquet backend needs pyarrow (pip install pyarrow); use npz or csv instead")
+    return backend
+
+
+class ColumnarWriter:
+    """
+    Bulk output as flat tables instead of nested JSON, written into the directory at path:
+
+      codes-00000.<ext>    one row per inferred code: record, policy_id, method,
+                           code_system, code, confidence, justification_id
+      results-00000.<ext>  one row per (record, method): record, row, policy_id, method,
+                           timestamp, n_codes, audit_id
+      dictionary.json.gz   {"justifications": [[reason, details], ...], "audits": [parameters, ...]}
+      manifest.json        format version, backend, columns, parts and counts
+
+    "record" numbers the written records from 0. Each method's output and the merged
+    output (method "orchestrator") are separate results rows. Justifications and audit
+    parameters are stored once in the dictionary and referenced by id. A policy's audit
+    can be rebuilt from its results row plus the audit entry.
+
+    The backend is parquet (zstd) when pyarrow is installed, otherwise compressed npz;
+    gzipped CSV is available for tools that read neither. Tables are written in parts of
+    part_records records, so memory is bounded by a part plus the dictionary.
+    manifest.json is written last and marks a complete output.
+    """
+
+    def __init__(self, path: str | Path, backend: str = "auto", part_records: int = 10_000):
+        self.path = Path(path)
+        self.backend = resolve_backend(backend)
+        self.part_records = max(1, part_records)
+        self.count = 0
+        self.n_codes = 0
+        self._parts: List[str] = []
+        self._justifications: Dict[Tuple[str, Any], int] = {}
+        self._audits: Dict[str, int] = {}
+        self._reset_part()
+
+        if self.path.exists():
+            if not self.path.is_dir():
+                raise ValueError(f"columnar output {self.path} must be a directory")
+            # a previous columnar output is replaced, like a JSON output file
+            if (self.path / "manifest.json").exists():
+                shutil.rmtree(self.path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, record: Any) -> None:
+        with span("serialize", component="writer"):
+            data = to_jsonable(record)
+            policy_id = data.get("policy_id")
+            policy_id = "" if policy_id is None else str(policy_id)
+            row = data.get("row")
+            outputs = [(m["method"], m["output"]) for m in data.get("by_method", [])]
+            if "output" in data:
+                outputs.append((data["output"]["audit"]["method"], data["output"]))
+
+            codes, results = self._codes, self._results
+            for method, output in outputs:
+                audit = output["audit"]
+                inferred = output["inferred_codes"]
+                results["record"].append(self.count)
+                results["row"].append(-1 if row is None else int(row))
+                results["policy_id"].append(policy_id)
+                results["method"].append(method)
+                results["timestamp"].append(audit["timestamp"])
+                results["n_codes"].append(len(inferred))
+                results["audit_id"].append(self._audit_id(audit["parameters"]))
+                for c in inferred:
+                    just = c.get("justification") or {}
+                    codes["record"].append(self.count)
+                    codes["policy_id"].append(policy_id)
+                    codes["method"].append(method)
+                    codes["code_system"].append(c.get("code_system") or "")
+                    codes["code"].append(c["code"])
+                    codes["confidence"].append(c["confidence"])
+                    codes["justification_id"].append(self._justification_id(just.get("reason"), just.get("details")))
+                self.n_codes += len(inferred)
+
+        self.count += 1
+        self._part_count += 1
+        if self._part_count >= self.part_records:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records as the next part."""
+        if not self._part_count:
+            return
+        with span("write_part", component="writer"):
+            name = f"{len(self._parts):05d}.{_EXTENSIONS[self.backend]}"
+            _write_table(self.path / f"codes-{name}", self._codes, CODE_COLUMNS, self.backend)
+            _write_table(self.path / f"results-{name}", self._results, RESULT_COLUMNS, self.backend)
+            self._parts.append(name)
+        self._reset_part()
+
+    def close(self) -> None:
+        if self._codes is None:
+            return
+        self.flush()
+        with gzip.open(self.path / "dictionary.json.gz", "wt", encoding="utf-8") as f:
+            f.write('{"justifications": ')
+            json.dump([list(k) for k in self._justifications], f, ensure_ascii=False)
+            # audit entries are kept as their JSON text and spliced in unparsed
+            f.write(', "audits": [' + ",".join(self._audits) + "]}")
+        manifest = {
+            "format_version": COLUMNAR_FORMAT_VERSION,
+            "backend": self.backend,
+            "records": self.count,
+            "codes": self.n_codes,
+            "justifications": len(self._justifications),
+            "audits": len(self._audits),
+            "parts": self._parts,
+            "columns": {"codes": list(CODE_COLUMNS), "results": list(RESULT_COLUMNS)},
+        }
+        with (self.path / "manifest.json").open("w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        self._codes = self._results = None
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _reset_part(self) -> None:
+        self._codes: Dict[str, list] = {c: [] for c in CODE_COLUMNS}
+        self._results: Dict[str, list] = {c: [] for c in RESULT_COLUMNS}
+        self._part_count = 0
+
+    def _justification_id(self, reason: str, details: Any) -> int:
+        key = (reason, details)
+        jid = self._justifications.get(key)
+        if jid is None:
+            jid = self._justifications[key] = len(self._justifications)
+        return jid
+
+    def _audit_id(self, parameters: Dict[str, Any]) -> int:
+        blob = json.dumps(parameters, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        aid = self._audits.get(blob)
+        if aid is None:
+            aid = self._audits[blob] = len(self._audits)
+        return aid
+
+
+def load_columnar(path: str | Path) -> Dict[str, Any]:
+    """
+    Read a ColumnarWriter output back as {"codes": DataFrame, "results": DataFrame,
+    "justifications": [...], "audits": [...], "manifest": {...}}.
+    """
+    import pandas as pd
+
+    path = Path(path)
+    with (path / "manifest.json").open("r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != COLUMNAR_FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format: {manifest.get('format_version')}")
+    with gzip.open(path / "dictionary.json.gz", "rt", encoding="utf-8") as f:
+        dictionary = json.load(f)
+
+    tables = {}
+    for table, columns in manifest["columns"].items():
+        frames = [_read_table(path / f"{table}-{part}", columns, manifest["backend"]) for part in manifest["parts"]]
+        tables[table] = (
+            pd.concat(frames, ignore_index=True) if frames else pd.DataFrame({c: [] for c in columns})
+        )
+    return {**tables, **dictionary, "manifest": manifest}
+
+
+def _write_table(path: Path, columns: Dict[str, list], names: Tuple[str, ...], backend: str) -> None:
+    if backend == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table({c: columns[c] for c in names}), path, compression="zstd")
+    elif backend == "npz":
+        np.savez_compressed(path, **{c: _array(c, columns[c]) for c in names})
+    else:
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(columns[c] for c in names)))
+
+
+def _read_table(path: Path, names: List[str], backend: str):
+    import pandas as pd
+
+    if backend == "parquet":
+        return pd.read_parquet(path)
+    if backend == "npz":
+        with np.load(path) as arrays:
+            return pd.DataFrame({c: arrays[c] for c in names})
+    dtypes = {c: ("int64" if c in _INT_COLUMNS else "float64" if c in _FLOAT_COLUMNS else str) for c in names}
+    return pd.read_csv(path, dtype=dtypes, keep_default_na=False, float_precision="round_trip")
+
+
+def _array(name: str, values: list) -> np.ndarray:
+    if name in _INT_COLUMNS:
+        return np.asarray(values, dtype=np.int64)
+    if name in _FLOAT_COLUMNS:
+        return np.asarray(values, dtype=np.float64)
+    return np.asarray(values, dtype=str)
@@ -0,0 +1,152 @@
+# src/utils/metrics.py
+from __future__ import annotations
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# seconds; chosen to resolve both sub-millisecond stages and multi-second LLM calls
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Process-local counters and histograms, rendered in the Prometheus text format.
+
+    Metric names are declared implicitly on first use; labels are plain dicts.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, help: str = "", **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self.buckets)
+            hist.observe(value)
+            if help:
+                self._help.setdefault(name, help)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines += self._header(name, "counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(value)}")
+
+            for name in sorted(self._histograms):
+                lines += self._header(name, "histogram")
+                for key, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, n in zip(hist.buckets + (float("inf"),), hist.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else _fmt_value(bound)
+                        lines.append(f"{name}_bucket{_fmt_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_fmt_labels(key)} {_fmt_value(hist.sum)}")
+                    lines.append(f"{name}_count{_fmt_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name: str, kind: str) -> List[str]:
+        out = [f"# HELP {name} {self._help[name]}"] if name in self._help else []
+        return out + [f"# TYPE {name} {kind}"]
+
+
+def _fmt_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+    return "{" + body + "}"
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(v: float) -> str:
+    return repr(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_METRIC = "inference_stage_seconds"
+STAGE_HELP = "Wall time of one pipeline stage call."
+
+# stage -> seconds accumulated by the spans of the current collect_spans() block
+_collector: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("span_collector", default=None)
+
+
+@contextmanager
+def span(stage: str, component: str = "pipeline") -> Iterator[None]:
+    """
+    Time one stage. Inside collect_spans() the duration is added to that collector
+    (whoever opened it decides how it is reported); otherwise it is observed directly
+    as inference_stage_seconds{component, stage}.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        spans = _collector.get()
+        if spans is not None:
+            spans[stage] = spans.get(stage, 0.0) + elapsed
+        else:
+            REGISTRY.observe(STAGE_METRIC, elapsed, help=STAGE_HELP, component=component, stage=stage)
+
+
+@contextmanager
+def collect_spans() -> Iterator[Dict[str, float]]:
+    """Collect the spans of this thread/context into a dict of stage -> total seconds."""
+    spans: Dict[str, float] = {}
+    token = _collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
@@ -0,0 +1,217 @@
+# src/utils/near_dup.py
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.cache import normalize_text
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX32 = np.uint64(0xFFFFFFFF)
+
+# dates vary between re-postings of the same policy; they are masked before shingling
+_DATE_RE = re.compile(
+    r"\b(?:\d{1,4}[/.-]\d{1,2}[/.-]\d{1,4}"
+    r"|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.? \d{1,2},? \d{4})\b"
+)
+
+
+def fingerprint_text(text: str) -> str:
+    """normalize_text with dates masked: the text the near-duplicate fingerprint is taken over."""
+    return _DATE_RE.sub("<date>", normalize_text(text))
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles of fingerprint_text().
+
+    Tokens are hashed with crc32, shingle hashes are combined from them with numpy, and
+    the num_perm permutations are evaluated as one (num_perm, num_shingles) array
+    operation. The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the two shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_words: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = fingerprint_text(text).split()
+        if not words:
+            return np.zeros(1, dtype=np.uint64)
+        tokens = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+        k = min(self.shingle_words, len(tokens))
+        n = len(tokens) - k + 1
+        h = np.zeros(n, dtype=np.uint64)
+        for j in range(k):
+            # polynomial combination; uint64 arithmetic wraps, which is fine for hashing
+            h = h * np.uint64(1000003) + tokens[j:j + n]
+        return np.unique(h & _MAX32)
+
+    def signature(self, text: str, block: int = 4096) -> np.ndarray:
+        sh = self.shingles(text)
+        sig = np.full(self.num_perm, _MAX32, dtype=np.uint64)
+        # a*x + b stays below 2**64 for 32-bit a, b, x
+        for lo in range(0, len(sh), block):
+            hv = ((self._a * sh[None, lo:lo + block] + self._b) % _MERSENNE) & _MAX32
+            np.minimum(sig, hv.min(axis=1), out=sig)
+        return sig.astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+class NearDupIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures, keyed by text sha.
+
+    Signatures are split into `bands` bands of num_perm / bands rows; two texts become
+    candidates when any band hashes to the same bucket, and candidates are then checked
+    against `threshold` with the full-signature similarity estimate. With 16 bands of
+    8 rows, pairs at 0.9 similarity collide with probability > 0.99 while pairs below
+    0.5 rarely do.
+
+    Signatures and buckets live in SQLite (WAL, like the result cache) so the index
+    persists across runs and is shared by worker processes; path=None keeps it in memory.
+    Recently computed signatures are memoised, so every method of a batch hashes a
+    text once.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_words: int = 5,
+        memo_entries: int = 1024,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.path = Path(path) if path is not None else None
+        self.threshold = threshold
+        self.bands = bands
+        self.hasher = MinHasher(num_perm=num_perm, shingle_words=shingle_words)
+        self._rows = num_perm // bands
+        self._memo: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memo_entries = memo_entries
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        # connections must not cross a fork; reopen in child processes
+        if self._conn is None or self._pid != os.getpid():
+            target = str(self.path) if self.path is not None else ":memory:"
+            conn = sqlite3.connect(target, timeout=30.0, isolation_level=None, check_same_thread=False)
+            if self.path is not None:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _init_schema(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("CREATE TABLE IF NOT EXISTS signatures (text_sha TEXT PRIMARY KEY, sig BLOB NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " band INTEGER NOT NULL, bucket INTEGER NOT NULL, text_sha TEXT NOT NULL,"
+                " PRIMARY KEY (band, bucket, text_sha))"
+            )
+
+    def signature(self, text_sha: str, text: str) -> np.ndarray:
+        with self._lock:
+            sig = self._memo.get(text_sha)
+            if sig is not None:
+                self._memo.move_to_end(text_sha)
+                return sig
+        sig = self.hasher.signature(text)
+        with self._lock:
+            self._memo[text_sha] = sig
+            while len(self._memo) > self._memo_entries:
+                self._memo.popitem(last=False)
+        return sig
+
+    def add_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """Index (text_sha, text) pairs."""
+        sig_rows, bucket_rows = [], []
+        for text_sha, text in items:
+            sig = self.signature(text_sha, text)
+            sig_rows.append((text_sha, sig.tobytes()))
+            bucket_rows.extend((band, bucket, text_sha) for band, bucket in self._band_keys(sig))
+        if not sig_rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR IGNORE INTO signatures(text_sha, sig) VALUES (?, ?)", sig_rows)
+                conn.executemany("INSERT OR IGNORE INTO buckets(band, bucket, text_sha) VALUES (?, ?, ?)", bucket_rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def query(self, text_sha: str, text: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Indexed texts at or above threshold similarity, best first, as (text_sha, similarity).
+        The text itself is never returned.
+        """
+        sig = self.signature(text_sha, text)
+        keys = self._band_keys(sig)
+        with self._lock:
+            conn = self._connection()
+            where = " OR ".join(["(band = ? AND bucket = ?)"] * len(keys))
+            params = [v for key in keys for v in key]
+            candidates = [
+                row[0]
+                for row in conn.execute(f"SELECT DISTINCT text_sha FROM buckets WHERE {where}", params)
+                if row[0] != text_sha
+            ]
+            sigs: Dict[str, bytes] = {}
+            for lo in range(0, len(candidates), 500):
+                chunk = candidates[lo:lo + 500]
+                marks = ",".join("?" * len(chunk))
+                sigs.update(conn.execute(f"SELECT text_sha, sig FROM signatures WHERE text_sha IN ({marks})", chunk))
+
+        scored = [(sha, similarity(sig, np.frombuffer(blob, dtype=np.uint32))) for sha, blob in sigs.items()]
+        scored = [(sha, s) for sha, s in scored if s >= self.threshold]
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        return scored[:limit]
+
+    def _band_keys(self, sig: np.ndarray) -> List[Tuple[int, int]]:
+        keys = []
+        for band in range(self.bands):
+            chunk = sig[band * self._rows:(band + 1) * self._rows].tobytes()
+            # signed 64-bit so the bucket fits an SQLite INTEGER
+            bucket = int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True)
+            keys.append((band, bucket))
+        return keys
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
@@ -2,9 +2,25 @@
 
 import argparse
 
-ALLOWED_METHODS = ["regex","lexical","llm", "rag"]
+from src.services.inference.methods.registry import method_names
+
+# backed by the method registry; listing names imports no method module
+ALLOWED_METHODS = method_names()
+
+_SCALARS = (str, int, float, bool, type(None))
+
 
 def to_jsonable(x):
+    # exact-type checks first: result records (to_dict) and plain containers are the hot path
+    t = type(x)
+    if t in _SCALARS:
+        return x
+    if t is dict:
+        return {k: to_jsonable(v) for k, v in x.items()}
+    if t is list:
+        return [to_jsonable(i) for i in x]
+    if hasattr(x, "to_dict"):
+        return x.to_dict()
     if hasattr(x, "model_dump"):
         return x.model_dump()
     if isinstance(x, list):
@@ -33,4 +49,47 @@ def parse_methods(raw: str) -> list[str]:
             seen.add(m)
             out.append(m)
 
-    return out
\ No newline at end of file
+    return out
+
+def parse_timeouts(raw: str) -> dict[str, float]:
+    """
+    Parse per-method timeouts: "30" (every method) or "llm=20,rag=5,*=30".
+    """
+    out: dict[str, float] = {}
+    for part in (p.strip() for p in raw.split(",")):
+        if not part:
+            continue
+        method, sep, value = part.rpartition("=")
+        method = method.strip().lower() if sep else "*"
+        if method != "*" and method not in ALLOWED_METHODS:
+            raise argparse.ArgumentTypeError(f"Unknown method in timeouts: {method}. Allowed: {ALLOWED_METHODS}")
+        try:
+            seconds = float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"timeout must be a number of seconds, got {value!r}")
+        if seconds <= 0:
+            raise argparse.ArgumentTypeError(f"timeout must be positive, got {value!r}")
+        out[method] = seconds
+
+    if not out:
+        raise argparse.ArgumentTypeError("timeouts cannot be empty")
+    return out
+
+
+def parse_row_range(raw: str) -> tuple[int, int]:
+    """
+    Parse an inclusive "START-END" row range (same 1-based numbering as --row).
+    """
+    parts = raw.split("-")
+    if len(parts) != 2:
+        raise argparse.ArgumentTypeError(f"row range must look like START-END, got {raw!r}")
+
+    try:
+        start, end = int(parts[0]), int(parts[1])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"row range must contain integers, got {raw!r}")
+
+    if start > end:
+        raise argparse.ArgumentTypeError(f"row range start must be <= end, got {raw!r}")
+
+    return start, end
@@ -0,0 +1,124 @@
+# src/utils/passages.py
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Tuple
+
+
+def iter_passages(text: str, passage_chars: int = 2000, overlap_chars: int = 200) -> Iterator[Tuple[int, int, str]]:
+    """
+    Lazily split text into overlapping passages of roughly passage_chars characters.
+    Yields (start, end, passage) with offsets into the original text. Cuts are moved
+    back to the nearest whitespace so words are not split; overlap_chars of context
+    is repeated between neighbouring passages.
+    """
+    return iter_passages_chunks((text,), passage_chars, overlap_chars)
+
+
+def iter_passages_chunks(
+    chunks: Iterable[str], passage_chars: int = 2000, overlap_chars: int = 200
+) -> Iterator[Tuple[int, int, str]]:
+    """
+    iter_passages over a text delivered in chunks (e.g. a TextSource), in one pass.
+    The passages and offsets are the same as for the joined text; only the current
+    passage window (about passage_chars plus one chunk) is held in memory.
+    """
+    if passage_chars <= 0:
+        raise ValueError("passage_chars must be positive")
+    if not 0 <= overlap_chars < passage_chars:
+        raise ValueError("overlap_chars must be in [0, passage_chars)")
+
+    w = _Window(chunks)
+    start = w.skip_space(0)
+    while not w.at_end(start):
+        limit = start + passage_chars
+        # one character past the window tells whether the text continues
+        w.fill(limit + 1)
+        end = min(limit, w.end)
+        if end < w.end:
+            # prefer a whitespace cut in the second half of the window
+            cut = w.rfind(" ", start + passage_chars // 2, end)
+            if cut == -1:
+                cut = w.rfind_space(start + passage_chars // 2, end)
+            if cut > start:
+                end = cut
+
+        yield start, end, w.slice(start, end)
+
+        if w.eof and end >= w.end:
+            break
+
+        next_start = max(end - overlap_chars, start + 1)
+        # start the next passage on a word boundary
+        if overlap_chars and not w.char(next_start - 1).isspace():
+            boundary = w.find_space(next_start, end)
+            next_start = boundary if boundary != -1 else end
+        start = w.skip_space(next_start)
+        w.release(start)
+
+
+class _Window:
+    """The buffered part of a chunked text, addressed by absolute character offsets."""
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self.buf = ""
+        self.base = 0
+        self.eof = False
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.buf)
+
+    def fill(self, upto: int) -> None:
+        while not self.eof and self.end < upto:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.eof = True
+            else:
+                self.buf += chunk
+
+    def release(self, before: int) -> None:
+        # dropping the consumed prefix copies the rest, so it is done once it is most of the buffer
+        drop = before - self.base
+        if drop > len(self.buf) // 2:
+            self.buf = self.buf[drop:]
+            self.base = before
+
+    def at_end(self, i: int) -> bool:
+        self.fill(i + 1)
+        return i >= self.end
+
+    def char(self, i: int) -> str:
+        return self.buf[i - self.base]
+
+    def slice(self, lo: int, hi: int) -> str:
+        return self.buf[lo - self.base:hi - self.base]
+
+    def rfind(self, sub: str, lo: int, hi: int) -> int:
+        i = self.buf.rfind(sub, lo - self.base, hi - self.base)
+        return i if i == -1 else i + self.base
+
+    def skip_space(self, i: int) -> int:
+        while True:
+            self.fill(i + 1)
+            buf, n = self.buf, len(self.buf)
+            j = i - self.base
+            while j < n and buf[j].isspace():
+                j += 1
+            i = j + self.base
+            if j < n or self.eof:
+                return i
+
+    def find_space(self, lo: int, hi: int) -> int:
+        buf = self.buf
+        for i in range(lo - self.base, hi - self.base):
+            if buf[i].isspace():
+                return i + self.base
+        return -1
+
+    def rfind_space(self, lo: int, hi: int) -> int:
+        buf = self.buf
+        for i in range(hi - 1 - self.base, lo - 1 - self.base, -1):
+            if buf[i].isspace():
+                return i + self.base
+        return -1
@@ -0,0 +1,53 @@
+# src/utils/profiling.py
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+
+@contextmanager
+def profile_run(output_path: str | Path, top: int = 40) -> Iterator[Dict[str, Path]]:
+    """
+    Run the enclosed block under cProfile and tracemalloc and write the reports next
+    to output_path:
+
+      <output>.prof            raw cProfile stats (snakeviz / pstats)
+      <output>.profile.txt     top functions by cumulative time
+      <output>.tracemalloc.txt top allocation sites and peak traced memory
+
+    Only the current process is profiled (not process-pool workers).
+    """
+    output_path = Path(output_path)
+    reports = {
+        "prof": output_path.with_name(output_path.name + ".prof"),
+        "profile": output_path.with_name(output_path.name + ".profile.txt"),
+        "tracemalloc": output_path.with_name(output_path.name + ".tracemalloc.txt"),
+    }
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield reports
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(reports["prof"])
+
+        buf = io.StringIO()
+        pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(top)
+        reports["profile"].write_text(buf.getvalue(), encoding="utf-8")
+
+        lines = [f"peak traced memory: {peak / 2**20:.1f} MiB (current {current / 2**20:.1f} MiB)", ""]
+        for stat in snapshot.statistics("lineno")[:top]:
+            lines.append(str(stat))
+        reports["tracemalloc"].write_text("\n".join(lines) + "\n", encoding="utf-8")
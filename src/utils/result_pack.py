@@ -0,0 +1,170 @@
+# src/utils/result_pack.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from src.models.schemas import now_iso
+
+PACK_FORMAT_VERSION = "rpack-v1"
+
+_KEY_DTYPE = "S32"
+
+
+def params_sha(params: Dict[str, Any]) -> str:
+    """Digest of a method's cache params, serialized the way make_cache_key does."""
+    blob = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResultPack:
+    """
+    Read-only, content-addressed result cache built offline (build_result_pack.py).
+
+    Entries are the same cache-key -> result-dict pairs CachedInference stores, laid out
+    as a versioned artifact directory:
+
+      rpack-v1-<content sha>/
+        meta.json    format version, entry count, and per method its cache params
+        keys.npy     sorted 32-byte cache keys
+        offsets.npy  (count + 1) uint64 offsets of each entry in values.npy
+        values.npy   zlib-compressed result JSON, concatenated
+
+    The arrays are memory-mapped, so opening a pack reads only meta.json and a lookup
+    is a binary search that touches a few pages of keys and one value.
+
+    meta.json records each method's cache params, which include its method_version and
+    the code table's hcpcs_sha; serves() compares them with the running method, so a
+    pack built for another version or table is never consulted.
+    """
+
+    def __init__(self, artifact_dir: str | Path):
+        self.artifact_dir = Path(artifact_dir)
+        with (self.artifact_dir / "meta.json").open("r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != PACK_FORMAT_VERSION:
+            raise ValueError(f"Unsupported result pack format: {self.meta.get('format_version')}")
+
+        self._keys = np.load(self.artifact_dir / "keys.npy", mmap_mode="r")
+        self._offsets = np.load(self.artifact_dir / "offsets.npy", mmap_mode="r")
+        self._values = np.load(self.artifact_dir / "values.npy", mmap_mode="r")
+
+    @property
+    def name(self) -> str:
+        return self.artifact_dir.name
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def serves(self, method: str, params: Dict[str, Any]) -> bool:
+        """True when this pack holds results of method computed with exactly these params."""
+        entry = self.meta["methods"].get(method)
+        return entry is not None and entry["params_sha"] == params_sha(params)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(keys))
+        if not keys or not len(self._keys):
+            return {}
+        query = np.array([bytes.fromhex(k) for k in keys], dtype=_KEY_DTYPE)
+        pos = np.minimum(np.searchsorted(self._keys, query), len(self._keys) - 1)
+        hit = np.flatnonzero(self._keys[pos] == query)
+
+        out: Dict[str, Dict[str, Any]] = {}
+        for i in hit:
+            p = pos[i]
+            blob = self._values[self._offsets[p]:self._offsets[p + 1]]
+            out[keys[i]] = json.loads(zlib.decompress(blob.tobytes()))
+        return out
+
+
+def write_result_pack(
+    root: str | Path,
+    entries: Iterable[Tuple[str, Dict[str, Any]]],
+    methods: Dict[str, Dict[str, Any]],
+    source: str | None = None,
+) -> Path:
+    """
+    Write (cache key, result dict) entries as a pack under root and return its directory.
+
+    methods maps each method name to the cache params its entries were computed with.
+    The first entry of a repeated key wins. Values are compressed as they arrive, and
+    only the compressed entries are held until they are sorted and written. Like the
+    index artifacts, the directory is assembled in a temp dir and renamed into place.
+    """
+    blobs: Dict[bytes, bytes] = {}
+    for key, value in entries:
+        digest = bytes.fromhex(key)
+        if digest not in blobs:
+            blobs[digest] = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    order = sorted(blobs)
+    keys = np.array(order, dtype=_KEY_DTYPE)
+    sizes = np.fromiter((len(blobs[k]) for k in order), dtype=np.uint64, count=len(order))
+    offsets = np.zeros(len(order) + 1, dtype=np.uint64)
+    np.cumsum(sizes, out=offsets[1:])
+    values = np.frombuffer(b"".join(blobs[k] for k in order), dtype=np.uint8)
+
+    content = hashlib.sha256()
+    content.update(keys.tobytes())
+    content.update(values.tobytes())
+
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    final_dir = root / f"{PACK_FORMAT_VERSION}-{content.hexdigest()}"
+    if (final_dir / "meta.json").exists():
+        return final_dir
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=root))
+    try:
+        np.save(tmp_dir / "keys.npy", keys)
+        np.save(tmp_dir / "offsets.npy", offsets)
+        np.save(tmp_dir / "values.npy", values)
+        meta = {
+            "format_version": PACK_FORMAT_VERSION,
+            "created_at": now_iso(),
+            "count": len(order),
+            "source": source,
+            "methods": {
+                method: {
+                    "method_version": params.get("method_version"),
+                    "hcpcs_sha": params.get("hcpcs_sha"),
+                    "params_sha": params_sha(params),
+                    "params": params,
+                }
+                for method, params in methods.items()
+            },
+        }
+        # meta.json is written last: its presence marks a complete pack
+        with (tmp_dir / "meta.json").open("w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        try:
+            os.replace(tmp_dir, final_dir)
+        except OSError:
+            # another builder wrote the same content first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return final_dir
+
+
+def open_result_packs(root: str | Path) -> List[ResultPack]:
+    """Every complete pack of the current format under root, newest first."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    packs = [
+        ResultPack(d)
+        for d in root.glob(f"{PACK_FORMAT_VERSION}-*")
+        if (d / "meta.json").exists()
+    ]
+    packs.sort(key=lambda p: p.meta["created_at"], reverse=True)
+    return packs
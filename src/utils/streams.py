@@ -0,0 +1,219 @@
+# src/utils/streams.py
+from __future__ import annotations
+
+import json
+import os
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from src.utils.metrics import span
+from src.utils.parser import to_jsonable
+
+# (metadata that is copied onto the output record, policy text)
+PolicyRecord = Tuple[Dict[str, Any], str]
+
+OUTPUT_FORMATS = ("json", "jsonl", "columnar")
+
+
+def iter_csv_records(
+    path: str | Path,
+    text_column: str,
+    id_column: Optional[str] = "policy_id",
+    start: int = 2,
+    end: Optional[int] = None,
+    chunksize: int = 256,
+) -> Iterator[PolicyRecord]:
+    """
+    Stream policies from a CSV, chunksize rows at a time.
+
+    Rows use the CLI numbering (header is row 1, first data row is row 2); start/end
+    are inclusive and end=None reads to the end of the file. Only the text and id
+    columns are parsed. Each record carries its "row" and, when id_column exists,
+    its "policy_id".
+    """
+    import pandas as pd
+
+    path = Path(path)
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    if text_column not in columns:
+        raise ValueError(f"Column '{text_column}' not found in CSV. Available: {columns}")
+    if start < 2:
+        raise ValueError(f"Row {start} out of range. The first data row is 2")
+
+    use_id = id_column is not None and id_column in columns and id_column != text_column
+    usecols = [text_column, id_column] if use_id else [text_column]
+    # validation above runs on call; rows are read only as the records are consumed
+    return _iter_csv_chunks(path, usecols, text_column, id_column if use_id else None, start, end, chunksize)
+
+
+def _iter_csv_chunks(path, usecols, text_column, id_column, start, end, chunksize) -> Iterator[PolicyRecord]:
+    import pandas as pd
+
+    reader = pd.read_csv(
+        path,
+        usecols=usecols,
+        dtype=str,
+        keep_default_na=False,
+        skiprows=range(1, start - 1),
+        nrows=None if end is None else end - start + 1,
+        chunksize=chunksize,
+    )
+    row = start
+    for chunk in reader:
+        ids = chunk[id_column].tolist() if id_column is not None else None
+        for i, text in enumerate(chunk[text_column].tolist()):
+            meta: Dict[str, Any] = {"row": row}
+            if ids is not None:
+                meta["policy_id"] = ids[i]
+            yield meta, text
+            row += 1
+
+    if end is not None and row <= end:
+        raise ValueError(f"Rows {start}..{end} out of range. Valid: 2..{row - 1}")
+
+
+def iter_jsonl_records(
+    path: str | Path,
+    text_field: str = "text",
+    id_field: Optional[str] = "policy_id",
+) -> Iterator[PolicyRecord]:
+    """
+    Stream policies from a JSONL file, one JSON object per line (blank lines are skipped).
+    "row" is the 1-based line number; "policy_id" is copied from id_field when present.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            if text_field not in obj:
+                raise ValueError(f"Line {line_no}: field '{text_field}' not found. Available: {list(obj)}")
+            meta: Dict[str, Any] = {"row": line_no}
+            if id_field is not None and id_field in obj:
+                meta["policy_id"] = obj[id_field]
+            yield meta, str(obj[text_field])
+
+
+class ResultWriter:
+    """
+    Writes result records as they arrive.
+
+    - "jsonl": one compact JSON object per line
+    - "json":  the classic indented JSON array, streamed element by element
+               (byte-identical to json.dump(records, f, indent=4))
+
+    The file is flushed every flush_every records or flush_interval_s seconds,
+    whichever comes first, so consumers can tail it while the run is in progress.
+
+    resume=(offset, count) continues a checkpointed run (see utils/checkpoint.py): the
+    file is truncated to offset, which holds count complete records, and new records
+    are appended after them.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        output_format: str = "jsonl",
+        flush_every: int = 16,
+        flush_interval_s: float = 2.0,
+        resume: Optional[Tuple[int, int]] = None,
+    ):
+        if output_format not in ("json", "jsonl"):
+            raise ValueError(f"output_format must be json or jsonl, got {output_format!r}")
+        self.path = Path(path)
+        self.output_format = output_format
+        self.flush_every = max(1, flush_every)
+        self.flush_interval_s = flush_interval_s
+        self.count = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume is None or resume[0] == 0:
+            self._f: Optional[TextIO] = open(self.path, "w", encoding="utf-8")
+        else:
+            offset, self.count = resume
+            if not self.path.exists() or self.path.stat().st_size < offset:
+                raise ValueError(f"{self.path} is shorter than its checkpoint ({offset} bytes); cannot resume")
+            # drops records written after the last checkpoint and the closing bracket of a json array
+            self._f = open(self.path, "r+", encoding="utf-8")
+            self._f.seek(offset)
+            self._f.truncate()
+
+    def write(self, record: Any) -> None:
+        with span("serialize", component="writer"):
+            data = to_jsonable(record)
+            if self.output_format == "jsonl":
+                self._f.write(json.dumps(data, ensure_ascii=False) + "\n")
+            else:
+                body = json.dumps(data, indent=4)
+                self._f.write(("[\n" if self.count == 0 else ",\n") + _indent(body))
+
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def flush(self) -> None:
+        self._f.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def sync(self) -> int:
+        """Flush and fsync what was written so far; returns the offset the file is durable up to."""
+        self.flush()
+        os.fsync(self._f.fileno())
+        return self._f.tell()
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        if self.output_format == "json":
+            self._f.write("\n]" if self.count else "[]")
+        self._f.close()
+        self._f = None
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_result_writer(
+    path: str | Path,
+    output_format: str,
+    resume: Optional[Tuple[int, int]] = None,
+    columnar_backend: str = "auto",
+):
+    """ResultWriter for json/jsonl, ColumnarWriter (utils/columnar.py) for columnar."""
+    if output_format == "columnar":
+        if resume is not None:
+            raise ValueError("columnar output cannot resume a checkpoint")
+        from src.utils.columnar import ColumnarWriter
+
+        return ColumnarWriter(path, backend=columnar_backend)
+    return ResultWriter(path, output_format=output_format, resume=resume)
+
+
+def non_empty(records: Iterable[PolicyRecord]) -> Iterator[PolicyRecord]:
+    """Records with surrounding whitespace stripped from the text; blank policies are dropped."""
+    for meta, text in records:
+        text = text.strip()
+        if text:
+            yield meta, text
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Consecutive lists of up to size items (at least one per list)."""
+    it = iter(items)
+    while True:
+        block = list(islice(it, max(1, size)))
+        if not block:
+            return
+        yield block
+
+
+def _indent(body: str, prefix: str = "    ") -> str:
+    return "\n".join(prefix + line for line in body.split("\n"))
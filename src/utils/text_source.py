@@ -0,0 +1,142 @@
+# src/utils/text_source.py
+from __future__ import annotations
+
+import codecs
+import hashlib
+import io
+import mmap
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+
+# bytes that str.isspace() accepts on their own (ASCII whitespace and separators)
+_ASCII_SPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+
+class TextSource:
+    """
+    A UTF-8 policy file read through mmap instead of into one string.
+
+    The text it stands for is exactly what the --input path used to produce,
+    open(path, encoding="utf-8").read().strip(): universal newlines are translated and
+    surrounding whitespace is dropped, so character offsets and the sha256 (the cache
+    key) are unchanged. The mapping is shared with the page cache, and consumers pull
+    the text as decoded chunks of about chunk_bytes:
+
+      - iter_chunks() feeds streaming methods (regex scanning, passage cutting);
+      - sha256() hashes the text in one pass; a file without "\\r" is hashed straight
+        from the mapping without decoding;
+      - text() materializes the whole string for methods that need it, once, shared
+        by all of them.
+
+    Sources pickle as their path, so process-pool workers map the file themselves.
+    """
+
+    def __init__(self, path: str | Path, chunk_bytes: int = 1 << 20):
+        self.path = Path(path)
+        self.chunk_bytes = max(4, chunk_bytes)
+        self._sha: Optional[str] = None
+        self._text: Optional[str] = None
+        self._lock = threading.Lock()
+
+        with open(self.path, "rb") as f:
+            size = f.seek(0, io.SEEK_END)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._lo, self._hi = _strip_bounds(self._mm) if self._mm is not None else (0, 0)
+
+    @property
+    def nbytes(self) -> int:
+        """UTF-8 size of the stripped text, before newline translation."""
+        return self._hi - self._lo
+
+    def is_empty(self) -> bool:
+        return self._hi <= self._lo
+
+    def iter_chunks(self, chunk_bytes: Optional[int] = None) -> Iterator[str]:
+        """The text as consecutive decoded chunks; every call is a fresh pass over the mapping."""
+        step = max(4, chunk_bytes or self.chunk_bytes)
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+        for lo in range(self._lo, self._hi, step):
+            hi = min(lo + step, self._hi)
+            chunk = decoder.decode(self._mm[lo:hi], final=hi == self._hi)
+            if chunk:
+                yield chunk
+
+    def sha256(self) -> str:
+        """sha256_text() of the text, computed in one streaming pass and remembered."""
+        if self._sha is None:
+            h = hashlib.sha256()
+            if self.is_empty():
+                pass
+            elif self._mm.find(b"\r", self._lo, self._hi) == -1:
+                # no newline translation: the text's UTF-8 bytes are the mapped bytes
+                for lo in range(self._lo, self._hi, self.chunk_bytes):
+                    h.update(self._mm[lo:min(lo + self.chunk_bytes, self._hi)])
+            else:
+                for chunk in self.iter_chunks():
+                    h.update(chunk.encode("utf-8"))
+            self._sha = h.hexdigest()
+        return self._sha
+
+    def text(self) -> str:
+        """The whole text as one string, built on first use and kept for later callers."""
+        with self._lock:
+            if self._text is None:
+                self._text = "".join(self.iter_chunks())
+            return self._text
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._text = None
+
+    def __enter__(self) -> "TextSource":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __reduce__(self):
+        return TextSource, (str(self.path), self.chunk_bytes)
+
+    def __repr__(self) -> str:
+        return f"TextSource({str(self.path)!r}, {self.nbytes} bytes)"
+
+
+def _strip_bounds(mm: mmap.mmap) -> tuple[int, int]:
+    """Byte range of mm left after str.strip() of its decoded text."""
+    lo, hi = 0, len(mm)
+    while lo < hi:
+        if mm[lo] in _ASCII_SPACE:
+            lo += 1
+            continue
+        width = _char_width(mm[lo])
+        if mm[lo] < 0x80 or not mm[lo:lo + width].decode("utf-8", "replace").isspace():
+            break
+        lo += width
+
+    while hi > lo:
+        if mm[hi - 1] in _ASCII_SPACE:
+            hi -= 1
+            continue
+        if mm[hi - 1] < 0x80:
+            break
+        # back up over continuation bytes to the start of the last character
+        start = hi - 1
+        while start > lo and mm[start] & 0xC0 == 0x80:
+            start -= 1
+        if not mm[start:hi].decode("utf-8", "replace").isspace():
+            break
+        hi = start
+    return lo, hi
+
+
+def _char_width(lead: int) -> int:
+    if lead >= 0xF0:
+        return 4
+    if lead >= 0xE0:
+        return 3
+    if lead >= 0xC0:
+        return 2
+    return 1